@@ -1,8 +1,8 @@
 import dataclasses
 from datetime import datetime
-from typing import Any, List, Dict, Tuple
+from typing import Any, List, Dict, Tuple, Optional
 
-from cachetools import cached, TTLCache
+from apscheduler.triggers.cron import CronTrigger
 
 from app import schemas
 from app.core.config import settings
@@ -11,7 +11,10 @@ from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
-from app.utils.http import RequestUtils
+
+from .discovercache import DiscoverCache, cache_stats_cards
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
 
 
 @dataclasses.dataclass
@@ -32,6 +35,20 @@ weekdays = [
 ]
 
 
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("api.bgm.tv",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "Bangumi每日放送"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "anime": {"weekday": "0"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+
+
 class BangumiDailyDiscover(_PluginBase):
     # 插件名称
     plugin_name = "Bangumi每日放送探索"
@@ -40,7 +57,7 @@ class BangumiDailyDiscover(_PluginBase):
     # 插件图标
     plugin_icon = "Bangumi_A.png"
     # 插件版本
-    plugin_version = "1.0.1"
+    plugin_version = "1.0.11"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -54,10 +71,26 @@ class BangumiDailyDiscover(_PluginBase):
 
     # 私有属性
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    # (放送表原始数据, {星期: 已转换的 MediaInfo})，0 为全部
+    _calendar: Optional[Tuple[Any, Dict[str, List[schemas.MediaInfo]]]] = None
+    _max_stale = 2
 
     def init_plugin(self, config: dict = None):
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.bangumidaily_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -66,6 +99,22 @@ class BangumiDailyDiscover(_PluginBase):
     def get_command() -> List[Dict[str, Any]]:
         pass
 
+    def get_service(self) -> List[Dict[str, Any]]:
+        """
+        注册插件公共服务
+        """
+        if self._enabled:
+            return [
+                {
+                    "id": "BangumiDailyDiscover_refresh_calendar",
+                    "name": "更新Bangumi每日放送",
+                    # Bangumi 每日零点更新放送表，稍后刷新
+                    "trigger": CronTrigger.from_crontab("10 0 * * *"),
+                    "func": self.refresh_calendar,
+                    "kwargs": {},
+                }
+            ]
+
     def get_api(self) -> List[Dict[str, Any]]:
         return [
             {
@@ -74,8 +123,8 @@ class BangumiDailyDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "Bangumi每日放送探索数据源",
                 "description": "获取Bangumi每日放送探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -100,17 +149,38 @@ class BangumiDailyDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS) + cache_stats_cards(CACHE),
+            }
+        ]
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("bangumidaily", ttl=6 * 3600)
     def __request(self) -> List[schemas.MediaInfo]:
         """
         请求Bangumi每日放送 API
@@ -120,13 +190,72 @@ class BangumiDailyDiscover(_PluginBase):
             "User-Agent": settings.USER_AGENT,
             "Referer": "https://api.bgm.tv/",
         }
-        res = RequestUtils(headers=headers).get_res(api_url)
+        res = get_client().get(api_url, headers=headers)
         if res is None:
             raise Exception("无法连接Bangumi每日放送，请检查网络连接！")
         if not res.ok:
             raise Exception(f"请求Bangumi每日放送 API失败：{res.text}")
         return res.json()
 
+    @staticmethod
+    def __series_to_media(series_info: dict) -> schemas.MediaInfo:
+        vote_average = None
+        rating_info = series_info.get("rating", None)
+        if rating_info is not None:
+            vote_average = rating_info.get("score", None)
+
+        if series_info.get("name_cn"):
+            title = series_info.get("name_cn")
+        else:
+            title = series_info.get("name")
+        return schemas.MediaInfo(
+            type="电视剧",
+            source="bangumi",
+            title=title,
+            mediaid_prefix="bangumidaily",
+            media_id=series_info.get("id"),
+            bangumi_id=series_info.get("id"),
+            poster_path=series_info.get("images").get("large"),
+            vote_average=vote_average,
+            first_air_date=series_info.get("air_date", None)
+        )
+
+    def __calendar_index(self, result: List[dict]) -> Dict[str, List[schemas.MediaInfo]]:
+        """
+        按星期索引已转换的放送数据，放送表数据未变化时复用；
+        各星期分别建立，数据异常的条目跳过，不影响其它条目
+        """
+        calendar = self._calendar
+        if calendar is None or calendar[0] is not result:
+            index = {"0": []}
+            for day_entry in result:
+                try:
+                    weekday = str(day_entry["weekday"]["id"])
+                    entries = day_entry.get("items") or []
+                except (AttributeError, KeyError, TypeError) as err:
+                    logger.warn(f"Bangumi每日放送星期数据异常，已跳过：{err}")
+                    continue
+                items = []
+                for item in entries:
+                    try:
+                        items.append(self.__series_to_media(item))
+                    except Exception as err:
+                        logger.warn(f"Bangumi每日放送条目数据异常，已跳过：{err}")
+                index[weekday] = items
+                index["0"].extend(items)
+            calendar = self._calendar = (result, index)
+        return calendar[1]
+
+    def refresh_calendar(self):
+        """
+        重新获取放送表并更新索引
+        """
+        try:
+            self.__calendar_index(CACHE.update(self.__request))
+            logger.info("Bangumi每日放送已更新")
+        except Exception as err:
+            logger.error(f"更新Bangumi每日放送失败：{err}")
+
     def bangumidaily_discover(
         self,
         weekday: str = "0",
@@ -136,29 +265,6 @@ class BangumiDailyDiscover(_PluginBase):
         """
         获取Bangumi每日放送探索数据
         """
-
-        def __series_to_media(series_info: dict) -> schemas.MediaInfo:
-            vote_average = None
-            rating_info = series_info.get("rating", None)
-            if rating_info is not None:
-                vote_average = rating_info.get("score", None)
-
-            if series_info.get("name_cn"):
-                title = series_info.get("name_cn")
-            else:
-                title = series_info.get("name")
-            return schemas.MediaInfo(
-                type="电视剧",
-                source="bangumi",
-                title=title,
-                mediaid_prefix="bangumidaily",
-                media_id=series_info.get("id"),
-                bangumi_id=series_info.get("id"),
-                poster_path=series_info.get("images").get("large"),
-                vote_average=vote_average,
-                first_air_date=series_info.get("air_date", None)
-            )
-
         try:
             result = self.__request()
         except Exception as err:
@@ -166,22 +272,8 @@ class BangumiDailyDiscover(_PluginBase):
             return []
         if not result:
             return []
-        results = []
-        for day_entry in result:
-            if str(weekday) == "0":
-                for item in day_entry["items"]:
-                    results.append(__series_to_media(item))
-            else:
-                if str(day_entry["weekday"]["id"]) == str(weekday):
-                    for item in day_entry["items"]:
-                        results.append(__series_to_media(item))
-                else:
-                    continue
-        if page * count <= len(results):
-            last_num = page * count
-        else:
-            last_num = len(results)
-        return results[(page - 1) * count : last_num]
+        results = self.__calendar_index(result).get(str(weekday), [])
+        return results[(page - 1) * count : page * count]
 
     @staticmethod
     def bangumidaily_filter_ui() -> List[dict]:
@@ -235,13 +327,17 @@ class BangumiDailyDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        bangumidaily_source = schemas.DiscoverMediaSource(
-            name="Bangumi每日放送",
-            mediaid_prefix="bangumidaily",
-            api_path=f"plugin/BangumiDailyDiscover/bangumidaily_discover?apikey={settings.API_TOKEN}",
-            filter_params={"weekday": "0"},
-            filter_ui=self.bangumidaily_filter_ui(),
-        )
+        # 星期按今天排序，日期变化后重新生成
+        key = (settings.API_TOKEN, datetime.today().date())
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="Bangumi每日放送",
+                mediaid_prefix="bangumidaily",
+                api_path=f"plugin/BangumiDailyDiscover/bangumidaily_discover?apikey={settings.API_TOKEN}",
+                filter_params={"weekday": "0"},
+                filter_ui=self.bangumidaily_filter_ui(),
+            )
+        bangumidaily_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [bangumidaily_source]
         else:
@@ -251,4 +347,6 @@ class BangumiDailyDiscover(_PluginBase):
         """
         退出插件
         """
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
@@ -0,0 +1,676 @@
+"""
+探索接口响应缓存
+
+内存 LRU（按字节数限制大小）+ SQLite 磁盘两级缓存，键为来源名称与规范化后的请求参数，
+值为上游接口返回的 JSON 数据。磁盘缓存在插件初始化时调用 open 后启用，重启后仍可命中。
+过期后在 max_stale 时间内仍直接返回旧数据，同时在后台刷新（stale-while-revalidate），
+同一个键同时只有一个刷新任务。
+开启预取后，返回第 N 页时在后台预取第 N+1 页；预取的并发数在所有探索插件间共享限制，
+每个来源另有请求间隔限制，超出限制的预取直接放弃。
+过滤参数 UI 由 BaseUiCache 缓存在磁盘上，插件载入时不请求接口。
+各探索插件独立安装，本文件在每个探索插件中各有一份
+"""
+import functools
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.log import logger
+
+# 未命中
+MISSING = object()
+
+# 预取共享状态挂载的模块名
+PREFETCH_MODULE = "_moviepilot_discover_prefetch"
+# 所有探索插件同时进行的预取请求数上限
+PREFETCH_CONCURRENCY = 4
+# 同一来源两次预取请求的最小间隔，单位秒
+PREFETCH_INTERVAL = 1.0
+
+
+def _prefetch_state() -> ModuleType:
+    """
+    进程内各探索插件共享的预取状态，先载入的插件创建，后载入的插件复用
+    """
+    module = sys.modules.get(PREFETCH_MODULE)
+    if module is None:
+        module = ModuleType(PREFETCH_MODULE)
+        module.semaphore = threading.BoundedSemaphore(PREFETCH_CONCURRENCY)
+        module.lock = threading.Lock()
+        # 来源 → 最近一次预取时间
+        module.last = {}
+        module = sys.modules.setdefault(PREFETCH_MODULE, module)
+    return module
+
+
+class DiscoverCache:
+    """
+    探索接口两级缓存
+    """
+
+    def __init__(
+        self,
+        ttl: float = 1800,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_stale: float = 2 * 3600,
+    ):
+        """
+        :param ttl: 默认有效期，单位秒，各来源可单独指定
+        :param max_bytes: 内存缓存上限，单位字节
+        :param max_stale: 过期后仍可返回旧数据的最长时间，单位秒，0 为不返回过期数据，
+                          默认为默认有效期的 4 倍，过长会让上游长时间不可用时一直返回旧数据
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self._lock = threading.RLock()
+        # 键 → (过期时间, 值, 字节数)
+        self._memory: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._path: Optional[Path] = None
+        self._ttls: Dict[str, float] = {}
+        # 来源 → 统计
+        self._stats: Dict[str, Dict[str, int]] = {}
+        # 正在后台刷新的键
+        self._refreshing: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def open(self, path: Path):
+        """
+        启用磁盘缓存，并清理已过期的条目
+        """
+        with self._lock:
+            if self._path == path and self._db is not None:
+                return
+            self.close()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(str(path), check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "key TEXT PRIMARY KEY, source TEXT, expires REAL, value BLOB)"
+                )
+                db.execute(
+                    "DELETE FROM cache WHERE expires < ?",
+                    (time.time() - self.max_stale,),
+                )
+                db.commit()
+                self._db, self._path = db, path
+            except Exception as err:
+                logger.warn(f"探索缓存数据库打开失败，仅使用内存缓存：{err}")
+
+    def close(self):
+        """
+        关闭磁盘缓存，停止后台刷新
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._refreshing.clear()
+            if self._db is not None:
+                try:
+                    self._db.close()
+                except Exception:
+                    pass
+            self._db, self._path = None, None
+
+    @staticmethod
+    def make_key(source: str, args: tuple, kwargs: dict) -> str:
+        """
+        规范化请求参数生成缓存键，参数顺序和值类型（如 1 与 "1"）不影响结果
+        """
+        params = {
+            "args": [str(arg) for arg in args],
+            "kwargs": {
+                str(k): str(v) for k, v in sorted(kwargs.items()) if v is not None
+            },
+        }
+        text = json.dumps(params, ensure_ascii=False, sort_keys=True)
+        return f"{source}:{hashlib.sha1(text.encode()).hexdigest()}"
+
+    def _count(self, source: str, name: str):
+        stats = self._stats.setdefault(
+            source,
+            {
+                "memory_hits": 0,
+                "disk_hits": 0,
+                "stale_hits": 0,
+                "misses": 0,
+                "refreshes": 0,
+                "refresh_errors": 0,
+                "prefetches": 0,
+                "prefetch_skips": 0,
+            },
+        )
+        stats[name] += 1
+
+    def _remember(self, key: str, expires: float, value: Any, size: int):
+        old = self._memory.pop(key, None)
+        if old:
+            self._memory_bytes -= old[2]
+        if size > self.max_bytes:
+            return
+        self._memory[key] = (expires, value, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, (_, _, dropped) = self._memory.popitem(last=False)
+            self._memory_bytes -= dropped
+
+    def get(self, source: str, key: str) -> Tuple[Any, bool]:
+        """
+        读取缓存
+
+        :return: (值, 是否未过期)，未命中或过期超过 max_stale 时值为 MISSING
+        """
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item and item[0] + self.max_stale > now:
+                self._memory.move_to_end(key)
+                fresh = item[0] > now
+                self._count(source, "memory_hits" if fresh else "stale_hits")
+                return item[1], fresh
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT expires, value FROM cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except Exception as err:
+                    logger.warn(f"读取探索缓存失败：{err}")
+                    row = None
+                if row and row[0] + self.max_stale > now:
+                    text = zlib.decompress(row[1]).decode()
+                    value = json.loads(text)
+                    self._remember(key, row[0], value, len(text))
+                    fresh = row[0] > now
+                    self._count(source, "disk_hits" if fresh else "stale_hits")
+                    return value, fresh
+            self._count(source, "misses")
+            return MISSING, False
+
+    def fresh(self, key: str) -> bool:
+        """
+        缓存中是否有未过期的数据，不计入统计
+        """
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item:
+                return item[0] > now
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT expires FROM cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    return bool(row and row[0] > now)
+                except Exception:
+                    pass
+        return False
+
+    def set(self, source: str, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        写入缓存
+        """
+        try:
+            text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError) as err:
+            logger.warn(f"探索缓存数据无法序列化：{err}")
+            return
+        expires = time.time() + (ttl or self._ttls.get(source) or self.ttl)
+        with self._lock:
+            self._remember(key, expires, value, len(text))
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "REPLACE INTO cache (key, source, expires, value) VALUES (?, ?, ?, ?)",
+                        (key, source, expires, zlib.compress(text.encode())),
+                    )
+                    self._db.commit()
+                except Exception as err:
+                    logger.warn(f"写入探索缓存失败：{err}")
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM cache")
+                    self._db.commit()
+                except Exception as err:
+                    logger.warn(f"清空探索缓存失败：{err}")
+
+    def refresh(
+        self,
+        source: str,
+        key: str,
+        func: Callable,
+        *args,
+        semaphore: Optional[threading.BoundedSemaphore] = None,
+        counter: str = "refreshes",
+        **kwargs,
+    ):
+        """
+        在后台刷新缓存，同一个键正在刷新时直接返回
+
+        :param semaphore: 已获取的并发限制，刷新结束后释放
+        :param counter: 成功时计入的统计项
+        """
+        with self._lock:
+            if key in self._refreshing:
+                if semaphore is not None:
+                    semaphore.release()
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=PREFETCH_CONCURRENCY,
+                    thread_name_prefix="discover-refresh",
+                )
+            executor = self._executor
+
+        def run():
+            try:
+                value = func(*args, **kwargs)
+                self.set(source, key, value)
+                with self._lock:
+                    self._count(source, counter)
+            except Exception as err:
+                logger.warn(f"后台刷新探索缓存失败：{source}：{err}")
+                with self._lock:
+                    self._count(source, "refresh_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+                if semaphore is not None:
+                    semaphore.release()
+
+        try:
+            executor.submit(run)
+        except RuntimeError:
+            # 执行器已关闭
+            with self._lock:
+                self._refreshing.discard(key)
+            if semaphore is not None:
+                semaphore.release()
+
+    def prefetch(self, method: Callable, *args, **kwargs):
+        """
+        在后台预取 cached 装饰的方法的结果，已缓存或超出并发、频率限制时放弃
+
+        :param method: cached 装饰的绑定方法，如 self.__request
+        """
+        func = method.__func__
+        source = func.cache_source
+        key = self.make_key(source, args, kwargs)
+        if self.fresh(key):
+            return
+        state = _prefetch_state()
+        now = time.monotonic()
+        with state.lock:
+            if now - state.last.get(source, 0) < PREFETCH_INTERVAL:
+                allowed = False
+            else:
+                allowed = state.semaphore.acquire(blocking=False)
+                if allowed:
+                    state.last[source] = now
+        if not allowed:
+            with self._lock:
+                self._count(source, "prefetch_skips")
+            return
+        self.refresh(
+            source,
+            key,
+            func.__wrapped__,
+            method.__self__,
+            *args,
+            semaphore=state.semaphore,
+            counter="prefetches",
+            **kwargs,
+        )
+
+    def update(self, method: Callable, *args, **kwargs) -> Any:
+        """
+        忽略缓存重新调用 cached 装饰的方法并写入缓存
+
+        :param method: cached 装饰的绑定方法，如 self.__request
+        """
+        func = method.__func__
+        source = func.cache_source
+        value = func.__wrapped__(method.__self__, *args, **kwargs)
+        self.set(source, self.make_key(source, args, kwargs), value)
+        return value
+
+    def cached(self, source: str, ttl: Optional[float] = None) -> Callable:
+        """
+        缓存方法的返回值，忽略 self 参数；数据过期但未超过 max_stale 时返回旧数据并在后台刷新
+
+        :param source: 来源名称，用于区分缓存键、有效期和统计
+        :param ttl: 有效期，单位秒，不指定时使用默认值
+        """
+        if ttl:
+            self._ttls[source] = ttl
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(obj, *args, **kwargs):
+                key = self.make_key(source, args, kwargs)
+                value, fresh = self.get(source, key)
+                if value is not MISSING:
+                    if not fresh:
+                        self.refresh(source, key, func, obj, *args, **kwargs)
+                    return value
+                value = func(obj, *args, **kwargs)
+                self.set(source, key, value)
+                return value
+
+            wrapper.cache_source = source
+            return wrapper
+
+        return decorator
+
+    def _stale_entries(self) -> Dict[str, int]:
+        """
+        各来源已过期但仍在 max_stale 内、下次读取会返回旧数据的条目数
+        """
+        now = time.time()
+        if self._db is not None:
+            try:
+                return dict(
+                    self._db.execute(
+                        "SELECT source, COUNT(*) FROM cache "
+                        "WHERE expires <= ? AND expires + ? > ? GROUP BY source",
+                        (now, self.max_stale, now),
+                    ).fetchall()
+                )
+            except Exception:
+                pass
+        counts: Dict[str, int] = {}
+        for key, (expires, _, _) in self._memory.items():
+            if expires <= now < expires + self.max_stale:
+                source = key.rsplit(":", 1)[0]
+                counts[source] = counts.get(source, 0) + 1
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计
+        """
+        with self._lock:
+            stale_entries = self._stale_entries()
+            sources = {}
+            for source, stats in self._stats.items():
+                hits = stats["memory_hits"] + stats["disk_hits"] + stats["stale_hits"]
+                total = hits + stats["misses"]
+                sources[source] = {
+                    **stats,
+                    "ttl": self._ttls.get(source) or self.ttl,
+                    "hit_rate": hits / total if total else 0.0,
+                    "stale_entries": stale_entries.get(source, 0),
+                }
+            disk_entries = 0
+            if self._db is not None:
+                try:
+                    disk_entries = self._db.execute(
+                        "SELECT COUNT(*) FROM cache"
+                    ).fetchone()[0]
+                except Exception:
+                    pass
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": disk_entries,
+                "stale_entries": sum(stale_entries.values()),
+                "sources": sources,
+            }
+
+
+class ConvertedCache:
+    """
+    转换结果缓存
+
+    按请求参数缓存由接口数据转换得到的 MediaInfo 列表，同时记录所依据的接口数据对象；
+    接口数据未变化时直接返回已转换的结果，刷新或从磁盘读取后得到新的数据对象，再重新转换
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        # 键 → (接口数据, 转换结果)
+        self._items: "OrderedDict[Hashable, Tuple[Any, List[Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, raw: Any, convert: Callable[[], List[Any]]) -> List[Any]:
+        """
+        获取转换结果
+
+        :param key: 请求参数，如 (类型, 过滤参数, 页码, 数量)
+        :param raw: 接口数据，缓存命中时为同一个对象
+        :param convert: 转换函数
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] is raw:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return list(item[1])
+            self.misses += 1
+        results = convert()
+        with self._lock:
+            self._items[key] = (raw, results)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return list(results)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class BaseUiCache:
+    """
+    过滤参数 UI 磁盘缓存，插件载入时只读取磁盘，过期或缺失时在后台并发获取各分类刷新
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        name: str,
+        channels: Dict[str, str],
+        fetch: Callable[[str], List[dict]],
+        ttl: float = 24 * 3600,
+        retry_interval: float = 300,
+    ):
+        """
+        :param path: 缓存文件
+        :param name: 平台名称，用于日志
+        :param channels: 分类 → 分类名称，按此顺序生成 UI
+        :param fetch: 获取单个分类过滤参数 UI 的函数，参数为分类
+        :param ttl: 有效期，单位秒
+        :param retry_interval: 后台刷新失败后的重试间隔，单位秒
+        """
+        self.path = path
+        self.name = name
+        self.channels = channels
+        self.fetch = fetch
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.data: Dict[str, List[dict]] = {}
+        self.updated_at = 0.0
+        self._attempted_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.data = data.get("channels") or {}
+            self.updated_at = float(data.get("updated_at") or 0)
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logger.warn(f"读取{self.name}过滤参数缓存失败：{err}")
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"updated_at": self.updated_at, "channels": self.data},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
+
+    @property
+    def expired(self) -> bool:
+        return time.time() - self.updated_at > self.ttl or any(
+            key not in self.data for key in self.channels
+        )
+
+    @property
+    def ui(self) -> List[dict]:
+        return [item for key in self.channels for item in self.data.get(key) or []]
+
+    def fetch_all(self, channels: Optional[List[str]] = None) -> Dict[str, List[dict]]:
+        """
+        并发获取各分类的过滤参数 UI，获取失败的分类不在结果中
+        """
+        channels = channels or list(self.channels)
+        result = {}
+        with ThreadPoolExecutor(max_workers=len(channels)) as executor:
+            futures = {key: executor.submit(self.fetch, key) for key in channels}
+            for key, future in futures.items():
+                try:
+                    result[key] = future.result()
+                except Exception as err:
+                    logger.error(
+                        f"获取{self.name}{self.channels.get(key, key)}过滤参数失败：{err}"
+                    )
+        return result
+
+    def refresh(self):
+        """
+        刷新缓存，获取失败的分类保留旧数据
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            data = self.fetch_all()
+            if not data:
+                return
+            self.data = {**self.data, **data}
+            self.updated_at = time.time()
+            self.save()
+            logger.info(f"{self.name}过滤参数已更新：{len(data)}/{len(self.channels)} 个分类")
+        except Exception as err:
+            logger.error(f"更新{self.name}过滤参数失败：{err}")
+        finally:
+            self._lock.release()
+
+    def refresh_in_background(self):
+        # 获取失败后 retry_interval 秒内不再重试
+        if time.time() - self._attempted_at < self.retry_interval:
+            return
+        self._attempted_at = time.time()
+        threading.Thread(
+            target=self.refresh, name="discover-base-ui", daemon=True
+        ).start()
+
+
+def stats_card(title: str, items: Dict[str, Any]) -> dict:
+    """
+    统计卡片
+    """
+    return {
+        "component": "VCol",
+        "props": {"cols": 12, "md": 6},
+        "content": [
+            {
+                "component": "VCard",
+                "props": {"variant": "tonal"},
+                "content": [
+                    {"component": "VCardTitle", "text": title},
+                    {
+                        "component": "VTable",
+                        "props": {"hover": True, "density": "compact"},
+                        "content": [
+                            {
+                                "component": "tbody",
+                                "content": [
+                                    {
+                                        "component": "tr",
+                                        "content": [
+                                            {"component": "td", "text": key},
+                                            {"component": "td", "text": str(value)},
+                                        ],
+                                    }
+                                    for key, value in items.items()
+                                ],
+                            }
+                        ],
+                    },
+                ],
+            }
+        ],
+    }
+
+
+def cache_stats_cards(
+    cache: DiscoverCache, converted: Optional[ConvertedCache] = None
+) -> list:
+    """
+    缓存统计卡片
+    """
+    stats = cache.stats()
+    items = {
+        "内存条目": stats["memory_entries"],
+        "内存占用": f"{stats['memory_bytes'] / (1 << 20):.2f} / {cache.max_bytes / (1 << 20):.0f} MB",
+        "磁盘条目": stats["disk_entries"],
+        "过期条目": stats["stale_entries"],
+        "过期数据最长使用": f"{cache.max_stale / 3600:g} 小时",
+    }
+    if converted is not None:
+        total = converted.hits + converted.misses
+        items["转换结果命中率"] = (
+            f"{converted.hits / total:.1%}（{converted.hits}/{total}）" if total else "-"
+        )
+    cards = [stats_card("探索缓存", items)]
+    for source, item in stats["sources"].items():
+        cards.append(
+            stats_card(
+                f"探索缓存 {source}",
+                {
+                    "有效期": f"{item['ttl'] / 60:.0f} 分钟",
+                    "状态": (
+                        f"过期，{item['stale_entries']} 条正在返回旧数据"
+                        if item["stale_entries"]
+                        else "正常"
+                    ),
+                    "内存命中": item["memory_hits"],
+                    "磁盘命中": item["disk_hits"],
+                    "过期命中": item["stale_hits"],
+                    "未命中": item["misses"],
+                    "后台刷新": f"{item['refreshes']} 次，失败 {item['refresh_errors']} 次",
+                    "预取": f"{item['prefetches']} 次，跳过 {item['prefetch_skips']} 次",
+                    "命中率": f"{item['hit_rate']:.1%}",
+                },
+            )
+        )
+    return cards
@@ -1,6 +1,4 @@
-from typing import Any, List, Dict, Tuple
-
-from cachetools import cached, TTLCache
+from typing import Any, List, Dict, Tuple, Optional
 
 from app import schemas
 from app.core.config import settings
@@ -9,7 +7,10 @@ from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
-from app.utils.http import RequestUtils
+
+from .discovercache import ConvertedCache, DiscoverCache, cache_stats_cards
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
 
 
 CHANNEL_PARAMS = {
@@ -722,6 +723,26 @@ def variety_ui():
     return ui
 
 
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("api.bilibili.com",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "哔哩哔哩"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "tv": {"mtype": "tv"},
+    "movie": {"mtype": "movie"},
+    "anime": {"mtype": "bangumi"},
+    "variety": {"mtype": "variety"},
+    "documentary": {"mtype": "documentary"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+# 转换结果缓存
+CONVERTED = ConvertedCache()
+
+
 class BilibiliDiscover(_PluginBase):
     # 插件名称
     plugin_name = "哔哩哔哩探索"
@@ -730,7 +751,7 @@ class BilibiliDiscover(_PluginBase):
     # 插件图标
     plugin_icon = "Bilibili_E.png"
     # 插件版本
-    plugin_version = "1.0.2"
+    plugin_version = "1.0.12"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -744,10 +765,26 @@ class BilibiliDiscover(_PluginBase):
 
     # 私有属性
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    _max_stale = 2
+    _prefetch = False
 
     def init_plugin(self, config: dict = None):
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
+            self._prefetch = config.get("prefetch")
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.bilibili_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -764,8 +801,8 @@ class BilibiliDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "哔哩哔哩探索数据源",
                 "description": "获取哔哩哔哩探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -790,17 +827,54 @@ class BilibiliDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "prefetch",
+                                            "label": "预取下一页",
+                                            "hint": "浏览时在后台提前获取下一页数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "prefetch": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS)
+                + cache_stats_cards(CACHE, CONVERTED),
+            }
+        ]
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("bilibili")
     def __request(
         self, mtype: str, page_num: int, page_size: int, **kwargs
     ) -> List[schemas.MediaInfo]:
@@ -821,10 +895,7 @@ class BilibiliDiscover(_PluginBase):
         }
         if kwargs:
             params.update(kwargs)
-        res = RequestUtils(headers=headers).get_res(
-            api_url,
-            params=params,
-        )
+        res = get_client().get(api_url, headers=headers, params=params)
         if res is None:
             raise Exception("无法连接哔哩哔哩，请检查网络连接！")
         if not res.ok:
@@ -919,20 +990,27 @@ class BilibiliDiscover(_PluginBase):
             if producer_id:
                 params.update({"producer_id": producer_id})
             result = self.__request(**params)
+            if self._prefetch and result:
+                CACHE.prefetch(self.__request, **{**params, "page_num": page + 1})
         except Exception as err:
             logger.error(str(err))
             return []
         if not result:
             return []
-        if (
-            mtype == "movie"
-            or (mtype == "bangumi" and str(season_version) == "2")
-            or (mtype == "documentary" and str(style_id) == "-10")
-        ):
-            results = [__movie_to_media(movie) for movie in result]
-        else:
-            results = [__series_to_media(series) for series in result]
-        return results
+
+        def convert() -> List[schemas.MediaInfo]:
+            if (
+                mtype == "movie"
+                or (mtype == "bangumi" and str(season_version) == "2")
+                or (mtype == "documentary" and str(style_id) == "-10")
+            ):
+                results = [__movie_to_media(movie) for movie in result]
+            else:
+                results = [__series_to_media(series) for series in result]
+            return results
+
+        # 接口数据未变化时直接返回已转换的结果
+        return CONVERTED.get((mtype, tuple(sorted(params.items()))), result, convert)
 
     @staticmethod
     def bilibili_filter_ui() -> List[dict]:
@@ -1203,44 +1281,47 @@ class BilibiliDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        bilibili_source = schemas.DiscoverMediaSource(
-            name="哔哩哔哩",
-            mediaid_prefix="bilibili",
-            api_path=f"plugin/BilibiliDiscover/bilibili_discover?apikey={settings.API_TOKEN}",
-            filter_params={
-                "mtype": "tv",
-                "release_date": None,
-                "year": None,
-                "sort": None,
-                "season_status": None,
-                "style_id": None,
-                "season_month": None,
-                "_copyright": None,
-                "is_finish": None,
-                "area": None,
-                "spoken_language_type": None,
-                "season_version": None,
-                "order": None,
-                "producer_id": None,
-            },
-            filter_ui=self.bilibili_filter_ui(),
-            depends={
-                "release_date": ["mtype"],
-                "year": ["mtype"],
-                "sort": ["mtype"],
-                "season_status": ["mtype"],
-                "style_id": ["mtype"],
-                "season_month": ["mtype"],
-                "_copyright": ["mtype"],
-                "is_finish": ["mtype"],
-                "area": ["mtype"],
-                "spoken_language_type": ["mtype"],
-                "season_version": ["mtype"],
-                "edition": ["mtype"],
-                "order": ["mtype"],
-                "producer_id": ["mtype"],
-            },
-        )
+        key = (settings.API_TOKEN,)
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="哔哩哔哩",
+                mediaid_prefix="bilibili",
+                api_path=f"plugin/BilibiliDiscover/bilibili_discover?apikey={settings.API_TOKEN}",
+                filter_params={
+                    "mtype": "tv",
+                    "release_date": None,
+                    "year": None,
+                    "sort": None,
+                    "season_status": None,
+                    "style_id": None,
+                    "season_month": None,
+                    "_copyright": None,
+                    "is_finish": None,
+                    "area": None,
+                    "spoken_language_type": None,
+                    "season_version": None,
+                    "order": None,
+                    "producer_id": None,
+                },
+                filter_ui=self.bilibili_filter_ui(),
+                depends={
+                    "release_date": ["mtype"],
+                    "year": ["mtype"],
+                    "sort": ["mtype"],
+                    "season_status": ["mtype"],
+                    "style_id": ["mtype"],
+                    "season_month": ["mtype"],
+                    "_copyright": ["mtype"],
+                    "is_finish": ["mtype"],
+                    "area": ["mtype"],
+                    "spoken_language_type": ["mtype"],
+                    "season_version": ["mtype"],
+                    "edition": ["mtype"],
+                    "order": ["mtype"],
+                    "producer_id": ["mtype"],
+                },
+            )
+        bilibili_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [bilibili_source]
         else:
@@ -1250,4 +1331,6 @@ class BilibiliDiscover(_PluginBase):
         """
         退出插件
         """
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
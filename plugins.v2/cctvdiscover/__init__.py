@@ -2,8 +2,6 @@ import re
 from typing import Any, List, Dict, Tuple, Optional
 from dataclasses import dataclass
 
-from cachetools import cached, TTLCache
-
 from app import schemas
 from app.core.config import settings
 from app.core.event import eventmanager, Event
@@ -11,7 +9,10 @@ from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
-from app.utils.http import RequestUtils
+
+from .discovercache import ConvertedCache, DiscoverCache, cache_stats_cards
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
 
 
 @dataclass
@@ -39,6 +40,25 @@ class VideoAlbumList:
     data: VideoAlbumListData
 
 
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("api.cntv.cn",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "CCTV"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "tv": {"fc": "电视剧"},
+    "movie": {"fc": "电影"},
+    "anime": {"fc": "动画片"},
+    "documentary": {"fc": "纪录片"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+# 转换结果缓存
+CONVERTED = ConvertedCache()
+
+
 class CCTVDiscover(_PluginBase):
     # 插件名称
     plugin_name = "CCTV探索"
@@ -47,7 +67,7 @@ class CCTVDiscover(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DDS-Derek/MoviePilot-Plugins/main/icons/CCTV_A.png"
     # 插件版本
-    plugin_version = "1.2"
+    plugin_version = "1.13"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -62,10 +82,26 @@ class CCTVDiscover(_PluginBase):
     # 私有属性
     _base_api = "https://api.cntv.cn/newVideoset/getCboxVideoAlbumList"
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    _max_stale = 2
+    _prefetch = False
 
     def init_plugin(self, config: dict = None):
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
+            self._prefetch = config.get("prefetch")
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.cctv_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -82,8 +118,8 @@ class CCTVDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "CCTV探索数据源",
                 "description": "获取CCTV探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -108,15 +144,52 @@ class CCTVDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "prefetch",
+                                            "label": "预取下一页",
+                                            "hint": "浏览时在后台提前获取下一页数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "prefetch": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS)
+                + cache_stats_cards(CACHE, CONVERTED),
+            }
+        ]
 
     def _parse_response(self, data: Dict[str, Any]) -> VideoAlbumList:
         """
@@ -143,10 +216,10 @@ class CCTVDiscover(_PluginBase):
             data=VideoAlbumListData(total=data_body.get("total", 0), list=albums)
         )
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("cctv")
     def __request(
         self, page_num: int, page_size: int, **kwargs
-    ) -> List[schemas.MediaInfo]:
+    ) -> Dict[str, Any]:
         """
         请求CCTV API
         """
@@ -163,15 +236,12 @@ class CCTVDiscover(_PluginBase):
             "User-Agent": settings.USER_AGENT,
             "Referer": "https://app.cctv.com/",
         }
-        res = RequestUtils(headers=headers).get_res(
-            api_url,
-            params=params,
-        )
+        res = get_client().get(api_url, headers=headers, params=params)
         if res is None:
             raise Exception("无法连接CCTV，请检查网络连接！")
         if not res.ok:
             raise Exception(f"请求CCTV API失败：{res.text}")
-        return self._parse_response(res.json())
+        return res.json()
 
     def cctv_discover(
         self,
@@ -224,17 +294,30 @@ class CCTVDiscover(_PluginBase):
                 params.update({"fl": fl})
             if channel:
                 params.update({"channel": channel})
-            result = self.__request(**params)
+            data = self.__request(**params)
+            if self._prefetch and (data.get("data") or {}).get("list"):
+                CACHE.prefetch(self.__request, **{**params, "page_num": page + 1})
         except Exception as err:
             logger.error(str(err))
             return []
-        if not result:
+        if not data:
+            return []
+
+        def convert() -> List[schemas.MediaInfo]:
+            result = self._parse_response(data)
+            if fc == "电影":
+                results = [__movie_to_media(movie) for movie in result.data.list[:]]
+            else:
+                results = [__series_to_media(series) for series in result.data.list[:]]
+            return results
+
+        try:
+            # 接口数据未变化时直接返回已转换的结果
+            return CONVERTED.get(tuple(sorted(params.items())), data, convert)
+        except Exception as err:
+            # 接口返回的数据结构异常
+            logger.error(str(err))
             return []
-        if fc == "电影":
-            results = [__movie_to_media(movie) for movie in result.data.list[:]]
-        else:
-            results = [__series_to_media(series) for series in result.data.list[:]]
-        return results
 
     @staticmethod
     def cctv_filter_ui() -> List[dict]:
@@ -681,27 +764,30 @@ class CCTVDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        cctv_source = schemas.DiscoverMediaSource(
-            name="CCTV",
-            mediaid_prefix="cctv",
-            api_path=f"plugin/CCTVDiscover/cctv_discover?apikey={settings.API_TOKEN}",
-            filter_params={
-                "fc": "电视剧",
-                "area": None,
-                "sc": None,
-                "year": None,
-                "fl": None,
-                "channel": None,
-            },
-            filter_ui=self.cctv_filter_ui(),
-            depends={
-                "area": ["fc"],
-                "sc": ["fc"],
-                "year": ["fc"],
-                "fl": ["fc"],
-                "channel": ["fc"],
-            },
-        )
+        key = (settings.API_TOKEN,)
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="CCTV",
+                mediaid_prefix="cctv",
+                api_path=f"plugin/CCTVDiscover/cctv_discover?apikey={settings.API_TOKEN}",
+                filter_params={
+                    "fc": "电视剧",
+                    "area": None,
+                    "sc": None,
+                    "year": None,
+                    "fl": None,
+                    "channel": None,
+                },
+                filter_ui=self.cctv_filter_ui(),
+                depends={
+                    "area": ["fc"],
+                    "sc": ["fc"],
+                    "year": ["fc"],
+                    "fl": ["fc"],
+                    "channel": ["fc"],
+                },
+            )
+        cctv_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [cctv_source]
         else:
@@ -711,4 +797,6 @@ class CCTVDiscover(_PluginBase):
         """
         退出插件
         """
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
@@ -0,0 +1,270 @@
+"""
+探索插件共享的 HTTP 客户端
+
+按上游主机复用 requests.Session 及其连接池（keep-alive），统一设置连接、读取超时，
+对连接错误和 429、5xx 响应进行有限次数的退避重试（带随机抖动），并限制每个主机的并发请求数。
+每个主机有一个熔断器：连续失败达到阈值后熔断，熔断期间直接抛出 CircuitOpenError，
+冷却时间过后只放行一个探测请求，成功则恢复，失败则继续熔断并延长冷却时间。
+各探索插件独立安装，本文件在每个探索插件中各有一份，客户端实例挂在 sys.modules 上，
+先载入的插件创建，后载入的插件直接复用，因此接口需保持一致
+"""
+import random
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.log import logger
+
+from .discovercache import stats_card
+
+# 客户端挂载的模块名
+CLIENT_MODULE = "_moviepilot_discover_http_client"
+# 客户端接口版本，接口变化时递增，旧版本实例会被替换
+CLIENT_VERSION = 2
+
+# 默认超时（连接，读取），单位秒
+DEFAULT_TIMEOUT = (5, 15)
+# 默认重试次数
+DEFAULT_RETRIES = 2
+# 每个主机的并发请求数
+HOST_CONCURRENCY = 8
+# 需要重试的响应状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# 连续失败多少次后熔断
+BREAKER_THRESHOLD = 5
+# 熔断后首次探测前的冷却时间，单位秒，探测失败后加倍
+BREAKER_COOLDOWN = 30
+# 冷却时间上限，单位秒
+BREAKER_MAX_COOLDOWN = 600
+
+
+class CircuitOpenError(Exception):
+    """
+    上游已熔断
+    """
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器，状态为 closed（正常）、open（熔断）、half_open（探测中）
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.total_failures = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        是否放行请求，冷却结束后只放行一个探测请求
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"探索接口 {self.host} 已恢复")
+            self.state = "closed"
+            self.failures = 0
+            self.cooldown = BREAKER_COOLDOWN
+
+    def failure(self, error: str):
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self.last_error = error
+            if self.state == "half_open":
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            elif self.state != "closed" or self.failures < BREAKER_THRESHOLD:
+                return
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            logger.warn(
+                f"探索接口 {self.host} 连续失败 {self.failures} 次，"
+                f"{self.cooldown:.0f} 秒内不再请求：{error}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == "open":
+                retry_in = max(self.cooldown - (time.monotonic() - self.opened_at), 0)
+            return {
+                "host": self.host,
+                "state": self.state,
+                "failures": self.failures,
+                "total_failures": self.total_failures,
+                "rejected": self.rejected,
+                "retry_in": retry_in,
+                "last_error": self.last_error,
+            }
+
+
+class DiscoverHttpClient:
+    """
+    按主机复用连接池的 HTTP 客户端
+    """
+
+    version = CLIENT_VERSION
+
+    def __init__(
+        self,
+        timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        host_concurrency: int = HOST_CONCURRENCY,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.host_concurrency = host_concurrency
+        self._lock = threading.Lock()
+        # 主机 → (会话, 并发限制, 熔断器)
+        self._hosts: Dict[
+            str, Tuple[requests.Session, threading.BoundedSemaphore, CircuitBreaker]
+        ] = {}
+
+    def _host(
+        self, url: str
+    ) -> Tuple[requests.Session, threading.BoundedSemaphore, CircuitBreaker]:
+        host = urlsplit(url).netloc
+        with self._lock:
+            item = self._hosts.get(host)
+            if item is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.host_concurrency
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                item = self._hosts[host] = (
+                    session,
+                    threading.BoundedSemaphore(self.host_concurrency),
+                    CircuitBreaker(host),
+                )
+            return item
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        retries: Optional[int] = None,
+        **kwargs,
+    ) -> Optional[requests.Response]:
+        """
+        发送请求，重试后仍失败时返回最后一次的响应，无法连接时返回 None，上游熔断时抛出 CircuitOpenError
+
+        :param timeout: 超时，不指定时使用默认值
+        :param retries: 重试次数，不指定时使用默认值
+        :param kwargs: 传给 requests 的其它参数，如 headers、params、json
+        """
+        session, semaphore, breaker = self._host(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.host} 暂时不可用，已跳过请求")
+        if breaker.state == "half_open":
+            # 探测请求不重试
+            retries = 0
+        timeout = timeout or self.timeout
+        retries = self.retries if retries is None else retries
+        response = None
+        error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                # 指数退避加随机抖动，避免多个请求同时重试
+                time.sleep(0.5 * 2 ** (attempt - 1) + random.uniform(0, 0.5))
+            try:
+                with semaphore:
+                    response = session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as err:
+                logger.debug(f"请求失败（第 {attempt + 1} 次）：{url}：{err}")
+                response, error = None, str(err)
+                continue
+            if response.status_code not in RETRY_STATUS:
+                breaker.success()
+                return response
+            error = f"HTTP {response.status_code}"
+            logger.debug(f"请求失败（第 {attempt + 1} 次）：{url}：{error}")
+        breaker.failure(error)
+        return response
+
+    def get(self, url: str, **kwargs) -> Optional[requests.Response]:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Optional[requests.Response]:
+        return self.request("POST", url, **kwargs)
+
+    def breakers(self) -> List[Dict[str, Any]]:
+        """
+        各主机熔断器状态
+        """
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return [breaker.stats() for _, _, breaker in hosts]
+
+    def close(self):
+        """
+        关闭所有连接
+        """
+        with self._lock:
+            hosts, self._hosts = self._hosts, {}
+        for session, _, _ in hosts.values():
+            session.close()
+
+
+def get_client() -> DiscoverHttpClient:
+    """
+    获取进程内共享的客户端
+    """
+    module = sys.modules.get(CLIENT_MODULE)
+    client: Any = getattr(module, "client", None)
+    if getattr(client, "version", 0) >= CLIENT_VERSION:
+        return client
+    module = ModuleType(CLIENT_MODULE)
+    module.client = DiscoverHttpClient()
+    # setdefault 保证并发载入时只保留一个实例
+    module = sys.modules.setdefault(CLIENT_MODULE, module)
+    if getattr(module.client, "version", 0) < CLIENT_VERSION:
+        module.client = DiscoverHttpClient()
+    return module.client
+
+
+def breaker_stats_cards(hosts: Tuple[str, ...]) -> List[dict]:
+    """
+    熔断器状态卡片
+
+    :param hosts: 只显示这些主机
+    """
+    states = {"closed": "正常", "open": "熔断", "half_open": "探测中"}
+    return [
+        stats_card(
+            f"探索接口 {item['host']}",
+            {
+                "状态": states.get(item["state"], item["state"]),
+                "连续失败": item["failures"],
+                "累计失败": item["total_failures"],
+                "熔断跳过": item["rejected"],
+                "恢复探测": f"{item['retry_in']:.0f} 秒后" if item["state"] == "open" else "-",
+                "最近错误": item["last_error"] or "-",
+            },
+        )
+        for item in get_client().breakers()
+        if item["host"] in hosts
+    ]
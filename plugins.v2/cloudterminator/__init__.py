@@ -17,7 +17,12 @@ from .clouddisk.u115 import u115_manager
 from .db_manager import ct_db_manager
 from .db_manager.init import init_db, update_db
 from .clouddisk.u115.strmhelper import U115StrmHelper
+from .db_manager.u115hashcache_oper import U115HashCacheOper
+from .db_manager.u115uploadledger_oper import U115UploadLedgerOper
 from .clouddisk.u115.pan302server import Pan115 as U115_302Server
+from .clouddisk.u115.pan302supervisor import Pan302Supervisor
+from .clouddisk.u115.autoupload import U115AutoUploader
+from .clouddisk.u115.clientregistry import get_registry
 from ...core.event import eventmanager, Event
 from ...schemas.types import EventType
 
@@ -62,6 +67,26 @@ class CloudTerminator(_PluginBase):
         'u115_path': None,
         'u115_strm_path': None,
         'u115_cookie': None,
+        'u115_302_host': '0.0.0.0',
+        'u115_302_port': 29876,
+        'u115_302_workers': 1,
+        'u115_302_log_level': 'info',
+        'u115_302_in_process': False,
+        'u115_302_health_interval': 10,
+        'u115_302_probe_pickcode': None,
+        'u115_302_log_max_size': 10,
+        'u115_302_log_backup_count': 5,
+        'u115_302_log_rotate_when': '',
+        'u115_302_access_log_sample': 1,
+        'u115_302_url_cache_size': 4096,
+        'u115_302_url_cache_bind_ua': True,
+        'u115_302_url': None,
+        'u115_upload_workers': 1,
+        'u115_auto_upload': False,
+        'u115_auto_upload_paths': '',
+        'u115_auto_upload_mode': 'fast',
+        'u115_auto_upload_workers': 2,
+        'u115_auto_upload_settle': 60,
 
         'u123_onlyonce': False,
         'u123_path': None,
@@ -116,10 +141,19 @@ class CloudTerminator(_PluginBase):
         # 302服务进程
         self._u115_302_server = None
         self._u115_302_process = None
+        self._u115_302_supervisor = None
         # 消息存储
         self.__messages = {}
         # 115网盘客户端
         self.__u115_client = None
+        self.__u115_client_cookie = None
+        # 上传任务
+        self.__u115_upload_lock = threading.Lock()
+        self.__u115_upload_status = {}
+        self.__u115_strm_helper = None
+        self.__u115_strm_helper_lock = threading.Lock()
+        # 自动上传
+        self._u115_auto_uploader = None
         # 初始化数据库
         self.init_database()
 
@@ -186,7 +220,15 @@ class CloudTerminator(_PluginBase):
             "description": "API说明"
         }]
         """
-        apis = []
+        apis = [
+            {
+                "path": "/u115_upload",
+                "endpoint": self.api_u115_upload,
+                "methods": ["POST"],
+                "summary": "上传到115网盘",
+                "description": "上传本地文件或目录到115网盘，完成一个文件即生成一个 STRM",
+            },
+        ]
         return apis
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
@@ -207,6 +249,22 @@ class CloudTerminator(_PluginBase):
             {"title": "不汇报", "value": "SILENCE"}
         ]
 
+        LogLevelOptions = [
+            {"title": level.upper(), "value": level}
+            for level in U115_302Server.log_levels
+        ]
+
+        LogRotateOptions = [
+            {"title": "按大小轮转", "value": ""},
+            {"title": "每小时", "value": "H"},
+            {"title": "每天", "value": "midnight"},
+        ]
+
+        AutoUploadModeOptions = [
+            {"title": "性能模式", "value": "fast"},
+            {"title": "兼容模式", "value": "compatibility"},
+        ]
+
         # Todo：空组件占位符
         under_development = [{
             'component': 'VEmptyState',
@@ -528,6 +586,399 @@ class CloudTerminator(_PluginBase):
                                                 },
                                             ]
                                         },
+                                        {
+                                            'component': 'VRow',
+                                            'props': {
+                                                'align': 'center',
+                                            },
+                                            'content': [
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_host',
+                                                                'label': '302 服务监听地址',
+                                                                'hint': '默认 0.0.0.0',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_port',
+                                                                'label': '302 服务端口',
+                                                                'type': 'number',
+                                                                'hint': '默认 29876',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_workers',
+                                                                'label': '302 服务进程数',
+                                                                'type': 'number',
+                                                                'hint': '并发播放较多时可适当调大，进程内运行时固定为 1',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VSelect',
+                                                            'props': {
+                                                                'model': 'u115_302_log_level',
+                                                                'label': '302 服务日志等级',
+                                                                'items': LogLevelOptions,
+                                                                'hint': '调试等级会显著降低性能',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VSwitch',
+                                                            'props': {
+                                                                'model': 'u115_302_in_process',
+                                                                'label': '进程内运行',
+                                                                'hint': '在 MoviePilot 进程内运行 302 服务，不再启动子进程',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_health_interval',
+                                                                'label': '健康检查间隔（秒）',
+                                                                'type': 'number',
+                                                                'hint': '302 服务异常时自动重启',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 12,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_probe_pickcode',
+                                                                'label': '健康检查 pickcode',
+                                                                'clearable': True,
+                                                                'hint': '填写后健康检查会请求该文件的真实 302 跳转并统计延迟，留空仅检查服务可达',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VSelect',
+                                                            'props': {
+                                                                'model': 'u115_302_log_rotate_when',
+                                                                'label': '日志轮转方式',
+                                                                'items': LogRotateOptions,
+                                                                'hint': '按时间轮转时忽略大小限制',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_log_max_size',
+                                                                'label': '单个日志大小（MB）',
+                                                                'type': 'number',
+                                                                'hint': '按大小轮转时生效',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_log_backup_count',
+                                                                'label': '日志保留份数',
+                                                                'type': 'number',
+                                                                'hint': '超出后删除最旧的日志',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_access_log_sample',
+                                                                'label': '访问日志采样率',
+                                                                'type': 'number',
+                                                                'hint': '0 ~ 1，生产环境可调低以减少日志量',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_url_cache_size',
+                                                                'label': '下载链接缓存条数',
+                                                                'type': 'number',
+                                                                'hint': '按 pickcode 缓存 302 地址，0 为关闭',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VSwitch',
+                                                            'props': {
+                                                                'model': 'u115_302_url_cache_bind_ua',
+                                                                'label': '缓存区分 User-Agent',
+                                                                'hint': '115 下载链接与 UA 绑定，建议开启',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 4,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_302_url',
+                                                                'label': '302 服务对外地址',
+                                                                'clearable': True,
+                                                                'hint': '写入 STRM 的地址，留空使用 http://本机:端口',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                            ]
+                                        },
+                                        {
+                                            'component': 'VRow',
+                                            'props': {
+                                                'align': 'center',
+                                            },
+                                            'content': [
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VSwitch',
+                                                            'props': {
+                                                                'model': 'u115_auto_upload',
+                                                                'label': '自动上传',
+                                                                'hint': '监控本地目录，文件写入完成后上传并生成 STRM',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VSelect',
+                                                            'props': {
+                                                                'model': 'u115_auto_upload_mode',
+                                                                'label': '监控模式',
+                                                                'items': AutoUploadModeOptions,
+                                                                'hint': '网络存储等不支持文件事件时使用兼容模式（轮询）',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_auto_upload_workers',
+                                                                'label': '并发上传数',
+                                                                'type': 'number',
+                                                                'hint': '同时上传的文件数',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_auto_upload_settle',
+                                                                'label': '写入完成判定（秒）',
+                                                                'type': 'number',
+                                                                'hint': '文件在该时间内无变化视为写入完成',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 3,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextField',
+                                                            'props': {
+                                                                'model': 'u115_upload_workers',
+                                                                'label': '上传线程数',
+                                                                'type': 'number',
+                                                                'hint': '上传目录时同时上传的文件数',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                                {
+                                                    'component': 'VCol',
+                                                    'props': {
+                                                        'cols': 12,
+                                                        'md': 9,
+                                                    },
+                                                    'content': [
+                                                        {
+                                                            'component': 'VTextarea',
+                                                            'props': {
+                                                                'model': 'u115_auto_upload_paths',
+                                                                'label': '自动上传目录',
+                                                                'rows': 3,
+                                                                'placeholder': '本地目录#网盘目录，一行一个',
+                                                                'hint': '例如 /media/upload#/媒体库/电影',
+                                                                'persistent-hint': True,
+                                                            }
+                                                        }
+                                                    ]
+                                                },
+                                            ]
+                                        },
                                     ],
                                 },
                                 {
@@ -580,11 +1031,145 @@ class CloudTerminator(_PluginBase):
                     self._scheduler.shutdown(wait=False)
                     self._event.clear()
                 self._scheduler = None
+            self.stop_u115_auto_upload()
+            self.close_u115_client()
             self.close_database()
-            self._u115_302_server.stop(self._u115_302_process)
+            self.stop_302_server()
         except Exception as e:
             logger.info(f"插件停止错误: {str(e)}", exc_info=True)
 
+    """ page """
+
+    @staticmethod
+    def __stats_card(title: str, items: Dict[str, Any]) -> dict:
+        """
+        构建统计信息卡片
+        """
+        return {
+            'component': 'VCol',
+            'props': {
+                'cols': 12,
+                'md': 6,
+            },
+            'content': [
+                {
+                    'component': 'VCard',
+                    'props': {
+                        'variant': 'tonal',
+                    },
+                    'content': [
+                        {
+                            'component': 'VCardTitle',
+                            'text': title,
+                        },
+                        {
+                            'component': 'VTable',
+                            'props': {
+                                'hover': True,
+                                'density': 'compact',
+                            },
+                            'content': [
+                                {
+                                    'component': 'tbody',
+                                    'content': [
+                                        {
+                                            'component': 'tr',
+                                            'content': [
+                                                {'component': 'td', 'text': key},
+                                                {'component': 'td', 'text': str(value)},
+                                            ]
+                                        }
+                                        for key, value in items.items()
+                                    ]
+                                }
+                            ]
+                        }
+                    ]
+                }
+            ]
+        }
+
+    def __u115_page(self) -> List[dict]:
+        """
+        115网盘 统计页面
+        """
+        if not self._u115_302_supervisor:
+            return [self.__stats_card('115 302 服务', {'状态': '未运行'})]
+
+        def fmt_ms(value: Optional[float]) -> str:
+            return '-' if value is None else f"{value:.1f} ms"
+
+        def fmt_time(value: Optional[float]) -> str:
+            return '-' if not value else datetime.fromtimestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+
+        def fmt_seconds(value: Optional[float]) -> str:
+            return '-' if value is None else str(timedelta(seconds=int(value)))
+
+        stats = self._u115_302_supervisor.stats()
+        page = [
+            self.__stats_card('115 302 服务', {
+                '状态': '正常' if stats['healthy'] else '异常',
+                '运行时长': str(timedelta(seconds=stats['uptime'])),
+                '重启次数': stats['restart_count'],
+                'P50 延迟': fmt_ms(stats['p50']),
+                'P99 延迟': fmt_ms(stats['p99']),
+                '采样数': stats['samples'],
+                '最近错误': stats['last_error'] or '-',
+            })
+        ]
+        if self._u115_auto_uploader:
+            auto_stats = self._u115_auto_uploader.stats()
+            page.append(self.__stats_card('115 自动上传', {
+                '状态': '运行中' if auto_stats['running'] else '已停止',
+                '监控方式': auto_stats['mode'],
+                '等待上传': auto_stats['pending'],
+                '正在上传': auto_stats['uploading'],
+                '已上传': f"{auto_stats['uploaded_files']} 个，{auto_stats['uploaded_bytes'] / (1 << 30):.2f} GB",
+                '失败': auto_stats['failed_files'],
+                '平均吞吐': f"{auto_stats['throughput'] / (1 << 20):.2f} MB/s",
+                '单文件耗时 P50': fmt_seconds(auto_stats['latency_p50']),
+                '单文件耗时 P95': fmt_seconds(auto_stats['latency_p95']),
+            }))
+        for client in get_registry().health():
+            page.append(self.__stats_card(f"115 客户端（UID {client['uid']}）", {
+                '状态': '已连接' if client['connected'] else '未连接',
+                '使用插件': '、'.join(client['owners']) or '-',
+                # 同一账号的各库客户端共用一个会话，连接池与 cookie 共享
+                '共享会话': '、'.join(client['kinds']) or '-',
+                '创建时间': fmt_time(client['created']),
+                '最近使用': fmt_time(client['last_used']),
+                '获取次数': client['uses'],
+                '错误次数': client['errors'],
+                '最近错误': client['last_error'] or '-',
+            }))
+        upload_status = self.__u115_upload_status
+        if upload_status:
+            progress = upload_status.get('progress') or {}
+            total = progress.get('total') or 0
+            page.append(self.__stats_card('115 上传任务', {
+                '状态': '运行中' if self.__u115_upload_lock.locked() else '已结束',
+                '上传路径': upload_status['src_path'],
+                '网盘路径': upload_status['dst_path'],
+                '进度': progress.get('description') or '-',
+                '已上传': f"{progress.get('completed', 0) / (1 << 30):.2f} / {total / (1 << 30):.2f} GB",
+                '速率': f"{progress.get('speed', 0) / (1 << 20):.2f} MB/s",
+                '已生成 STRM': upload_status['strm'],
+            }))
+        cache_stats = self._u115_302_server.cache_stats()
+        if cache_stats:
+            server = self._u115_302_server
+            workers = 1 if server.in_process else server.workers
+            page.append(self.__stats_card('115 302 链接缓存', {
+                # 每个 worker 进程各自缓存，统计来自处理本次查询的 worker
+                '统计范围': f'单个 worker（共 {workers} 个，各自独立缓存）' if workers > 1 else '全部',
+                '缓存条目': f"{cache_stats['size']} / {cache_stats['maxsize']}",
+                '命中': cache_stats['hits'],
+                '未命中': cache_stats['misses'],
+                '命中率': f"{cache_stats['hit_rate']:.1%}",
+                '淘汰': cache_stats['evictions'],
+            }))
+        return page
+
     """ start """
 
     def start(self):
@@ -592,8 +1177,41 @@ class CloudTerminator(_PluginBase):
         启动插件
         """
         try:
-            self._u115_302_server = U115_302Server(self._u115_cookie)
-            self._u115_302_process = self._u115_302_server.start(f"{self.__logs_dir}/{self.__302_server_log_filename}")
+            self.stop_302_server()
+            if not self._enabled:
+                self.stop_u115_auto_upload()
+                return
+            if not self._u115_cookie:
+                self.stop_u115_auto_upload()
+                logger.warning("未配置 115 cookie，302 服务未启动")
+                return
+            self._u115_302_server = U115_302Server(
+                self._u115_cookie,
+                host=self._u115_302_host,
+                port=self._u115_302_port,
+                workers=self._u115_302_workers,
+                log_level=self._u115_302_log_level,
+                in_process=self._u115_302_in_process,
+                log_max_bytes=int(float(self._u115_302_log_max_size or 10) * (1 << 20)),
+                log_backup_count=self._u115_302_log_backup_count,
+                log_rotate_when=self._u115_302_log_rotate_when,
+                access_log_sample=self._u115_302_access_log_sample,
+                url_cache_size=self._u115_302_url_cache_size,
+                url_cache_bind_ua=self._u115_302_url_cache_bind_ua,
+            )
+            server = self._u115_302_server
+            if not self.__start_302_server(server):
+                logger.warning("302 服务未能就绪，将由守护线程继续重试")
+            self._u115_302_supervisor = Pan302Supervisor(
+                host=server.probe_host,
+                port=server.port,
+                is_alive=lambda: server.is_alive(self._u115_302_process),
+                restart=self.__restart_302_server,
+                interval=self._u115_302_health_interval,
+                probe_pickcode=self._u115_302_probe_pickcode,
+            )
+            self._u115_302_supervisor.start()
+            self.start_u115_auto_upload()
         except Exception as e:
             logger.info(f"插件启动错误: {str(e)}", exc_info=True)
             if self._enabled:
@@ -603,26 +1221,222 @@ class CloudTerminator(_PluginBase):
         finally:
             self.__update_config()
 
+    def __start_302_server(self, server: U115_302Server) -> bool:
+        """
+        启动 302 服务并等待就绪
+        """
+        process = server.start(f"{self.__logs_dir}/{self.__302_server_log_filename}")
+        if self._u115_302_server is not server:
+            # 启动期间插件已停止或重新加载配置，新进程不再使用
+            server.stop(process)
+            return False
+        self._u115_302_process = process
+        return server.wait_ready(process)
+
+    def __restart_302_server(self) -> bool:
+        """
+        重启 302 服务，供守护线程调用
+        """
+        server, process = self._u115_302_server, self._u115_302_process
+        if server is None:
+            return False
+        server.stop(process)
+        return self.__start_302_server(server)
+
+    def stop_302_server(self):
+        """
+        停止 302 服务
+        """
+        if self._u115_302_supervisor:
+            self._u115_302_supervisor.stop()
+        self._u115_302_supervisor = None
+        if self._u115_302_server:
+            self._u115_302_server.stop(self._u115_302_process)
+        self._u115_302_server = None
+        self._u115_302_process = None
+
+    def start_u115_auto_upload(self):
+        """
+        启动本地目录自动上传
+        """
+        self.stop_u115_auto_upload()
+        if not self._u115_auto_upload or not self._u115_auto_upload_paths:
+            return
+        folders = []
+        for line in self._u115_auto_upload_paths.splitlines():
+            if '#' not in line:
+                continue
+            local, remote = (part.strip() for part in line.split('#', 1))
+            if local and remote:
+                folders.append((local, remote))
+        if not folders:
+            logger.warning("未配置有效的自动上传目录")
+            return
+        ledger = U115UploadLedgerOper()
+        self._u115_auto_uploader = U115AutoUploader(
+            folders,
+            upload=self.__u115_upload_file,
+            is_uploaded=ledger.is_uploaded,
+            mode=self._u115_auto_upload_mode,
+            workers=int(self._u115_auto_upload_workers or 1),
+            settle=float(self._u115_auto_upload_settle or 0),
+        )
+        self._u115_auto_uploader.start()
+
+    def stop_u115_auto_upload(self):
+        """
+        停止本地目录自动上传
+        """
+        if self._u115_auto_uploader:
+            self._u115_auto_uploader.stop()
+        self._u115_auto_uploader = None
+
+    def __u115_upload_file(self, path: str, remote_dir: str) -> bool:
+        """
+        自动上传单个文件，上传完成后生成 STRM
+        """
+        from .clouddisk.u115.upload import upload_files
+
+        if not self.get_u115_client():
+            raise ValueError('115 网盘未连接')
+        try:
+            result = upload_files(
+                self.__u115_client,
+                path,
+                remote_dir,
+                max_workers=int(self._u115_upload_workers or 1),
+                headless=True,
+                hash_cache=U115HashCacheOper(),
+                ledger=U115UploadLedgerOper(),
+                on_success=self.__u115_generate_strm,
+            )
+        except Exception as e:
+            get_registry().report_error('p115', self._u115_cookie, e)
+            raise
+        return not result.tasks['failed'] and not result.tasks['unfinished']
+
     """ 115云盘 """
 
     def get_u115_client(self):
         """
         获取115云盘客户端
         """
+        if self.__u115_client_cookie != self._u115_cookie:
+            # cookie 已变更，释放旧客户端
+            self.close_u115_client()
         if not self._u115_cookie:
             return None
         if not self.__u115_client:
-            self.__u115_client = u115_manager.connect(self._u115_cookie)
-        return True
+            # 与同一账号的其他 115 插件共用会话（连接池与 cookie），首次使用时才创建
+            self.__u115_client = get_registry().get(
+                'p115', self._u115_cookie, u115_manager.connect, owner=self.__class__.__name__
+            )
+            self.__u115_client_cookie = self._u115_cookie if self.__u115_client else None
+        return self.__u115_client
 
     def close_u115_client(self):
         """
         关闭115云盘客户端
         """
-        if self._u115_client:
-            u115_manager.disconnect(self.__u115_client)
+        # 客户端可能仍被其他插件使用，只释放引用，不登出
+        if self.__u115_client_cookie:
+            get_registry().release('p115', self.__u115_client_cookie, owner=self.__class__.__name__)
         # 清除客户端的缓存
         self.__u115_client = None
+        self.__u115_client_cookie = None
+        # STRM 生成器持有旧客户端，随客户端一起重建
+        with self.__u115_strm_helper_lock:
+            self.__u115_strm_helper = None
+
+    @property
+    def u115_302_url(self) -> str:
+        """
+        写入 STRM 的 302 服务地址
+        """
+        if self._u115_302_url:
+            return self._u115_302_url.rstrip('/')
+        return f"http://127.0.0.1:{self._u115_302_port}"
+
+    def api_u115_upload(self, src_path: str, dst_path: str = None) -> dict:
+        """
+        API：后台启动上传任务
+        """
+        if not src_path:
+            return {'code': 1, 'msg': '缺少上传路径'}
+        dst_path = dst_path or self._u115_path
+        if not dst_path:
+            return {'code': 1, 'msg': '缺少网盘路径'}
+        if self.__u115_upload_lock.locked():
+            return {'code': 1, 'msg': '已有上传任务正在运行'}
+        threading.Thread(
+            target=self.u115_upload,
+            args=(src_path, dst_path),
+            name='cloudterminator-u115-upload',
+            daemon=True,
+        ).start()
+        return {'code': 0, 'msg': '上传任务已启动'}
+
+    def __u115_generate_strm(self, task, remote_path: str) -> bool:
+        """
+        为上传完成的文件生成 STRM
+        """
+        if not (self._u115_strm_path and self._u115_path) or not task.pickcode:
+            return False
+        media_root = self._u115_path.rstrip('/')
+        if not remote_path.startswith(media_root + '/'):
+            logger.debug(f"{remote_path} 不在网盘媒体路径下，不生成 STRM")
+            return False
+        # 上传并发进行，创建时加锁；客户端重建时在 close_u115_client 中重置
+        with self.__u115_strm_helper_lock:
+            if not self.__u115_strm_helper:
+                self.__u115_strm_helper = U115StrmHelper(f"{self.__db_path}/file_list.db", self.__u115_client)
+            strm_helper = self.__u115_strm_helper
+        return strm_helper.generate_strm_files(
+            remote_path[len(media_root) + 1:],
+            self._u115_strm_path,
+            task.pickcode,
+            self.u115_302_url,
+        )
+
+    @logs_oper("115云盘上传")
+    def u115_upload(self, src_path: str, dst_path: str) -> bool:
+        """
+        上传到115网盘，每个文件上传成功后立即生成 STRM
+        """
+        # 上传模块依赖较多，仅在使用时载入
+        from .clouddisk.u115.upload import upload_files
+
+        with self.__u115_upload_lock:
+            if not self.get_u115_client():
+                raise ValueError('115 网盘未连接')
+            status = self.__u115_upload_status = {
+                'src_path': src_path,
+                'dst_path': dst_path,
+                'start_time': datetime.now(),
+                'strm': 0,
+                'progress': None,
+            }
+
+            def on_success(task, remote_path: str):
+                if self.__u115_generate_strm(task, remote_path):
+                    status['strm'] += 1
+
+            def on_progress(snapshot: dict):
+                status['progress'] = snapshot
+
+            result = upload_files(
+                self.__u115_client,
+                src_path,
+                dst_path,
+                max_workers=int(self._u115_upload_workers or 1),
+                headless=True,
+                hash_cache=U115HashCacheOper(),
+                ledger=U115UploadLedgerOper(),
+                on_progress=on_progress,
+                on_success=on_success,
+            )
+            status['stats'] = result.stats
+            return result.stats.get('is_completed', False)
 
     # todo：2.2.7新增整理链式，后续替换
     @eventmanager.register(EventType.TransferComplete)
@@ -0,0 +1,359 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Optional
+
+from app.log import logger
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+except ImportError:
+    FileSystemEventHandler, Observer, PollingObserver = object, None, None
+
+
+# 不上传的文件
+IGNORE_NAMES = (".DS_Store", "Thumbs.db")
+IGNORE_SUFFIXES = (".part", ".!qB", ".tmp", ".aria2", ".crdownload")
+
+# 正在上传的文件挂载的模块名
+RUNNING_MODULE = "_moviepilot_u115_autoupload_running"
+
+
+def _shared_running() -> ModuleType:
+    """
+    进程内共享的正在上传的文件，保存配置重启上传器或重载插件后，
+    旧实例仍在上传的文件不会被新实例再次上传
+    """
+    module = sys.modules.get(RUNNING_MODULE)
+    if module is None:
+        module = ModuleType(RUNNING_MODULE)
+        module.lock = threading.Lock()
+        module.paths = set()
+        module = sys.modules.setdefault(RUNNING_MODULE, module)
+    return module
+
+
+class _EventHandler(FileSystemEventHandler):
+    """
+    目录变化事件，只记录路径，由上传线程判断文件是否写入完成
+    """
+
+    def __init__(self, uploader: "U115AutoUploader"):
+        super().__init__()
+        self.uploader = uploader
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.uploader.enqueue(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.uploader.enqueue(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.uploader.enqueue(event.dest_path)
+
+
+class U115AutoUploader:
+    """
+    本地目录自动上传
+
+    监控本地目录（inotify，不可用时轮询），文件大小和修改时间在 settle 秒内不再变化时视为写入完成，
+    按批次并发上传；启动时全量扫描一次，提交上传前由 is_uploaded 判断文件是否已上传且未变化，
+    因此重启后可以继续上传停机期间新增或未完成的文件，已上传的文件被触碰或复制时也不会重复上传
+    """
+
+    def __init__(
+        self,
+        folders: list[tuple[str, str]],
+        upload: Callable[[str, str], bool],
+        is_uploaded: Optional[Callable[[dict], bool]] = None,
+        mode: str = "fast",
+        workers: int = 2,
+        settle: float = 60,
+        interval: float = 10,
+    ):
+        """
+        :param folders: [(本地目录, 网盘目录)]
+        :param upload: 上传函数，参数为本地文件路径和网盘目录，返回是否成功
+        :param is_uploaded: 判断文件是否已上传，参数为包含 path、size、mtime 的字典
+        :param mode: fast 使用系统文件事件，compatibility 使用轮询
+        :param workers: 并发上传的文件数
+        :param settle: 文件多少秒内不再变化视为写入完成
+        :param interval: 检查待上传队列的间隔秒数
+        """
+        self.folders = [(str(Path(local)), remote.rstrip("/") or "/") for local, remote in folders]
+        self.upload = upload
+        self.is_uploaded = is_uploaded
+        self.mode = mode
+        self.workers = max(int(workers or 1), 1)
+        self.settle = settle
+        self.interval = interval
+        # 未安装 watchdog 时全量扫描的间隔秒数
+        self.rescan_interval = 300
+        # 上传失败后重新排队的等待秒数
+        self.retry_delay = 300
+        # 停止时等待正在上传的文件的最长秒数
+        self.stop_timeout = 30
+        self._lock = threading.Lock()
+        # 正在上传的文件全部结束时通知
+        self._idle = threading.Condition(self._lock)
+        # 路径 → (大小, 修改时间, 最后变化时间, 发现时间)
+        self._pending: dict[str, tuple[int, float, float, float]] = {}
+        self._running: set[str] = set()
+        self._observer = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # 统计
+        self._started_at = 0.0
+        self._uploaded_files = 0
+        self._uploaded_bytes = 0
+        self._failed_files = 0
+        self._latencies: deque[float] = deque(maxlen=1000)
+
+    def start(self):
+        """
+        启动监控
+        """
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="u115-autoupload")
+        if Observer is None:
+            logger.warn("未安装 watchdog，自动上传仅使用定时扫描")
+        else:
+            observer_cls = PollingObserver if self.mode == "compatibility" else Observer
+            self._observer = observer_cls(timeout=10)
+            for local, _ in self.folders:
+                if not Path(local).is_dir():
+                    logger.warn(f"自动上传目录不存在: {local}")
+                    continue
+                self._observer.schedule(_EventHandler(self), local, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        self._thread = threading.Thread(target=self.__run, name="u115-autoupload", daemon=True)
+        self._thread.start()
+        logger.info(f"115 自动上传已启动: {', '.join(local for local, _ in self.folders)}")
+
+    def stop(self):
+        """
+        停止监控，排队中的文件取消上传，正在上传的文件最多等待 stop_timeout 秒；
+        超时后仍在上传的文件记录在进程内共享状态中，新的实例等其结束后再判断是否需要上传
+        """
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(5)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        deadline = time.monotonic() + self.stop_timeout
+        with self._idle:
+            while self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warn(f"自动上传停止时仍有 {len(self._running)} 个文件在上传，将在后台完成")
+                    break
+                self._idle.wait(remaining)
+
+    def enqueue(self, path: str):
+        """
+        记录待上传的文件
+        """
+        name = os.path.basename(path)
+        if name in IGNORE_NAMES or name.startswith("._") or name.endswith(IGNORE_SUFFIXES):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if path in self._running:
+                return
+            old = self._pending.get(path)
+            if old and (old[0], old[1]) == (st.st_size, st.st_mtime):
+                return
+            found = old[3] if old else now
+            self._pending[path] = (st.st_size, st.st_mtime, now, found)
+
+    def scan(self):
+        """
+        全量扫描监控目录，补充停机期间的文件
+        """
+        for local, _ in self.folders:
+            for root, _, files in os.walk(local):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if self.is_uploaded is not None:
+                        try:
+                            st = os.stat(path)
+                            if self.is_uploaded({"path": path, "size": st.st_size, "mtime": int(st.st_mtime)}):
+                                continue
+                        except Exception:
+                            pass
+                    self.enqueue(path)
+
+    def remote_dir(self, path: str) -> Optional[str]:
+        """
+        本地文件对应的网盘目录
+        """
+        for local, remote in self.folders:
+            if path.startswith(local + os.sep):
+                relative = os.path.relpath(os.path.dirname(path), local)
+                if relative == ".":
+                    return remote
+                return f"{remote.rstrip('/')}/{relative.replace(os.sep, '/')}"
+        return None
+
+    def ready(self) -> list[str]:
+        """
+        取出写入完成的文件，同时刷新仍在变化的文件
+        """
+        now = time.monotonic()
+        batch = []
+        with self._lock:
+            items = list(self._pending.items())
+        for path, (size, mtime, changed, found) in items:
+            try:
+                st = os.stat(path)
+            except OSError:
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                with self._lock:
+                    self._pending[path] = (st.st_size, st.st_mtime, now, found)
+                continue
+            if now - changed >= self.settle:
+                batch.append(path)
+        return batch
+
+    def __run(self):
+        last_scan = 0.0
+        while True:
+            # 无文件事件时定时全量扫描
+            if not last_scan or (self._observer is None and time.monotonic() - last_scan >= self.rescan_interval):
+                try:
+                    self.scan()
+                except Exception as e:
+                    logger.error(f"自动上传扫描失败: {e}")
+                last_scan = time.monotonic()
+            if self._stop_event.wait(self.interval):
+                return
+            for path in self.ready():
+                with self._lock:
+                    item = self._pending.pop(path, None)
+                    if item is None:
+                        continue
+                if not self.__claim(path, item):
+                    continue
+                if self._executor is None:
+                    self.__release(path)
+                    return
+                future = self._executor.submit(self.__upload, path, item)
+                # 停止时被取消的任务不会执行，在回调中释放
+                future.add_done_callback(lambda f, p=path: f.cancelled() and self.__release(p))
+
+    def __claim(self, path: str, item: tuple[int, float, float, float]) -> bool:
+        """
+        标记文件为正在上传；其它实例仍在上传该文件时放回队列，已上传且未变化的文件直接丢弃
+        """
+        shared = _shared_running()
+        with shared.lock:
+            busy = path in shared.paths
+        if busy:
+            with self._lock:
+                self._pending.setdefault(path, item)
+            return False
+        if self.is_uploaded is not None:
+            try:
+                st = os.stat(path)
+                if self.is_uploaded({"path": path, "size": st.st_size, "mtime": int(st.st_mtime)}):
+                    logger.debug(f"文件已上传且未变化，跳过: {path}")
+                    return False
+            except OSError:
+                return False
+            except Exception as e:
+                logger.warn(f"查询上传台账失败: {path}: {e}")
+        with shared.lock:
+            if path in shared.paths:
+                busy = True
+            else:
+                shared.paths.add(path)
+        with self._lock:
+            if busy:
+                self._pending.setdefault(path, item)
+                return False
+            self._running.add(path)
+        return True
+
+    def __release(self, path: str):
+        shared = _shared_running()
+        with shared.lock:
+            shared.paths.discard(path)
+        with self._idle:
+            self._running.discard(path)
+            if not self._running:
+                self._idle.notify_all()
+
+    def __upload(self, path: str, item: tuple[int, float, float, float]):
+        try:
+            remote = self.remote_dir(path)
+            if remote is None:
+                return
+            if self.upload(path, remote.rstrip("/") + "/"):
+                with self._lock:
+                    self._uploaded_files += 1
+                    self._uploaded_bytes += item[0]
+                    self._latencies.append(time.monotonic() - item[3])
+                return
+        except Exception as e:
+            logger.error(f"自动上传失败: {path}: {e}")
+        finally:
+            self.__release(path)
+        # 失败的文件延后重新排队
+        with self._lock:
+            self._failed_files += 1
+            if path not in self._pending:
+                size, mtime, _, found = item
+                self._pending[path] = (size, mtime, time.monotonic() + self.retry_delay, found)
+
+    def stats(self) -> dict:
+        """
+        上传统计
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0
+
+            def percentile(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "mode": "inotify" if self._observer is not None and self.mode != "compatibility" else "polling",
+                "pending": len(self._pending),
+                "uploading": len(self._running),
+                "uploaded_files": self._uploaded_files,
+                "uploaded_bytes": self._uploaded_bytes,
+                "failed_files": self._failed_files,
+                "throughput": self._uploaded_bytes / elapsed if elapsed else 0.0,
+                "latency_p50": percentile(0.5),
+                "latency_p95": percentile(0.95),
+            }
@@ -0,0 +1,88 @@
+__doc__ = "115 网盘批量删除：分块、有限并发、失败重试并汇总结果"
+
+import time
+
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from app.log import logger
+
+
+def bulk_delete(
+    delete: Callable[[Sequence[int]], dict],
+    ids: Iterable[int],
+    chunk_size: int = 1000,
+    max_workers: int = 4,
+    max_retries: int = 2,
+    retry_interval: float = 1.0,
+) -> dict:
+    """
+    批量删除文件或目录
+
+    每块调用一次 delete，请求出错时整块重试；接口拒绝删除时将该块对半拆分后分别删除，
+    直到拆分为单个 id，部分 id 无法删除时其余 id 仍能删除，只有确实删除失败的 id 计入 failed
+
+    :param delete: 删除函数，参数为 id 列表，返回 115 接口响应，如 client.fs_delete
+    :param ids: 待删除的 id
+    :param chunk_size: 每次请求删除的数量
+    :param max_workers: 并发请求数
+    :param max_retries: 请求出错后的重试次数
+    :param retry_interval: 重试前等待的秒数
+
+    :return: 汇总结果，total 总数，deleted 已删除数，failed 失败的 id，requests 请求次数，elapsed 耗时
+    """
+    ids = list(dict.fromkeys(ids))
+    summary: dict = {
+        "total": len(ids),
+        "deleted": 0,
+        "failed": [],
+        "requests": 0,
+        "elapsed": 0.0,
+    }
+    if not ids:
+        return summary
+    chunk_size = max(int(chunk_size), 1)
+    lock = Lock()
+    begin = time.perf_counter()
+
+    def run(chunk: list[int], retries: int):
+        with lock:
+            summary["requests"] += 1
+        try:
+            resp = delete(chunk)
+        except Exception as e:
+            # 请求失败（网络错误等），整块重试
+            if retries <= 0:
+                logger.warn(f"批量删除失败 {len(chunk)} 项: {e}")
+                with lock:
+                    summary["failed"].extend(chunk)
+                return
+            time.sleep(retry_interval)
+            run(chunk, retries - 1)
+            return
+        if isinstance(resp, dict) and not resp.get("state", True):
+            error = resp.get("error") or resp.get("errno") or resp
+            if len(chunk) > 1:
+                # 接口拒绝删除，对半拆分直到单个 id，约 log2(块大小) 层后定位到具体失败的 id
+                middle = len(chunk) // 2
+                run(chunk[:middle], retries)
+                run(chunk[middle:], retries)
+                return
+            logger.warn(f"删除失败 {chunk[0]}: {error}")
+            with lock:
+                summary["failed"].extend(chunk)
+            return
+        with lock:
+            summary["deleted"] += len(chunk)
+
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    if max_workers <= 1 or len(chunks) == 1:
+        for chunk in chunks:
+            run(chunk, max_retries)
+    else:
+        with ThreadPoolExecutor(min(max_workers, len(chunks))) as executor:
+            for future in [executor.submit(run, chunk, max_retries) for chunk in chunks]:
+                future.result()
+    summary["elapsed"] = time.perf_counter() - begin
+    return summary
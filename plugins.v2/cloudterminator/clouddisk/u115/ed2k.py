@@ -0,0 +1,129 @@
+__doc__ = "ed2k 哈希计算与 115 离线下载"
+
+import hashlib
+import time
+
+from typing import Optional
+from urllib.parse import quote
+
+from app.log import logger
+
+
+# ed2k 分块大小
+ED2K_CHUNK_SIZE = 9728000
+
+
+def new_md4():
+    """
+    新建 md4 哈希对象，OpenSSL 3 默认不提供 md4 时使用 pycryptodome
+    """
+    try:
+        return hashlib.new("md4")
+    except ValueError:
+        from Crypto.Hash import MD4
+
+        return MD4.new()
+
+
+def md4_available() -> bool:
+    """
+    当前环境是否能计算 md4
+    """
+    try:
+        new_md4()
+        return True
+    except ImportError:
+        return False
+
+
+class Ed2kHash:
+    """
+    ed2k 哈希，与 hashlib 的哈希对象接口一致，可直接传给 digest_file
+
+    每 9728000 字节计算一个 md4，文件只有一块时即为结果，否则为各块 md4 拼接后再取 md4；
+    文件大小恰为分块整数倍时不追加空块（eMule 新版算法）
+    """
+
+    name = "ed2k"
+
+    def __init__(self):
+        self._chunk = new_md4()
+        self._filled = 0
+        self._hashes: list[bytes] = []
+
+    def update(self, data):
+        view = memoryview(data)
+        while len(view):
+            n = min(len(view), ED2K_CHUNK_SIZE - self._filled)
+            self._chunk.update(view[:n])
+            self._filled += n
+            view = view[n:]
+            if self._filled == ED2K_CHUNK_SIZE:
+                self._hashes.append(self._chunk.digest())
+                self._chunk = new_md4()
+                self._filled = 0
+
+    def digest(self) -> bytes:
+        hashes = list(self._hashes)
+        if self._filled or not hashes:
+            hashes.append(self._chunk.digest())
+        if len(hashes) == 1:
+            return hashes[0]
+        root = new_md4()
+        root.update(b"".join(hashes))
+        return root.digest()
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+
+def ed2k_link(name: str, size: int, ed2k: str) -> str:
+    """
+    生成 ed2k 链接
+    """
+    return f"ed2k://|file|{quote(name, safe='')}|{size}|{ed2k.upper()}|/"
+
+
+def find_offline_task(client, info_hash: str, max_pages: int = 50) -> Optional[dict]:
+    """
+    在离线任务列表中查找任务，逐页查找直到找到或没有更多页
+
+    :param max_pages: 最多查找的页数
+    """
+    for page in range(1, max_pages + 1):
+        resp = client.offline_list(page)
+        tasks = resp.get("tasks") or ()
+        for item in tasks:
+            if item.get("info_hash") == info_hash:
+                return item
+        if not tasks or page >= int(resp.get("page_count") or 1):
+            break
+    return None
+
+
+def offline_ed2k(client, link: str, pid: int, timeout: float = 60, interval: float = 5) -> bool:
+    """
+    通过 115 离线下载添加 ed2k 链接，仅当 115 已有该文件、在超时时间内完成时视为成功，
+    否则删除离线任务，由调用方回退到上传
+
+    :return: 是否离线完成
+    """
+    resp = client.offline_add_url({"url": link, "wp_path_id": pid})
+    if not resp.get("state"):
+        logger.info(f"添加离线任务失败: {link}: {resp.get('error_msg') or resp}")
+        return False
+    info_hash = resp.get("info_hash")
+    deadline = time.monotonic() + timeout
+    while True:
+        task = find_offline_task(client, info_hash)
+        status = task.get("status") if task else None
+        if status == 2:
+            return True
+        if status == -1 or time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+    try:
+        client.offline_remove({"hash[0]": info_hash, "flag": 1})
+    except Exception as e:
+        logger.warn(f"删除离线任务失败: {info_hash}: {e}")
+    return False
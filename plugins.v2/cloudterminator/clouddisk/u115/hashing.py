@@ -0,0 +1,163 @@
+__doc__ = "大文件哈希计算：大块读取、单次读取同时计算多种哈希、节流进度回调"
+
+import mmap
+import time
+
+from collections.abc import Callable, Mapping
+from hashlib import sha1
+from os import PathLike
+
+
+# 默认读取块大小，8 MB
+DEFAULT_BUFSIZE = 8 << 20
+
+
+class DigestCancelled(Exception):
+    """
+    哈希计算被取消
+    """
+
+
+class ProgressThrottle:
+    """
+    进度回调节流：累计字节数或间隔时间达到阈值时才回调一次
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[int], object],
+        min_bytes: int = 64 << 20,
+        min_interval: float = 0.5,
+    ):
+        self.callback = callback
+        self.min_bytes = min_bytes
+        self.min_interval = min_interval
+        self._pending = 0
+        self._last = time.monotonic()
+
+    def __call__(self, step: int):
+        self._pending += step
+        now = time.monotonic()
+        if self._pending >= self.min_bytes or now - self._last >= self.min_interval:
+            self.callback(self._pending)
+            self._pending = 0
+            self._last = now
+
+    def flush(self):
+        if self._pending:
+            self.callback(self._pending)
+            self._pending = 0
+
+
+def digest_file(
+    path: str | PathLike,
+    hashers: None | Mapping[str, object] = None,
+    bufsize: int = DEFAULT_BUFSIZE,
+    use_mmap: bool = False,
+    callback: None | Callable[[int], object] = None,
+    cancelled: None | Callable[[], bool] = None,
+) -> tuple[int, dict]:
+    """
+    读取一次文件，同时计算多种哈希
+
+    :param path: 文件路径
+    :param hashers: 哈希对象，名称 → 具有 update 方法的对象，默认只计算 sha1
+    :param bufsize: 每次读取的字节数
+    :param use_mmap: 是否使用内存映射读取
+    :param callback: 进度回调，参数为本次读取的字节数，建议配合 ProgressThrottle 使用
+    :param cancelled: 每读取一块调用一次，返回 True 时停止读取并抛出 DigestCancelled
+
+    :return: (文件大小, 哈希对象字典)
+    """
+    if hashers is None:
+        hashers = {"sha1": sha1()}
+    updates = [h.update for h in hashers.values()]
+    size = 0
+    with open(path, "rb", buffering=0) as f:
+        if use_mmap:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # 空文件无法映射
+                mm = None
+            if mm is not None:
+                with mm, memoryview(mm) as view:
+                    total = len(view)
+                    for start in range(0, total, bufsize):
+                        if cancelled is not None and cancelled():
+                            raise DigestCancelled(path)
+                        chunk = view[start:start + bufsize]
+                        for update in updates:
+                            update(chunk)
+                        chunk.release()
+                        if callback is not None:
+                            callback(min(bufsize, total - start))
+                    size = total
+        else:
+            buf = bytearray(bufsize)
+            view = memoryview(buf)
+            readinto = f.readinto
+            while n := readinto(buf):
+                if cancelled is not None and cancelled():
+                    raise DigestCancelled(path)
+                chunk = view[:n]
+                for update in updates:
+                    update(chunk)
+                size += n
+                if callback is not None:
+                    callback(n)
+    if isinstance(callback, ProgressThrottle):
+        callback.flush()
+    return size, dict(hashers)
+
+
+if __name__ == "__main__":
+    # 基准测试：python hashing.py [文件路径] [大小(GB)]
+    # 文件不存在时创建稀疏文件，主要衡量哈希计算与读取方式本身的开销
+    import sys
+
+    from os import truncate
+    from os.path import exists
+
+    bench_path = sys.argv[1] if len(sys.argv) > 1 else "/tmp/u115_hash_bench.bin"
+    bench_size = int(float(sys.argv[2] if len(sys.argv) > 2 else 10) * (1 << 30))
+    if not exists(bench_path):
+        with open(bench_path, "wb"):
+            pass
+        truncate(bench_path, bench_size)
+
+    def bench(label: str, func: Callable[[], object]):
+        begin = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - begin
+        print(f"{label:<32} {elapsed:8.2f} s {bench_size / elapsed / (1 << 30):8.2f} GB/s")
+
+    calls = 0
+
+    def count(_):
+        global calls
+        calls += 1
+
+    try:
+        from hashtools import file_digest
+
+        def legacy():
+            with open(bench_path, "rb") as f:
+                file_digest(f, "sha1", callback=count)
+
+        bench("hashtools.file_digest", legacy)
+        print(f"{'':<32} callbacks: {calls}")
+    except ImportError:
+        pass
+
+    calls = 0
+    bench("digest_file(bufsize=64K)", lambda: digest_file(bench_path, bufsize=1 << 16, callback=count))
+    print(f"{'':<32} callbacks: {calls}")
+
+    for use_mmap in (False, True):
+        calls = 0
+        bench(
+            f"digest_file(mmap={use_mmap})",
+            lambda: digest_file(bench_path, use_mmap=use_mmap, callback=ProgressThrottle(count)),
+        )
+        print(f"{'':<32} callbacks: {calls}")
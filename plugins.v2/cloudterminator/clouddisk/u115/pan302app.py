@@ -0,0 +1,195 @@
+"""
+302 服务 ASGI 应用工厂
+
+本模块会在 uvicorn 子进程（多 worker 时为每个 worker 进程）中被导入，
+因此不能依赖 MoviePilot 的任何模块，所有参数均通过环境变量传入
+"""
+import logging
+import random
+import sys
+from collections.abc import Mapping
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+from os import environ
+from queue import SimpleQueue
+from typing import Optional
+
+from p115nano302 import make_application
+
+try:
+    from .pan302cache import RedirectCacheMiddleware
+except ImportError:
+    # 作为顶层模块在 302 子进程中导入
+    from pan302cache import RedirectCacheMiddleware
+
+# 115 cookie
+ENV_COOKIE = "CT_PAN302_COOKIE"
+# 是否开启调试
+ENV_DEBUG = "CT_PAN302_DEBUG"
+# 日志等级
+ENV_LOG_LEVEL = "CT_PAN302_LOG_LEVEL"
+# 访问日志采样率，0 ~ 1
+ENV_ACCESS_LOG_SAMPLE = "CT_PAN302_ACCESS_LOG_SAMPLE"
+# 下载链接缓存容量，0 为关闭
+ENV_URL_CACHE_SIZE = "CT_PAN302_URL_CACHE_SIZE"
+# 下载链接缓存是否区分 User-Agent
+ENV_URL_CACHE_BIND_UA = "CT_PAN302_URL_CACHE_BIND_UA"
+# 缓存统计接口访问令牌
+ENV_URL_CACHE_STATS_TOKEN = "CT_PAN302_URL_CACHE_STATS_TOKEN"
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def create_app(env: Optional[Mapping[str, str]] = None):
+    """
+    创建 302 服务 ASGI 应用
+
+    :param env: 应用参数，键同环境变量名；子进程中不传，从环境变量读取，
+                进程内运行时直接传入，避免 cookie 写入 MoviePilot 进程的环境变量
+    """
+    if env is None:
+        env = environ
+    app = make_application(
+        env[ENV_COOKIE],
+        debug=env.get(ENV_DEBUG) == "1",
+    )
+    cache_size = int(env.get(ENV_URL_CACHE_SIZE, "0"))
+    if cache_size > 0:
+        app = RedirectCacheMiddleware(
+            app,
+            maxsize=cache_size,
+            bind_ua=env.get(ENV_URL_CACHE_BIND_UA, "1") == "1",
+            stats_token=env.get(ENV_URL_CACHE_STATS_TOKEN, ""),
+        )
+    return app
+
+
+class AccessLogSampler(logging.Filter):
+    """
+    访问日志采样，按比例丢弃 uvicorn.access 日志
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = min(max(float(rate), 0.0), 1.0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    日志写入内存队列，由后台线程写入目标，请求处理线程不会被磁盘 IO 阻塞
+    """
+
+    def __init__(self, target: logging.Handler):
+        super().__init__(SimpleQueue())
+        self.target = target
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.target.close()
+        super().close()
+
+
+def make_stream_handler() -> QueueLogHandler:
+    """
+    子进程日志处理器：异步写入 stderr，由主进程负责落盘和轮转
+    """
+    return QueueLogHandler(logging.StreamHandler(sys.stderr))
+
+
+def make_file_handler(
+    filename: str,
+    max_bytes: int = 10 << 20,
+    backup_count: int = 5,
+    when: str = "",
+) -> logging.Handler:
+    """
+    轮转文件日志处理器，指定 when 时按时间轮转，否则按大小轮转
+    """
+    if when:
+        return TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count, encoding="utf-8"
+        )
+    return RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+
+
+def make_queued_file_handler(**kwargs) -> QueueLogHandler:
+    """
+    异步轮转文件日志处理器，用于进程内运行
+    """
+    return QueueLogHandler(make_file_handler(**kwargs))
+
+
+def build_log_config(handler: dict, level: str = "info", access_log_sample: float = 1.0) -> dict:
+    """
+    生成 uvicorn 使用的 logging 配置
+    """
+    level = level.upper()
+    if level == "TRACE":
+        level = "DEBUG"
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "default": {"format": LOG_FORMAT},
+        },
+        "filters": {
+            "access_sampler": {
+                "()": AccessLogSampler,
+                "rate": access_log_sample,
+            },
+        },
+        "handlers": {
+            "default": {**handler, "formatter": "default"},
+        },
+        "loggers": {
+            "uvicorn": {"handlers": ["default"], "level": level, "propagate": False},
+            "uvicorn.error": {"level": level},
+            "uvicorn.access": {
+                "handlers": ["default"],
+                "level": level,
+                "filters": ["access_sampler"],
+                "propagate": False,
+            },
+            "p115nano302": {"handlers": ["default"], "level": level, "propagate": False},
+        },
+    }
+
+
+def install_log_handler(handler: logging.Handler, level: str = "info", access_log_sample: float = 1.0):
+    """
+    进程内运行时直接挂载日志处理器，避免 dictConfig 重置宿主进程的日志配置
+    """
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    level = "DEBUG" if level.upper() == "TRACE" else level.upper()
+    for name in ("uvicorn", "uvicorn.access", "p115nano302"):
+        _logger = logging.getLogger(name)
+        _logger.handlers = [handler]
+        _logger.setLevel(level)
+        _logger.propagate = False
+    logging.getLogger("uvicorn.access").filters = [AccessLogSampler(access_log_sample)]
+
+
+def child_log_config() -> dict:
+    """
+    子进程 logging 配置
+    """
+    return build_log_config(
+        {"()": make_stream_handler},
+        level=environ.get(ENV_LOG_LEVEL, "info"),
+        access_log_sample=float(environ.get(ENV_ACCESS_LOG_SAMPLE, "1")),
+    )
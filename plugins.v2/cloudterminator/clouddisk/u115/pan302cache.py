@@ -0,0 +1,187 @@
+"""
+302 服务下载链接缓存
+
+以 ASGI 中间件形式包裹 p115nano302 应用，按 pickcode（及 User-Agent）缓存跳转地址，
+命中时直接返回 302，不再请求 115 接口
+
+本模块运行在 302 服务进程内，不能依赖 MoviePilot 的任何模块
+"""
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+# 缓存统计接口路径
+STATS_PATH = "/__ct/cache_stats"
+
+# 跳转状态码
+REDIRECT_STATUS = (301, 302, 303, 307, 308)
+
+
+class RedirectCacheMiddleware:
+    """
+    pickcode → 下载链接 LRU 缓存
+    """
+
+    def __init__(
+        self,
+        app,
+        maxsize: int = 4096,
+        default_ttl: float = 300,
+        max_ttl: float = 3600,
+        expire_margin: float = 60,
+        bind_ua: bool = True,
+        stats_token: str = "",
+    ):
+        self.app = app
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        # 提前失效的秒数，避免客户端拿到即将过期的链接
+        self.expire_margin = expire_margin
+        # 115 下载链接与 User-Agent 绑定，不同 UA 需要分别缓存
+        self.bind_ua = bind_ua
+        # 统计接口访问令牌，为空时不开放统计接口
+        self.stats_token = stats_token or ""
+        self.cache: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        if scope["path"] == STATS_PATH:
+            if not self.stats_authorized(scope):
+                return await self.__send_json(send, {"detail": "Forbidden"}, status=403)
+            return await self.__send_json(send, self.stats())
+        key = self.cache_key(scope)
+        if key is None:
+            return await self.app(scope, receive, send)
+        url = self.get(key)
+        if url is not None:
+            self.hits += 1
+            return await self.__send_redirect(send, url)
+        self.misses += 1
+
+        async def send_and_capture(message):
+            if message["type"] == "http.response.start" and message["status"] in REDIRECT_STATUS:
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"location":
+                        self.put(key, value.decode("latin-1"))
+                        break
+            await send(message)
+
+        return await self.app(scope, receive, send_and_capture)
+
+    def cache_key(self, scope) -> Optional[tuple]:
+        """
+        从请求中提取缓存键，无法确定 pickcode 时不缓存
+        """
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        # 分享链接、按 id 或路径访问等情况不缓存
+        if any(k in query for k in ("share_code", "id", "path", "sha1")):
+            return None
+        pickcode = (query.get("pickcode") or query.get("pick_code") or [""])[0]
+        if not pickcode:
+            pickcode = scope["path"].lstrip("/").split("/", 1)[0]
+        if not (len(pickcode) == 17 and pickcode.isalnum()):
+            return None
+        user_agent = ""
+        if self.bind_ua:
+            for name, value in scope.get("headers", ()):
+                if name == b"user-agent":
+                    user_agent = value.decode("latin-1")
+                    break
+        app = (query.get("app") or [""])[0]
+        return pickcode.lower(), app, user_agent
+
+    def stats_authorized(self, scope) -> bool:
+        """
+        校验统计接口的 apikey
+        """
+        if not self.stats_token:
+            return False
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        apikey = (query.get("apikey") or [""])[0]
+        return hmac.compare_digest(apikey.encode(), self.stats_token.encode())
+
+    def ttl_of(self, url: str) -> float:
+        """
+        从 CDN 链接的过期时间参数推算缓存时长
+        """
+        try:
+            expire_at = int(parse_qs(urlsplit(url).query)["t"][0])
+        except (KeyError, IndexError, ValueError):
+            return self.default_ttl
+        return min(expire_at - time.time() - self.expire_margin, self.max_ttl)
+
+    def get(self, key: tuple) -> Optional[str]:
+        """
+        读取缓存，过期则删除
+        """
+        item = self.cache.get(key)
+        if item is None:
+            return None
+        expire_at, url = item
+        if expire_at <= time.monotonic():
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return url
+
+    def put(self, key: tuple, url: str):
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+        """
+        ttl = self.ttl_of(url)
+        if ttl <= 0:
+            return
+        self.cache[key] = (time.monotonic() + ttl, url)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        缓存统计
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    @staticmethod
+    async def __send_redirect(send, url: str):
+        body = json.dumps({"status": "redirecting", "url": url}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 302,
+            "headers": [
+                (b"location", url.encode("latin-1")),
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def __send_json(send, data: dict, status: int = 200):
+        body = json.dumps(data).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
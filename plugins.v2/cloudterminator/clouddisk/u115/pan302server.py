@@ -1,49 +1,306 @@
-import sys
+import json
+import logging
+import os
+import signal
+import socket
 import subprocess
-import atexit
+import sys
+import threading
+import time
 from functools import partial
+from http.client import HTTPConnection
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
 
+from app.core.config import settings
 from app.log import logger
 
+from .pan302cache import STATS_PATH
+from .pan302app import (
+    ENV_ACCESS_LOG_SAMPLE,
+    ENV_COOKIE,
+    ENV_DEBUG,
+    ENV_LOG_LEVEL,
+    ENV_URL_CACHE_BIND_UA,
+    ENV_URL_CACHE_SIZE,
+    ENV_URL_CACHE_STATS_TOKEN,
+    install_log_handler,
+    make_file_handler,
+    make_queued_file_handler,
+)
+
 
 class Pan115:
     """
     115 网盘 302 服务
     """
 
-    def __init__(self, cookie):
+    # uvicorn 日志等级
+    log_levels = ("critical", "error", "warning", "info", "debug", "trace")
+
+    def __init__(
+        self,
+        cookie,
+        host: str = "0.0.0.0",
+        port: int = 29876,
+        workers: int = 1,
+        log_level: str = "info",
+        in_process: bool = False,
+        log_max_bytes: int = 10 << 20,
+        log_backup_count: int = 5,
+        log_rotate_when: str = "",
+        access_log_sample: float = 1.0,
+        url_cache_size: int = 4096,
+        url_cache_bind_ua: bool = True,
+    ):
         self.cookie = cookie
+        self.host = host or "0.0.0.0"
+        self.port = int(port or 29876)
+        self.workers = max(int(workers or 1), 1)
+        self.log_level = log_level if log_level in self.log_levels else "info"
+        # 进程内运行时只能使用单 worker
+        self.in_process = in_process
+        # 日志轮转与采样
+        self.log_max_bytes = int(log_max_bytes or 10 << 20)
+        self.log_backup_count = int(log_backup_count or 0)
+        self.log_rotate_when = log_rotate_when or ""
+        self.access_log_sample = 1.0 if access_log_sample is None else float(access_log_sample)
+        # 下载链接缓存
+        self.url_cache_size = max(int(url_cache_size or 0), 0)
+        self.url_cache_bind_ua = url_cache_bind_ua
+        self._log_handler: Optional[logging.Handler] = None
+        self._log_thread: Optional[threading.Thread] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def probe_host(self) -> str:
+        """
+        就绪探测使用的地址
+        """
+        if self.host in ("0.0.0.0", "::", ""):
+            return "127.0.0.1"
+        return self.host
 
     def start(self, log_file_path):
         """
         302 服务启动
         """
-        log_file = open(log_file_path, "w", encoding="utf-8")
+        Path(log_file_path).parent.mkdir(parents=True, exist_ok=True)
+        if self.in_process:
+            return self.__start_in_process(log_file_path)
+        return self.__start_subprocess(log_file_path)
+
+    @property
+    def app_env(self) -> dict:
+        """
+        302 应用参数，子进程通过环境变量传入应用工厂，进程内运行时直接传入
+        """
+        return {
+            ENV_COOKIE: self.cookie,
+            ENV_DEBUG: "1" if self.log_level in ("debug", "trace") else "0",
+            ENV_LOG_LEVEL: self.log_level,
+            ENV_ACCESS_LOG_SAMPLE: str(self.access_log_sample),
+            ENV_URL_CACHE_SIZE: str(self.url_cache_size),
+            ENV_URL_CACHE_BIND_UA: "1" if self.url_cache_bind_ua else "0",
+            ENV_URL_CACHE_STATS_TOKEN: settings.API_TOKEN or "",
+        }
+
+    @property
+    def log_handler_kwargs(self) -> dict:
+        """
+        轮转日志参数
+        """
+        return {
+            "max_bytes": self.log_max_bytes,
+            "backup_count": self.log_backup_count,
+            "when": self.log_rotate_when,
+        }
+
+    @staticmethod
+    def __pump_logs(stream, handler: logging.Handler):
+        """
+        读取子进程输出并写入轮转日志，单一写入者保证多 worker 时轮转安全
+        """
+        try:
+            for line in iter(stream.readline, b""):
+                handler.handle(
+                    logging.makeLogRecord(
+                        {"msg": line.decode("utf-8", "replace").rstrip("\r\n")}
+                    )
+                )
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+
+    def __start_subprocess(self, log_file_path) -> subprocess.Popen:
+        """
+        以独立进程启动 302 服务，支持多 worker
+        """
+        app_dir = str(Path(__file__).parent)
         command = [
             sys.executable,
             "-c",
+            "import sys; "
+            f"sys.path.insert(0, {app_dir!r}); "
             "from uvicorn import run; "
-            "from p115nano302 import make_application; "
-            f"run(make_application('{self.cookie}', debug=True), host='0.0.0.0', port=29876, "
+            "from pan302app import child_log_config; "
+            "run('pan302app:create_app', factory=True, "
+            f"host={self.host!r}, port={self.port}, workers={self.workers}, "
+            f"log_level={self.log_level!r}, log_config=child_log_config(), "
             "proxy_headers=True, server_header=False, forwarded_allow_ips='*', "
             "timeout_graceful_shutdown=1)",
         ]
+        # cookie 通过环境变量传递，避免暴露在进程命令行中
+        env = {**os.environ, **self.app_env}
         process = subprocess.Popen(
-            command, stdout=log_file, stderr=log_file, start_new_session=True
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+            start_new_session=True,
+        )
+        self._log_handler = make_file_handler(log_file_path, **self.log_handler_kwargs)
+        self._log_thread = threading.Thread(
+            target=self.__pump_logs,
+            args=(process.stdout, self._log_handler),
+            name="pan302-log",
+            daemon=True,
+        )
+        self._log_thread.start()
+        logger.info(
+            f"302 服务已启动: {self.host}:{self.port}，workers={self.workers}，pid={process.pid}"
         )
-        logger.info("302 服务已启动")
         return process
 
+    def __start_in_process(self, log_file_path):
+        """
+        在 MoviePilot 进程内以线程方式启动 302 服务
+        """
+        from uvicorn import Config, Server
+
+        from .pan302app import create_app
+
+        config = Config(
+            partial(create_app, self.app_env),
+            factory=True,
+            host=self.host,
+            port=self.port,
+            log_level=self.log_level,
+            log_config=None,
+            proxy_headers=True,
+            server_header=False,
+            forwarded_allow_ips="*",
+            timeout_graceful_shutdown=1,
+        )
+        self._log_handler = make_queued_file_handler(
+            filename=str(log_file_path), **self.log_handler_kwargs
+        )
+        install_log_handler(self._log_handler, self.log_level, self.access_log_sample)
+        self._server = Server(config)
+        self._thread = threading.Thread(
+            target=self._server.run, name="pan302-server", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"302 服务已在进程内启动: {self.host}:{self.port}")
+        return self._thread
+
+    def is_alive(self, _process) -> bool:
+        """
+        302 服务是否存活
+        """
+        if _process is None:
+            return False
+        if isinstance(_process, threading.Thread):
+            return _process.is_alive()
+        return _process.poll() is None
+
+    def probe(self, timeout: float = 1.0) -> bool:
+        """
+        探测 302 服务端口是否可连接
+        """
+        try:
+            with socket.create_connection((self.probe_host, self.port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def cache_stats(self, timeout: float = 1.0) -> Optional[dict]:
+        """
+        获取下载链接缓存统计，多 worker 时为处理该请求的 worker 的统计
+
+        统计接口与 302 服务同端口对外开放，需以 MoviePilot API 令牌访问
+        """
+        if not self.url_cache_size or not settings.API_TOKEN:
+            return None
+        conn = HTTPConnection(self.probe_host, self.port, timeout=timeout)
+        try:
+            conn.request("GET", f"{STATS_PATH}?{urlencode({'apikey': settings.API_TOKEN})}")
+            resp = conn.getresponse()
+            if resp.status != 200:
+                return None
+            return json.loads(resp.read())
+        except (OSError, ValueError):
+            return None
+        finally:
+            conn.close()
+
+    def wait_ready(self, _process, timeout: float = 15.0, interval: float = 0.2) -> bool:
+        """
+        等待 302 服务就绪
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.is_alive(_process):
+                logger.error("302 服务启动失败，进程已退出")
+                return False
+            if self.probe():
+                logger.info("302 服务已就绪")
+                return True
+            time.sleep(interval)
+        logger.error(f"302 服务在 {timeout} 秒内未就绪")
+        return False
+
     def cleanup_302_process(self, _process):
         """
         清理 302 服务进程
         """
-        if _process is not None and _process.stdout is not None:
-            _process.stdout.close()
+        if self._log_thread is not None:
+            self._log_thread.join(1)
+            self._log_thread = None
+        if self._log_handler is not None:
+            self._log_handler.close()
+            self._log_handler = None
 
-    def stop(self, _process):
+    def stop(self, _process, timeout: float = 5.0):
         """
         302 服务停止
         """
-        atexit.register(partial(self.cleanup_302_process, _process))
+        if _process is None:
+            return
+        try:
+            if isinstance(_process, threading.Thread):
+                if self._server is not None:
+                    self._server.should_exit = True
+                _process.join(timeout)
+                self._server = None
+            elif _process.poll() is None:
+                # 子进程为独立进程组，一并终止所有 worker
+                try:
+                    os.killpg(_process.pid, signal.SIGTERM)
+                except (ProcessLookupError, PermissionError):
+                    _process.terminate()
+                try:
+                    _process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    logger.warning("302 服务未能及时退出，强制结束")
+                    try:
+                        os.killpg(_process.pid, signal.SIGKILL)
+                    except (ProcessLookupError, PermissionError):
+                        _process.kill()
+                    _process.wait()
+        finally:
+            self.cleanup_302_process(_process)
         logger.info("302 服务已停止")
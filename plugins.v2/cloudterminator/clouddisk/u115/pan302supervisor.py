@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from http.client import HTTPConnection
+from typing import Callable, Optional
+
+from app.log import logger
+
+
+class Pan302Supervisor:
+    """
+    302 服务守护线程
+
+    定时探测 302 服务健康状态并统计响应延迟，服务异常时按指数退避自动重启，
+    进程已退出时不等待连续失败次数，立即重启
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        is_alive: Callable[[], bool],
+        restart: Callable[[], bool],
+        interval: float = 10,
+        timeout: float = 3,
+        failure_threshold: int = 3,
+        max_backoff: float = 300,
+        probe_pickcode: Optional[str] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.is_alive = is_alive
+        self.restart = restart
+        self.interval = max(float(interval or 10), 1)
+        self.timeout = timeout
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.max_backoff = max_backoff
+        # 配置 pickcode 时探测真实 302 跳转，否则仅探测服务根路径
+        self.probe_path = f"/{probe_pickcode}" if probe_pickcode else "/"
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._latencies: deque[float] = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        # 重启与停止互斥，停止时等待进行中的重启结束
+        self._restart_lock = threading.Lock()
+        self._failures = 0
+        self._backoff = 0.0
+        self.started_at: Optional[float] = None
+        self.restart_count = 0
+        self.last_error: Optional[str] = None
+        self.healthy = False
+
+    def start(self):
+        """
+        启动守护线程
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(
+            target=self.__run, name="pan302-supervisor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止守护线程，正在重启时等待重启结束，之后不会再启动新的 302 服务
+        """
+        self._stop_event.set()
+        with self._restart_lock:
+            pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(self.timeout + 1)
+        self._thread = None
+
+    def check(self) -> Optional[float]:
+        """
+        探测一次 302 服务，返回响应延迟（毫秒），失败返回 None
+        """
+        if not self.is_alive():
+            self.last_error = "进程已退出"
+            return None
+        conn = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        begin = time.perf_counter()
+        try:
+            conn.request("GET", self.probe_path)
+            resp = conn.getresponse()
+            resp.read()
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return None
+        finally:
+            conn.close()
+        latency = (time.perf_counter() - begin) * 1000
+        if resp.status >= 500:
+            self.last_error = f"HTTP {resp.status}"
+            return None
+        return latency
+
+    def __run(self):
+        """
+        守护循环
+        """
+        while not self._stop_event.wait(self._backoff or self.interval):
+            latency = self.check()
+            if latency is not None:
+                with self._lock:
+                    self._latencies.append(latency)
+                self.healthy = True
+                self._failures = 0
+                self._backoff = 0.0
+                continue
+            self.healthy = False
+            self._failures += 1
+            logger.warning(
+                f"302 服务健康检查失败（{self._failures}/{self.failure_threshold}）: {self.last_error}"
+            )
+            if self._failures < self.failure_threshold and self.is_alive():
+                continue
+            with self._restart_lock:
+                if self._stop_event.is_set():
+                    break
+                logger.warning("302 服务异常，正在重启")
+                self.restart_count += 1
+                try:
+                    ok = self.restart()
+                except Exception as e:
+                    logger.error(f"302 服务重启失败: {e}", exc_info=True)
+                    ok = False
+                if self._stop_event.is_set():
+                    break
+            if ok:
+                self.started_at = time.time()
+                self._failures = 0
+                self._backoff = 0.0
+            else:
+                self._backoff = min(
+                    (self._backoff or self.interval) * 2, self.max_backoff
+                )
+                logger.warning(f"302 服务重启失败，{self._backoff:.0f} 秒后重试")
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        延迟百分位数（毫秒）
+        """
+        with self._lock:
+            data = sorted(self._latencies)
+        if not data:
+            return None
+        return data[min(int(q * len(data)), len(data) - 1)]
+
+    def stats(self) -> dict:
+        """
+        守护统计信息
+        """
+        uptime = int(time.time() - self.started_at) if self.started_at else 0
+        p50, p99 = self.percentile(0.5), self.percentile(0.99)
+        return {
+            "healthy": self.healthy,
+            "uptime": uptime,
+            "restart_count": self.restart_count,
+            "p50": p50,
+            "p99": p99,
+            "samples": len(self._latencies),
+            "last_error": self.last_error,
+        }
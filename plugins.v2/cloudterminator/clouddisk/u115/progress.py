@@ -0,0 +1,128 @@
+import threading
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from itertools import count
+
+from app.log import logger
+
+
+class HeadlessProgress:
+    """
+    无终端环境下的进度统计
+
+    与 rich.progress.Progress 的 add_task / update / remove_task 接口兼容，
+    只做计数，不渲染界面，由后台线程定时输出速率与剩余时间
+    """
+
+    def __init__(
+        self,
+        interval: float = 30,
+        reporter: None | Callable[[dict], object] = None,
+    ):
+        self.interval = interval
+        self.reporter = reporter
+        self._lock = threading.Lock()
+        self._ids = count()
+        self._tasks: dict[int, dict] = {}
+        self._summary: None | int = None
+        self._start = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread: None | threading.Thread = None
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self.__run, name="u115-upload-progress", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report()
+
+    def add_task(self, description: str = "", total: None | float = None, summary: bool = False, **_) -> int:
+        """
+        新增任务，summary 为 True 的任务用于汇总速率与剩余时间
+        """
+        task_id = next(self._ids)
+        with self._lock:
+            self._tasks[task_id] = {"description": description, "total": total, "completed": 0}
+            if summary:
+                self._summary = task_id
+        return task_id
+
+    def update(
+        self,
+        task_id: int,
+        *,
+        total: None | float = None,
+        advance: None | float = None,
+        description: None | str = None,
+        **_,
+    ):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            if advance:
+                task["completed"] += advance
+            if total is not None:
+                task["total"] = total
+            if description is not None:
+                task["description"] = description
+
+    def remove_task(self, task_id: int):
+        # 汇总任务保留到退出时输出最终进度
+        if task_id == self._summary:
+            return
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def snapshot(self) -> dict:
+        """
+        当前汇总进度
+        """
+        elapsed = time.monotonic() - self._start
+        with self._lock:
+            task = dict(self._tasks.get(self._summary) or {})
+            running = len(self._tasks) - (self._summary is not None)
+        completed = task.get("completed", 0)
+        total = task.get("total") or 0
+        speed = completed / elapsed if elapsed > 0 else 0.0
+        eta = (total - completed) / speed if speed and total > completed else None
+        return {
+            "description": task.get("description", ""),
+            "completed": completed,
+            "total": total,
+            "running": running,
+            "elapsed": elapsed,
+            "speed": speed,
+            "eta": eta,
+        }
+
+    def report(self):
+        """
+        输出一次进度
+        """
+        snapshot = self.snapshot()
+        if self.reporter is not None:
+            try:
+                self.reporter(snapshot)
+            except Exception as e:
+                logger.warn(f"上传进度回调失败: {e}")
+        eta = "-" if snapshot["eta"] is None else str(timedelta(seconds=int(snapshot["eta"])))
+        logger.info(
+            f"上传进度: {snapshot['description']}，"
+            f"{snapshot['completed'] / (1 << 20):.1f} / {snapshot['total'] / (1 << 20):.1f} MB，"
+            f"速率 {snapshot['speed'] / (1 << 20):.2f} MB/s，剩余 {eta}，进行中 {snapshot['running']}"
+        )
+
+    def __run(self):
+        while not self._stop_event.wait(self.interval):
+            self.report()
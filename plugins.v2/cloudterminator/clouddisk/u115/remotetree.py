@@ -0,0 +1,178 @@
+__doc__ = "115 网盘远程目录树索引：按页批量拉取整个子树，避免逐个目录列举"
+
+from collections.abc import Callable, Iterable
+from threading import Lock
+
+from p115 import check_response
+
+from app.log import logger
+
+
+# 单页数量，115 接口上限为 1150
+DEFAULT_PAGE_SIZE = 1150
+# 预取的最大页数，子树条目超过该数量时不预取
+DEFAULT_MAX_PAGES = 20
+
+
+def normalize_item(item: dict, parent_path: str = "") -> dict:
+    """
+    将 fs_files 返回的条目转换为与 fs.listdir_attr 一致的字段
+    """
+    is_directory = "fid" not in item
+    if is_directory:
+        attr_id, parent_id = int(item["cid"]), int(item.get("pid") or 0)
+    else:
+        attr_id, parent_id = int(item["fid"]), int(item.get("cid") or 0)
+    name = item["n"]
+    return {
+        "id": attr_id,
+        "parent_id": parent_id,
+        "name": name,
+        "is_directory": is_directory,
+        "size": int(item.get("s") or 0),
+        "sha1": item.get("sha", ""),
+        "pickcode": item.get("pc", ""),
+        "ctime": int(item.get("tp") or item.get("te") or 0),
+        "mtime": int(item.get("te") or item.get("tp") or 0),
+        "path": f"{parent_path.rstrip('/')}/{name}" if parent_path else "",
+    }
+
+
+class RemoteTreeIndex:
+    """
+    目标目录子树索引
+
+    prefetch 时以 cur=0 分页拉取整个子树，按父目录 id 建立 {(名称, 是否目录): 属性} 索引，
+    之后的查询不再请求接口。子树超过 max_pages 页时不预取；批量结果中未出现的目录
+    （例如接口未返回目录条目时）在首次查询时退回到单目录列举，并缓存结果
+    """
+
+    def __init__(
+        self,
+        client,
+        listdir: Callable[[int], Iterable[dict]],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_pages: int = DEFAULT_MAX_PAGES,
+    ):
+        self.client = client
+        self.listdir = listdir
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._lock = Lock()
+        # 父目录 id → {(名称, 是否目录): 属性}
+        self._children: dict[int, dict[tuple[str, bool], dict]] = {}
+        # 目录 id → 路径
+        self._paths: dict[int, str] = {}
+        # 统计
+        self.pages = 0
+        self.listdirs = 0
+
+    def prefetch(self, root_id: int, root_path: str = "") -> bool:
+        """
+        分页拉取 root_id 下的整个子树，子树过大或接口未返回目录条目时放弃，由 children 逐个目录列举
+
+        :return: 是否已预取
+        """
+        items: list[dict] = []
+        offset = 0
+        while True:
+            resp = check_response(self.client.fs_files({
+                "cid": root_id,
+                "cur": 0,
+                "show_dir": 1,
+                "offset": offset,
+                "limit": self.page_size,
+            }))
+            self.pages += 1
+            data = resp.get("data") or []
+            count = int(resp.get("count") or 0)
+            if not offset:
+                if count > self.max_pages * self.page_size:
+                    logger.info(
+                        f"远程目录树条目 {count} 超过预取上限 {self.max_pages * self.page_size}，"
+                        f"改为逐个目录列举: {root_id}"
+                    )
+                    return False
+                if not any("fid" not in item for item in data) and any(
+                    int(item.get("cid") or 0) != root_id for item in data if "fid" in item
+                ):
+                    # 接口未返回目录条目，无法得到完整的目录结构，在第一页即放弃
+                    logger.warn(f"预取远程目录树未返回目录，改为逐个目录列举: {root_id}")
+                    return False
+            items.extend(data)
+            offset += len(data)
+            if not data or offset >= count:
+                break
+        dirs = [item for item in items if "fid" not in item]
+        files = [item for item in items if "fid" in item]
+        with self._lock:
+            self._paths[root_id] = root_path
+            self._children.setdefault(root_id, {})
+            for item in dirs:
+                self._children.setdefault(int(item["cid"]), {})
+            # 目录按层级逐步补全路径
+            pending = dirs
+            while pending:
+                rest = []
+                for item in pending:
+                    parent_id = int(item.get("pid") or 0)
+                    if parent_id in self._paths:
+                        attr = normalize_item(item, self._paths[parent_id])
+                        self._paths[attr["id"]] = attr["path"]
+                        self._children.setdefault(parent_id, {})[(attr["name"], True)] = attr
+                    else:
+                        rest.append(item)
+                if len(rest) == len(pending):
+                    break
+                pending = rest
+            for item in files:
+                parent_id = int(item.get("cid") or 0)
+                if parent_id in self._children:
+                    attr = normalize_item(item, self._paths.get(parent_id, ""))
+                    self._children[parent_id][(attr["name"], False)] = attr
+        logger.info(
+            f"预取远程目录树: {root_id}，条目 {len(items)}，目录 {len(self._paths)}，请求 {self.pages} 页"
+        )
+        return True
+
+    def children(self, dir_id: int) -> dict[tuple[str, bool], dict]:
+        """
+        获取目录下的条目，未预取的目录退回单目录列举
+        """
+        with self._lock:
+            children = self._children.get(dir_id)
+            if children is not None:
+                return dict(children)
+        children = {
+            (attr["name"], attr["is_directory"]): attr for attr in self.listdir(dir_id)
+        }
+        with self._lock:
+            self.listdirs += 1
+            self._children[dir_id] = children
+            return dict(children)
+
+    def add(self, parent_id: int, attr: dict):
+        """
+        新建目录或上传文件后更新索引
+        """
+        with self._lock:
+            if not attr.get("path") and parent_id in self._paths:
+                attr = {**attr, "path": self._paths[parent_id].rstrip("/") + "/" + attr["name"]}
+            if parent_id in self._children:
+                self._children[parent_id][(attr["name"], attr["is_directory"])] = attr
+            if attr["is_directory"]:
+                self._children.setdefault(attr["id"], {})
+                if attr.get("path"):
+                    self._paths[attr["id"]] = attr["path"]
+
+    def remove(self, parent_id: int, ids: Iterable[int]):
+        """
+        删除文件后更新索引
+        """
+        ids = set(ids)
+        with self._lock:
+            children = self._children.get(parent_id)
+            if not children:
+                return
+            for key in [k for k, v in children.items() if v["id"] in ids]:
+                del children[key]
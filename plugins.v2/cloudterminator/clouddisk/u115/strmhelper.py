@@ -112,6 +112,8 @@ class U115StrmHelper:
     def generate_strm_files(self, pan_path, target_dir, pickcode, server_address):
         """
         依据网盘路径生成 STRM 文件
+
+        :return: 是否生成，非媒体文件或 STRM 已存在时返回 False
         """
 
         target_dir = target_dir.rstrip("/")
@@ -127,11 +129,11 @@ class U115StrmHelper:
 
         if file_path.suffix not in self.rmt_mediaext:
             logger.warn("跳过网盘路径： %s", pan_path)
-            return
+            return False
 
         if strm_oper.get_by_path(str(new_file_path)):
             logger.warn("跳过 %s", str(new_file_path))
-            return
+            return False
 
         new_file_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -141,3 +143,4 @@ class U115StrmHelper:
 
         strm_oper.add(file_path=str(new_file_path), content=content)
         logger.info("生成 %s", str(new_file_path))
+        return True
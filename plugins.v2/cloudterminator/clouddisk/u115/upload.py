@@ -4,13 +4,17 @@ __license__ = "MIT"
 
 
 import errno
+import sys
+import time
 
 from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha1
 from contextlib import contextmanager
 from datetime import datetime
 from functools import partial
 from os import fspath, remove, removedirs, scandir, stat
-from os.path import dirname, normpath
+from os.path import dirname, normpath, relpath, sep
 from textwrap import indent
 from threading import Lock
 from traceback import format_exc
@@ -22,7 +26,6 @@ from dataclasses import dataclass, field
 from typing import NamedTuple, TypedDict
 
 from concurrenttools import thread_batch
-from hashtools import file_digest
 from p115 import check_response, MultipartUploadAbort, MultipartResumeData
 from posixpatht import (
     escape,
@@ -45,6 +48,12 @@ from httpx import RequestError
 
 from app.log import logger
 
+from .bulkdelete import bulk_delete
+from .ed2k import Ed2kHash, ed2k_link, md4_available, offline_ed2k
+from .hashing import digest_file, ProgressThrottle
+from .progress import HeadlessProgress
+from .remotetree import RemoteTreeIndex
+
 
 @dataclass
 class Task:
@@ -53,7 +62,13 @@ class Task:
     dst_attr: None | str | Mapping = None
     times: int = 0
     reasons: list[BaseException] = field(default_factory=list)
-    pikcode: str | None = None
+    pickcode: str | None = None
+    # 预先计算的文件哈希
+    hash_future: None | Future = None
+    # 上传台账中的记录
+    record: None | dict = None
+    # 本次运行是否已尝试过 ed2k 离线下载
+    offline_tried: bool = False
 
 
 class Tasks(TypedDict):
@@ -83,13 +98,59 @@ def get_status_code(e: BaseException, /) -> int:
     return status or 0
 
 
-def upload_files(client, src_path, dst_path):
+def upload_files(
+    client,
+    src_path,
+    dst_path,
+    max_workers: int = 1,
+    hash_workers: int = 1,
+    hash_cache=None,
+    hash_mmap: bool = False,
+    headless: None | bool = None,
+    progress_interval: float = 30,
+    on_progress: None | Callable[[dict], object] = None,
+    ledger=None,
+    ledger_interval: int = 1,
+    prefetch_remote: bool = False,
+    prefetch_max_pages: int = 20,
+    on_success: None | Callable[[Task, str], object] = None,
+    offline_ed2k_timeout: float = 60,
+    delete_chunk_size: int = 1000,
+    delete_workers: int = 4,
+):
+    """
+    上传文件或目录到 115 网盘
+
+    :param max_workers: 并发上传的线程数
+    :param hash_workers: 预先计算哈希的线程数，0 为不预先计算，
+                         大于 0 时在上传当前文件的同时计算后续文件的哈希
+    :param hash_cache: 文件哈希缓存，需提供 get(attr)、get_ed2k(attr) 和 set(attr, sha1, ed2k) 方法，
+                       文件未变化时跳过哈希计算
+    :param hash_mmap: 计算哈希时是否使用内存映射读取，否则使用大块读取
+    :param headless: 是否不渲染进度条，仅统计并定时输出进度，默认在标准输出不是终端时启用
+    :param progress_interval: 无界面模式下输出进度的间隔秒数
+    :param on_progress: 无界面模式下的进度回调，参数为进度快照
+    :param ledger: 上传台账，需提供 get / start / save_ticket / clear_ticket / finish 方法，
+                   记录分块上传凭证与上传结果，重新运行时续传未完成的文件、跳过已完成的文件；
+                   也可提供 save_progress 方法，分块上传过程中定时更新已上传字节数
+    :param ledger_interval: 分块上传时每上传多少个分块更新一次台账中的已上传字节数
+    :param prefetch_remote: 上传目录时是否预先分页拉取整个目标子树，
+                            否则在处理每个目录时单独列举一次；适合目标目录较小、本地目录层级较多的情况
+    :param prefetch_max_pages: 预取的最大页数（每页 1150 条），目标子树超过时改为逐个目录列举
+    :param on_success: 每个文件上传成功（或确认已上传）后立即调用，参数为任务和网盘路径
+    :param offline_ed2k_timeout: 115 GB ~ 500 GB 的文件先尝试 ed2k 离线下载，等待完成的秒数，
+                                 0 为不尝试
+    :param delete_chunk_size: 删除网盘上被替换文件时每次请求的数量
+    :param delete_workers: 删除网盘上被替换文件时的并发请求数
+    """
     part_size = 1 << 30
-    max_workers = 1
+    max_workers = max(max_workers, 1)
     max_retries = -1
     resume = False
     remove_done = False
     with_root = False
+    if headless is None:
+        headless = not sys.stdout.isatty()
 
     count_lock: None | ContextManager = None
     if max_workers > 1:
@@ -97,6 +158,8 @@ def upload_files(client, src_path, dst_path):
 
     do_request: None | Callable = None
     fs = client.get_fs(request=do_request)
+    # 目标目录索引，目录任务重试时不再重复列举
+    remote_index = RemoteTreeIndex(client, fs.listdir_attr, max_pages=prefetch_max_pages)
 
     @contextmanager
     def ensure_cm(cm):
@@ -127,6 +190,12 @@ def upload_files(client, src_path, dst_path):
         "unfinished": {"total": 0, "files": 0, "dirs": 0, "size": 0},
         # 各种错误数量和分类汇总
         "errors": {"total": 0, "files": 0, "dirs": 0, "reasons": {}},
+        # 哈希缓存命中情况
+        "hash_cache": {"hits": 0, "misses": 0, "hit_rate": 0.0},
+        # 哈希计算吞吐量
+        "hashing": {"files": 0, "size": 0, "seconds": 0.0, "speed": ""},
+        # ed2k 离线下载情况
+        "offline": {"total": 0, "success": 0},
         # 是否执行完成：如果是 False，说明是被人为终止
         "is_completed": False,
     }
@@ -144,6 +213,21 @@ def upload_files(client, src_path, dst_path):
     errors: dict = stats["errors"]
     # 各种错误的分类汇总
     reasons: dict[str, int] = errors["reasons"]
+    # 哈希缓存命中情况
+    hash_cache_stats: dict = stats["hash_cache"]
+    # 哈希可能在预计算线程中进行，单独加锁
+    hash_cache_lock = Lock()
+    # 哈希计算吞吐量
+    hashing_stats: dict = stats["hashing"]
+    # 115 GB ~ 500 GB 的文件同时计算 ed2k，用于离线下载
+    ed2k_range = (115 << 30, 500 << 30)
+    ed2k_enabled = offline_ed2k_timeout > 0 and md4_available()
+    ed2k_hashes: dict[str, str] = {}
+    offline_stats: dict = stats["offline"]
+    # 各文件本次已上传的字节数，中断时写入上传台账
+    uploaded_bytes: dict[str, int] = {}
+    # 分块上传中的文件 → 台账状态，上传中断时 p115 返回的凭证写入台账，之后定时更新已上传字节数
+    multiparts: dict[str, dict] = {}
     # 开始时间
     start_time = stats["start_time"]
 
@@ -238,7 +322,11 @@ def upload_files(client, src_path, dst_path):
             except KeyError:
                 reasons[exctype] = 1
 
-    def hash_report(attr):
+    def hash_report(attr, hashers: dict):
+        if headless:
+            return digest_file(
+                attr["path"], hashers, use_mmap=hash_mmap, cancelled=lambda: closed
+            )
         update_desc = rotate_text(attr["name"], 22, interval=0.1).__next__
         task = progress.add_task(
             "[bold blink red on yellow]DIGESTING[/bold blink red on yellow] "
@@ -256,20 +344,37 @@ def upload_files(client, src_path, dst_path):
             progress.update(statistics_bar, description=get_stat_str())
 
         try:
-            return file_digest(
-                open(attr["path"], "rb"),
-                "sha1",
-                callback=hash_progress,
+            return digest_file(
+                attr["path"],
+                hashers,
+                use_mmap=hash_mmap,
+                callback=ProgressThrottle(hash_progress),
+                cancelled=lambda: closed,
             )
         finally:
             progress.remove_task(task)
 
     def add_report(_, attr):
+        uploaded_bytes[attr["path"]] = 0
+        if headless:
+            while not closed:
+                step = yield
+                uploaded_bytes[attr["path"]] += step
+                report_multipart(attr)
+                progress.update(
+                    statistics_bar,
+                    description=get_stat_str(),
+                    advance=step,
+                    total=tasks["size"],
+                )
+            return
         update_desc = rotate_text(attr["name"], 32, interval=0.1).__next__
         _task = progress.add_task(update_desc(), total=attr["size"])
         try:
             while not closed:
                 step = yield
+                uploaded_bytes[attr["path"]] += step
+                report_multipart(attr)
                 progress.update(_task, description=update_desc(), advance=step)
                 progress.update(
                     statistics_bar,
@@ -280,6 +385,146 @@ def upload_files(client, src_path, dst_path):
         finally:
             progress.remove_task(_task)
 
+    def report_multipart(attr):
+        state = multiparts.get(attr["path"])
+        if state is None or not state["ticket"]:
+            return
+        uploaded = uploaded_bytes[attr["path"]]
+        if uploaded - state["saved"] < max(ledger_interval, 1) * part_size:
+            return
+        state["saved"] = uploaded
+        call_ledger(
+            "save_progress",
+            attr,
+            state["dst_pid"],
+            state["name"],
+            min(state["base"] + uploaded, attr["size"]),
+        )
+
+    def update_hash_cache(hit: bool):
+        with hash_cache_lock:
+            hash_cache_stats["hits" if hit else "misses"] += 1
+            total = hash_cache_stats["hits"] + hash_cache_stats["misses"]
+            hash_cache_stats["hit_rate"] = hash_cache_stats["hits"] / total
+
+    def wants_ed2k(attr) -> bool:
+        return ed2k_enabled and ed2k_range[0] < attr["size"] <= ed2k_range[1]
+
+    def digest(attr) -> tuple[int, str]:
+        if hash_cache is not None:
+            try:
+                filesha1 = hash_cache.get(attr)
+                ed2k = hash_cache.get_ed2k(attr) if filesha1 and wants_ed2k(attr) else None
+            except Exception as e:
+                logger.warn(f"读取哈希缓存失败: {attr['path']!r}: {e}")
+                filesha1 = ed2k = None
+            if filesha1 and wants_ed2k(attr) and not ed2k:
+                # 需要离线下载的文件缺少 ed2k 时重新计算
+                logger.info(f"哈希缓存缺少 ed2k，重新计算: {attr['path']!r}")
+                filesha1 = None
+            update_hash_cache(bool(filesha1))
+            if filesha1:
+                logger.info(f"命中哈希缓存: sha1({attr['path']!r}) = {filesha1!r}")
+                if ed2k:
+                    ed2k_hashes[attr["path"]] = ed2k
+                return attr["size"], filesha1
+        hashers: dict = {"sha1": sha1()}
+        if wants_ed2k(attr):
+            hashers["ed2k"] = Ed2kHash()
+        begin = time.perf_counter()
+        filesize, hashes = hash_report(attr, hashers)
+        elapsed = time.perf_counter() - begin
+        filesha1 = hashes["sha1"].hexdigest()
+        ed2k = None
+        if "ed2k" in hashes:
+            ed2k = ed2k_hashes[attr["path"]] = hashes["ed2k"].hexdigest()
+        with hash_cache_lock:
+            hashing_stats["files"] += 1
+            hashing_stats["size"] += filesize
+            hashing_stats["seconds"] += elapsed
+            if hashing_stats["seconds"]:
+                hashing_stats["speed"] = f"{hashing_stats['size'] / hashing_stats['seconds'] / (1 << 20):.1f} MB/s"
+        digests = ", ".join(f"{k} = {h.hexdigest()!r}" for k, h in hashes.items())
+        logger.info(
+            f"计算哈希: {attr['path']!r}: {digests}，"
+            f"{elapsed:.1f} 秒，{filesize / max(elapsed, 1e-6) / (1 << 20):.1f} MB/s"
+        )
+        if hash_cache is not None:
+            try:
+                hash_cache.set(attr, filesha1, ed2k)
+            except Exception as e:
+                logger.warn(f"写入哈希缓存失败: {attr['path']!r}: {e}")
+        return filesize, filesha1
+
+    def call_ledger(method: str, *args, **kwargs):
+        if ledger is None:
+            return None
+        try:
+            return getattr(ledger, method)(*args, **kwargs)
+        except Exception as e:
+            logger.warn(f"上传台账 {method} 失败: {args[0]['path']!r}: {e}")
+            return None
+
+    def notify_success(task: Task):
+        if on_success is None:
+            return
+        src_file = task.src_attr["path"]
+        if src_file == stats["src_path"]:
+            remote_path = stats["dst_path"]
+        else:
+            remote_path = pjoinpath(
+                stats["dst_path"], relpath(src_file, stats["src_path"]).replace(sep, "/")
+            )
+        try:
+            on_success(task, remote_path)
+        except Exception as e:
+            logger.warn(f"上传成功回调失败: {src_file!r}: {e}")
+
+    def try_offline(task: Task, name: str, filesize: int, ed2k: str) -> bool:
+        """
+        115 GB ~ 500 GB 的文件先用 ed2k 离线下载，115 已有该文件时可免去上传；
+        每个任务只尝试一次，上传重试时不再等待离线下载
+        """
+        task.offline_tried = True
+        with hash_cache_lock:
+            offline_stats["total"] += 1
+        try:
+            if not offline_ed2k(
+                client,
+                ed2k_link(name, filesize, ed2k),
+                task.dst_pid,
+                timeout=offline_ed2k_timeout,
+            ):
+                return False
+            task.pickcode = fs.attr([name], pid=task.dst_pid)["pickcode"]
+        except Exception as e:
+            logger.warn(f"ed2k 离线下载失败，改为上传: {task.src_attr['path']!r}: {e}")
+            return False
+        with hash_cache_lock:
+            offline_stats["success"] += 1
+        return True
+
+    def get_hash(task: Task):
+        """
+        获取文件哈希，优先使用预先计算的结果；尚未开始计算的则取消排队，直接在当前线程计算
+        """
+        record = task.record
+        if record and record["sha1"]:
+            if not wants_ed2k(task.src_attr) or task.offline_tried:
+                return task.src_attr["size"], record["sha1"]
+            if record.get("ed2k"):
+                ed2k_hashes[task.src_attr["path"]] = record["ed2k"]
+                return task.src_attr["size"], record["sha1"]
+            # 台账中缺少 ed2k，由哈希缓存或重新计算取得
+        future = task.hash_future
+        if future is not None and (future.done() or not future.cancel()):
+            try:
+                return future.result()
+            except BaseException:
+                task.hash_future = None
+                raise
+        return digest(task.src_attr)
+
     def work(task: Task, submit):
         src_attr, dst_pid, dst_attr = task.src_attr, task.dst_pid, task.dst_attr
         src_path = src_attr["path"]
@@ -308,6 +553,7 @@ def upload_files(client, src_path, dst_path):
                                 "is_directory": True,
                             }
                             subdattrs = {}
+                            remote_index.add(dst_pid, task.dst_attr)
                             logger.info(
                                 f"创建目录: {src_path!r} ➜ {name!r} in {dst_pid}"
                             )
@@ -319,10 +565,7 @@ def upload_files(client, src_path, dst_path):
                         )
                         dst_id = dst_attr["id"]
                 if subdattrs is None:
-                    subdattrs = {
-                        (attr["name"], attr["is_directory"]): attr
-                        for attr in fs.listdir_attr(dst_id)
-                    }
+                    subdattrs = remote_index.children(dst_id)
                 subattrs = [
                     a
                     for a in map(get_path_attr, scandir(src_path))
@@ -343,6 +586,9 @@ def upload_files(client, src_path, dst_path):
                     subpath = subattr["path"]
                     is_directory = subattr["is_directory"]
                     key = subname, is_directory
+                    record = None
+                    if not is_directory:
+                        record = call_ledger("get", subattr, dst_id, subname)
                     if key in subdattrs:
                         subdattr = subdattrs[key]
                         subdpath = subdattr["path"]
@@ -358,11 +604,30 @@ def upload_files(client, src_path, dst_path):
                             update_success(1, 1, subattr["size"])
                             progress.update(statistics_bar, description=get_stat_str())
                             continue
+                        elif (
+                            record
+                            and record["status"] == "done"
+                            and record["pickcode"]
+                            and record["pickcode"] == subdattr.get("pickcode")
+                        ):
+                            logger.info(f"已上传过: {subpath!r} ➜ {subdpath!r}")
+                            update_success(1, 1, subattr["size"])
+                            progress.update(statistics_bar, description=get_stat_str())
+                            success_tasks[subpath] = Task(subattr, dst_id, subname, pickcode=record["pickcode"])
+                            notify_success(success_tasks[subpath])
+                            continue
                         else:
                             subtask = Task(subattr, dst_id, subname)
                             pending_to_remove.append(subdattr["id"])
                     else:
                         subtask = Task(subattr, dst_id, subname)
+                    subtask.record = record
+                    if (
+                        hash_executor is not None
+                        and not is_directory
+                        and not (record and record["sha1"])
+                    ):
+                        subtask.hash_future = hash_executor.submit(digest, subattr)
                     unfinished_tasks[subpath] = subtask
                     submit(subtask)
                 if not subattrs and remove_done:
@@ -371,18 +636,21 @@ def upload_files(client, src_path, dst_path):
                     except OSError:
                         pass
                 if pending_to_remove:
-                    for i in range(0, len(pending_to_remove), 1_000):
-                        part_ids = pending_to_remove[i : i + 1_000]
-                        try:
-                            resp = fs.fs_delete(part_ids)
-                            logger.info(f"""\
-    删除文件列表
-    ├ ids({len(part_ids)}) = {part_ids}
-    ├ response = {resp}""")
-                        except BaseException as e:
-                            logger.warn(f"""删除文件列表失败
-    ├ ids({len(part_ids)}) = {part_ids}
-    ├ reason = {type(e).__module__}.{type(e).__qualname__}: {e}""")
+                    result = bulk_delete(
+                        fs.fs_delete,
+                        pending_to_remove,
+                        chunk_size=delete_chunk_size,
+                        max_workers=delete_workers,
+                    )
+                    failed_ids = set(result["failed"])
+                    remote_index.remove(
+                        dst_id, [i for i in pending_to_remove if i not in failed_ids]
+                    )
+                    log = logger.warn if failed_ids else logger.info
+                    log(f"""\
+    删除文件列表: {dst_id}
+    ├ deleted = {result["deleted"]} / {result["total"]}，requests = {result["requests"]}，elapsed = {result["elapsed"]:.1f}s
+    ├ failed({len(failed_ids)}) = {result["failed"]}""")
                 update_success(1)
             else:
                 if not name:
@@ -394,35 +662,105 @@ def upload_files(client, src_path, dst_path):
                 elif src_attr["size"] > 1 << 34:  # 16 GB
                     # NOTE: 介于 1 GB 和 16 GB 时直接流式上传，超过 16 GB 时，使用分块上传
                     kwargs["partsize"] = part_size
-                # TODO: 如果 115 GB < src_attr["size"] <= 500 GB，则计算 ed2k 后离线下载
-                filesize, filehash = hash_report(src_attr)
-                logger.info(f"计算哈希: sha1({src_path!r}) = {filehash.hexdigest()!r}")
+                if task.record is None:
+                    task.record = call_ledger("get", src_attr, dst_pid, name)
+                filesize, filesha1 = get_hash(task)
                 kwargs["filesize"] = filesize
-                kwargs["filesha1"] = filehash.hexdigest()
-                ticket: MultipartResumeData
-                for i in range(5):
-                    if i:
-                        logger.warn(f"""\
+                kwargs["filesha1"] = filesha1
+                # 上传重试时仍需写入台账，上传完成后才移除
+                ed2k = ed2k_hashes.get(src_path)
+                call_ledger("start", src_attr, dst_pid, name, filesha1, ed2k)
+                if ed2k and not task.offline_tried and try_offline(task, name, filesize, ed2k):
+                    call_ledger("finish", src_attr, dst_pid, name, task.pickcode)
+                    ed2k_hashes.pop(src_path, None)
+                    logger.info(f"""\
+    离线下载: {src_path!r} ➜ {name!r} in {dst_pid}
+    ├ ed2k = {ed2k}""")
+                    update_success(1, 1, src_attr["size"])
+                    progress.update(statistics_bar, description=get_stat_str())
+                    success_tasks[src_path] = unfinished_tasks.pop(src_path)
+                    notify_success(task)
+                    return
+                ticket: None | MultipartResumeData = None
+                resumed = False
+                if "partsize" in kwargs and task.record and task.record["ticket"]:
+                    # 使用台账中的凭证续传，已完成的分块不再上传
+                    ticket = kwargs["multipart_resume_data"] = task.record["ticket"]
+                    resumed = True
+                    logger.info(f"""\
+    续传文件: {src_path!r} ➜ {name!r} in {dst_pid}
+    ├ uploaded = {task.record["uploaded"]}
+    ├ ticket = {ticket}""")
+                if "partsize" in kwargs and ledger is not None:
+                    multiparts[src_path] = {
+                        "dst_pid": dst_pid,
+                        "name": name,
+                        # 有凭证后才定时更新已上传字节数
+                        "ticket": ticket is not None,
+                        "base": task.record["uploaded"] if resumed else 0,
+                        "saved": 0,
+                    }
+                try:
+                    for i in range(5):
+                        if i:
+                            logger.warn(f"""\
     重试上传: {src_path!r} ➜ {name!r} in {dst_pid}
     ├ ticket = {ticket}""")
-                    try:
-                        resp = client.upload_file(
-                            src_path,
-                            name,
-                            pid=dst_pid,
-                            make_reporthook=partial(add_report, attr=src_attr),
-                            **kwargs,
-                        )
-                        break
-                    except MultipartUploadAbort as e:
-                        exc = e
-                        ticket = kwargs["multipart_resume_data"] = e.ticket
-                else:
-                    raise exc
+                        uploaded_bytes[src_path] = 0
+                        try:
+                            resp = client.upload_file(
+                                src_path,
+                                name,
+                                pid=dst_pid,
+                                make_reporthook=partial(add_report, attr=src_attr),
+                                **kwargs,
+                            )
+                            break
+                        except MultipartUploadAbort as e:
+                            # 分块上传中断，p115 返回续传凭证，写入台账供重试和下次运行续传
+                            exc = e
+                            ticket = kwargs["multipart_resume_data"] = e.ticket
+                            resumed = True
+                            uploaded = uploaded_bytes.get(src_path, 0)
+                            state = multiparts.get(src_path)
+                            if state is not None:
+                                state["base"] = uploaded = min(state["base"] + uploaded, src_attr["size"])
+                                state.update(ticket=True, saved=0)
+                            call_ledger("save_ticket", src_attr, dst_pid, name, ticket, uploaded)
+                        except Exception as e:
+                            if not resumed:
+                                raise
+                            # 凭证已失效，改为重新上传
+                            exc = e
+                            resumed = False
+                            ticket = None
+                            kwargs.pop("multipart_resume_data", None)
+                            call_ledger("clear_ticket", src_attr, dst_pid, name)
+                            state = multiparts.get(src_path)
+                            if state is not None:
+                                state.update(ticket=False, base=0, saved=0)
+                    else:
+                        raise exc
+                finally:
+                    multiparts.pop(src_path, None)
                 check_response(resp)
                 task.pickcode = resp.get("pickcode") or resp.get("data", {}).get(
                     "pickcode"
                 )
+                call_ledger("finish", src_attr, dst_pid, name, task.pickcode)
+                uploaded_bytes.pop(src_path, None)
+                ed2k_hashes.pop(src_path, None)
+                file_id = (resp.get("data") or {}).get("file_id")
+                if file_id:
+                    remote_index.add(dst_pid, {
+                        "id": int(file_id),
+                        "parent_id": dst_pid,
+                        "name": name,
+                        "is_directory": False,
+                        "size": src_attr["size"],
+                        "pickcode": task.pickcode,
+                        "ctime": int(datetime.now().timestamp()),
+                    })
                 if resp.get("status") == 2 and resp.get("statuscode") == 0:
                     prompt = "秒传文件"
                 else:
@@ -442,6 +780,8 @@ def upload_files(client, src_path, dst_path):
                         pass
             progress.update(statistics_bar, description=get_stat_str())
             success_tasks[src_path] = unfinished_tasks.pop(src_path)
+            if not src_attr["is_directory"]:
+                notify_success(task)
         except BaseException as e:
             task.reasons.append(e)
             update_errors(e, src_attr["is_directory"])
@@ -475,15 +815,19 @@ def upload_files(client, src_path, dst_path):
     dst_attr: None | dict = None
     name: str = src_attr["name"]
     is_directory = src_attr["is_directory"]
-    with Progress(
-        SpinnerColumn(),
-        *Progress.get_default_columns(),
-        TimeElapsedColumn(),
-        MofNCompleteColumn(),
-        DownloadColumn(),
-        FileSizeColumn(),
-        TransferSpeedColumn(),
-    ) as progress:
+    if headless:
+        progress_cm: ContextManager = HeadlessProgress(progress_interval, on_progress)
+    else:
+        progress_cm = Progress(
+            SpinnerColumn(),
+            *Progress.get_default_columns(),
+            TimeElapsedColumn(),
+            MofNCompleteColumn(),
+            DownloadColumn(),
+            FileSizeColumn(),
+            TransferSpeedColumn(),
+        )
+    with progress_cm as progress:
         if isinstance(dst_path, str):
             if dst_path == "0" or pnormpath(dst_path) in ("", "/"):
                 dst_pid = 0
@@ -535,6 +879,11 @@ def upload_files(client, src_path, dst_path):
             else:
                 dst_pid = dst_attr["parent_id"]
                 dst_path = dst_attr["path"]
+        if is_directory and prefetch_remote:
+            try:
+                remote_index.prefetch(dst_pid, dst_path)
+            except Exception as e:
+                logger.warn(f"预取远程目录树失败，改为逐个目录列举: {dst_path!r}: {e}")
         task = Task(src_attr, dst_pid, None if is_directory else name)
         unfinished_tasks: dict[str, Task] = {src_attr["path"]: task}
         success_tasks: dict[str, Task] = {}
@@ -547,17 +896,32 @@ def upload_files(client, src_path, dst_path):
         stats["src_path"] = src_attr["path"]
         stats["dst_path"] = dst_path
         update_tasks(1, not src_attr["is_directory"], src_attr.get("size"))
-        get_stat_str = (
-            lambda: f"📊 [cyan bold]statistics[/cyan bold] 🧮 {tasks['total']} = 💯 {success['total']} + ⛔ {failed['total']} + ⏳ {unfinished['total']}"
-        )
-        statistics_bar = progress.add_task(get_stat_str(), total=tasks["size"])
+        if headless:
+            get_stat_str = (
+                lambda: f"总数 {tasks['total']} = 成功 {success['total']} + 失败 {failed['total']} + 未完成 {unfinished['total']}"
+            )
+        else:
+            get_stat_str = (
+                lambda: f"📊 [cyan bold]statistics[/cyan bold] 🧮 {tasks['total']} = 💯 {success['total']} + ⛔ {failed['total']} + ⏳ {unfinished['total']}"
+            )
+        statistics_bar = progress.add_task(get_stat_str(), total=tasks["size"], summary=True)
         closed = False
+        hash_executor: None | ThreadPoolExecutor = None
+        if hash_workers > 0:
+            hash_executor = ThreadPoolExecutor(hash_workers, thread_name_prefix="u115-hash")
         try:
             thread_batch(work, unfinished_tasks.values(), max_workers=max_workers)
             stats["is_completed"] = True
         finally:
             closed = True
+            if hash_executor is not None:
+                # 正在计算的哈希在读取下一块时停止，等待其退出，避免上传结束后仍在读盘
+                hash_executor.shutdown(wait=True, cancel_futures=True)
             progress.remove_task(statistics_bar)
+            stats["remote_listing"] = {
+                "pages": remote_index.pages,
+                "listdirs": remote_index.listdirs,
+            }
             stats["elapsed"] = str(datetime.now() - start_time)
             logger.info(f"statistics: {stats}")
 
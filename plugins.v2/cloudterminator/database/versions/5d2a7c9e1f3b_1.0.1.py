@@ -0,0 +1,46 @@
+"""1.0.1
+
+Revision ID: 5d2a7c9e1f3b
+Revises: 294b0079357e
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5d2a7c9e1f3b'
+down_revision = '294b0079357e'
+branch_labels = None
+depends_on = None
+
+# 增加 ed2k 字段的表
+ED2K_TABLES = ('u115hashcache', 'u115uploadledger')
+
+
+def upgrade() -> None:
+    """
+    上传哈希缓存与上传台账增加 ed2k 字段，新建的数据库已由 create_all 建好
+    """
+    inspector = sa.inspect(op.get_bind())
+    for table in ED2K_TABLES:
+        if not inspector.has_table(table):
+            continue
+        if 'ed2k' in {column['name'] for column in inspector.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('ed2k', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """
+    回滚
+    """
+    inspector = sa.inspect(op.get_bind())
+    for table in ED2K_TABLES:
+        if not inspector.has_table(table):
+            continue
+        if 'ed2k' not in {column['name'] for column in inspector.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('ed2k')
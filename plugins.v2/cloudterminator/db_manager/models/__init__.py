@@ -1,2 +1,4 @@
 from .u115_strm import U115StrmFiles
 from .u123_smtp import U123StrmFiles
+from .u115_hash import U115HashCache
+from .u115_upload import U115UploadLedger
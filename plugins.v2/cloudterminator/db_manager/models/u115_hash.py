@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, Integer, Sequence
+from sqlalchemy.orm import Session
+
+from ...db_manager import db_update, db_query, CloudTerminatorBase
+
+
+class U115HashCache(CloudTerminatorBase):
+    # ID
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 本地文件路径
+    path = Column(String, unique=True, index=True)
+    # inode
+    inode = Column(Integer)
+    # 设备号
+    dev = Column(Integer)
+    # 文件大小
+    size = Column(Integer)
+    # 修改时间
+    mtime = Column(Integer)
+    # 文件 sha1
+    sha1 = Column(String)
+    # 文件 ed2k，仅 115 GB ~ 500 GB 的文件计算
+    ed2k = Column(String)
+
+    @staticmethod
+    @db_query
+    def get_by_path(db: Session, path: str):
+        return db.query(U115HashCache).filter(U115HashCache.path == path).first()
+
+    @staticmethod
+    @db_update
+    def update_by_path(db: Session, path: str, payload: dict):
+        """
+        更新记录，payload 中的 None 会写入为 NULL
+        """
+        db.query(U115HashCache).filter(U115HashCache.path == path).update(
+            payload, synchronize_session=False
+        )
@@ -0,0 +1,60 @@
+from sqlalchemy import Column, String, Integer, Sequence
+from sqlalchemy.orm import Session
+
+from ...db_manager import db_update, db_query, CloudTerminatorBase
+
+
+class U115UploadLedger(CloudTerminatorBase):
+    # ID
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 本地文件路径
+    path = Column(String, index=True)
+    # 目标目录 id
+    dst_pid = Column(Integer)
+    # 目标文件名
+    name = Column(String)
+    # 文件大小
+    size = Column(Integer)
+    # 修改时间
+    mtime = Column(Integer)
+    # 文件 sha1
+    sha1 = Column(String)
+    # 文件 ed2k，仅 115 GB ~ 500 GB 的文件计算
+    ed2k = Column(String)
+    # 状态：uploading 上传中，done 已完成
+    status = Column(String)
+    # 分块上传凭证，JSON 格式
+    ticket = Column(String)
+    # 已上传字节数
+    uploaded = Column(Integer, default=0)
+    # 上传完成后的 pickcode
+    pickcode = Column(String)
+
+    @staticmethod
+    @db_query
+    def get_by_target(db: Session, path: str, dst_pid: int, name: str):
+        return db.query(U115UploadLedger).filter(
+            U115UploadLedger.path == path,
+            U115UploadLedger.dst_pid == dst_pid,
+            U115UploadLedger.name == name,
+        ).first()
+
+    @staticmethod
+    @db_query
+    def get_done_by_path(db: Session, path: str):
+        return db.query(U115UploadLedger).filter(
+            U115UploadLedger.path == path,
+            U115UploadLedger.status == "done",
+        ).all()
+
+    @staticmethod
+    @db_update
+    def update_by_target(db: Session, path: str, dst_pid: int, name: str, payload: dict):
+        """
+        更新记录，payload 中的 None 会写入为 NULL，用于清除凭证
+        """
+        db.query(U115UploadLedger).filter(
+            U115UploadLedger.path == path,
+            U115UploadLedger.dst_pid == dst_pid,
+            U115UploadLedger.name == name,
+        ).update(payload, synchronize_session=False)
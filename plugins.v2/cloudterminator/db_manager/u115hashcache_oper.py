@@ -0,0 +1,60 @@
+from typing import Optional
+
+from . import DbOper
+from .models.u115_hash import U115HashCache
+
+
+class U115HashCacheOper(DbOper):
+    """
+    115 网盘上传文件哈希缓存
+
+    以 (路径, inode, 设备号, 大小, 修改时间) 判断本地文件是否变化，未变化时复用已计算的哈希
+    """
+
+    # 用于判断文件是否变化的属性
+    keys = ("inode", "dev", "size", "mtime")
+
+    def __get(self, attr: dict) -> Optional[U115HashCache]:
+        data = U115HashCache.get_by_path(self._db, attr["path"])
+        if not data:
+            return None
+        if any(getattr(data, key) != attr[key] for key in self.keys):
+            return None
+        return data
+
+    def get(self, attr: dict) -> Optional[str]:
+        """
+        根据文件属性获取缓存的 sha1，文件已变化时返回 None
+        """
+        data = self.__get(attr)
+        return data.sha1 if data else None
+
+    def get_ed2k(self, attr: dict) -> Optional[str]:
+        """
+        根据文件属性获取缓存的 ed2k，文件已变化或未计算过 ed2k 时返回 None
+        """
+        data = self.__get(attr)
+        return data.ed2k if data else None
+
+    def set(self, attr: dict, sha1: str, ed2k: Optional[str] = None):
+        """
+        写入或更新文件哈希，未计算 ed2k 时清除旧的 ed2k
+        """
+        payload = {key: attr[key] for key in self.keys}
+        payload["sha1"] = sha1
+        payload["ed2k"] = ed2k
+        data = U115HashCache.get_by_path(self._db, attr["path"])
+        if data:
+            # CloudTerminatorBase.update 会忽略值为 None 的字段，旧的 ed2k 无法清除
+            U115HashCache.update_by_path(self._db, attr["path"], payload)
+        else:
+            U115HashCache(path=attr["path"], **payload).create(self._db)
+
+    def delete_by_path(self, path: str):
+        """
+        删除文件哈希
+        """
+        data = U115HashCache.get_by_path(self._db, path)
+        if data:
+            U115HashCache.delete(self._db, data.id)
+        return True
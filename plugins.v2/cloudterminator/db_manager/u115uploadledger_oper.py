@@ -0,0 +1,90 @@
+import json
+from typing import Optional
+
+from . import DbOper
+from .models.u115_upload import U115UploadLedger
+
+
+class U115UploadLedgerOper(DbOper):
+    """
+    115 网盘上传台账
+
+    按 (本地路径, 目标目录 id, 目标文件名) 记录上传进度，文件大小或修改时间变化后记录失效
+    """
+
+    def get(self, attr: dict, dst_pid: int, name: str) -> Optional[dict]:
+        """
+        获取上传记录，本地文件已变化时返回 None
+        """
+        data = U115UploadLedger.get_by_target(self._db, attr["path"], dst_pid, name)
+        if not data:
+            return None
+        if data.size != attr["size"] or data.mtime != attr["mtime"]:
+            return None
+        return {
+            "sha1": data.sha1,
+            "ed2k": data.ed2k,
+            "status": data.status,
+            "ticket": json.loads(data.ticket) if data.ticket else None,
+            "uploaded": data.uploaded or 0,
+            "pickcode": data.pickcode,
+        }
+
+    def is_uploaded(self, attr: dict) -> bool:
+        """
+        本地文件是否已上传完成且之后未变化
+        """
+        return any(
+            data.size == attr["size"] and data.mtime == attr["mtime"]
+            for data in U115UploadLedger.get_done_by_path(self._db, attr["path"]) or ()
+        )
+
+    def __save(self, attr: dict, dst_pid: int, name: str, payload: dict):
+        payload = {"size": attr["size"], "mtime": attr["mtime"], **payload}
+        data = U115UploadLedger.get_by_target(self._db, attr["path"], dst_pid, name)
+        if data:
+            # CloudTerminatorBase.update 会忽略值为 None 的字段，凭证无法清除
+            U115UploadLedger.update_by_target(self._db, attr["path"], dst_pid, name, payload)
+        else:
+            U115UploadLedger(
+                path=attr["path"], dst_pid=dst_pid, name=name, **payload
+            ).create(self._db)
+
+    def start(self, attr: dict, dst_pid: int, name: str, sha1: str, ed2k: Optional[str] = None):
+        """
+        开始上传，已有凭证时保留凭证以便续传
+        """
+        self.__save(attr, dst_pid, name, {"sha1": sha1, "ed2k": ed2k, "status": "uploading"})
+
+    def save_ticket(self, attr: dict, dst_pid: int, name: str, ticket: dict, uploaded: int = 0):
+        """
+        保存分块上传凭证
+        """
+        self.__save(attr, dst_pid, name, {
+            "status": "uploading",
+            "ticket": json.dumps(ticket, ensure_ascii=False, default=str),
+            "uploaded": uploaded,
+        })
+
+    def save_progress(self, attr: dict, dst_pid: int, name: str, uploaded: int):
+        """
+        更新已上传字节数
+        """
+        self.__save(attr, dst_pid, name, {"uploaded": uploaded})
+
+    def clear_ticket(self, attr: dict, dst_pid: int, name: str):
+        """
+        凭证失效时清除
+        """
+        self.__save(attr, dst_pid, name, {"ticket": None, "uploaded": 0})
+
+    def finish(self, attr: dict, dst_pid: int, name: str, pickcode: Optional[str]):
+        """
+        上传完成
+        """
+        self.__save(attr, dst_pid, name, {
+            "status": "done",
+            "ticket": None,
+            "uploaded": attr["size"],
+            "pickcode": pickcode,
+        })
@@ -1,5 +1,4 @@
-from typing import Any, List, Dict, Tuple
-from cachetools import cached, TTLCache
+from typing import Any, List, Dict, Tuple, Optional
 
 from app import schemas
 from app.core.config import settings
@@ -8,7 +7,10 @@ from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
-from app.utils.http import RequestUtils
+
+from .discovercache import ConvertedCache, DiscoverCache, cache_stats_cards
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
 
 IQIYI_CHANNEL_PARAMS = {
     "电视剧": "2",
@@ -24,11 +26,31 @@ HEADERS = {
     "Referer": "https://www.iqiyi.com",
 }
 
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("pcw-api.iqiyi.com",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "爱奇艺"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "tv": {"mtype": "电视剧"},
+    "movie": {"mtype": "电影"},
+    "anime": {"mtype": "动漫"},
+    "variety": {"mtype": "综艺"},
+    "documentary": {"mtype": "纪录片"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+# 转换结果缓存
+CONVERTED = ConvertedCache()
+
+
 class IQiyiDiscover(_PluginBase):
     plugin_name = "爱奇艺探索"
     plugin_desc = "让探索支持爱奇艺的数据浏览。"
     plugin_icon = "https://www.iqiyi.com/favicon.ico"
-    plugin_version = "1.0.0"
+    plugin_version = "1.0.1"
     plugin_author = "DDSRem"
     author_url = "https://github.com/DDSRem"
     plugin_config_prefix = "iqiyidiscover_"
@@ -36,12 +58,26 @@ class IQiyiDiscover(_PluginBase):
     auth_level = 1
 
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    _max_stale = 2
 
     def init_plugin(self, config: dict = None):
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
         if "iqiyi.com" not in settings.SECURITY_IMAGE_DOMAINS:
             settings.SECURITY_IMAGE_DOMAINS.append("iqiyi.com")
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.iqiyi_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -54,8 +90,8 @@ class IQiyiDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "爱奇艺探索数据源",
                 "description": "获取爱奇艺探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
@@ -77,22 +113,44 @@ class IQiyiDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS)
+                + cache_stats_cards(CACHE, CONVERTED),
+            }
+        ]
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("iqiyi")
     def __request(self, **kwargs) -> List[dict]:
         url = "https://pcw-api.iqiyi.com/search/video/v3"
-        res = RequestUtils(headers=HEADERS).get_res(url, params=kwargs)
+        res = get_client().get(url, headers=HEADERS, params=kwargs)
         if res is None or not res.ok:
-            raise Exception(f"请求爱奇艺 API 失败：{res.text if res else '无响应'}")
+            raise Exception(f"请求爱奇艺 API 失败：{res.text if res is not None else '无响应'}")
         return res.json().get("data", {}).get("list", [])
 
     def iqiyi_discover(
@@ -123,7 +181,12 @@ class IQiyiDiscover(_PluginBase):
         except Exception as e:
             logger.error(str(e))
             return []
-        return [__to_media(r) for r in result]
+        # 接口数据未变化时直接返回已转换的结果
+        return CONVERTED.get(
+            tuple(sorted(params.items())),
+            result,
+            lambda: [__to_media(r) for r in result],
+        )
 
     @staticmethod
     def iqiyi_filter_ui() -> List[dict]:
@@ -159,18 +222,23 @@ class IQiyiDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        iqiyi_source = schemas.DiscoverMediaSource(
-            name="爱奇艺",
-            mediaid_prefix="iqiyidiscover",
-            api_path=f"plugin/IQiyiDiscover/iqiyi_discover?apikey={settings.API_TOKEN}",
-            filter_params={"mtype": "电视剧"},
-            filter_ui=self.iqiyi_filter_ui(),
-            depends={"mtype": []},
-        )
+        key = (settings.API_TOKEN,)
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="爱奇艺",
+                mediaid_prefix="iqiyidiscover",
+                api_path=f"plugin/IQiyiDiscover/iqiyi_discover?apikey={settings.API_TOKEN}",
+                filter_params={"mtype": "电视剧"},
+                filter_ui=self.iqiyi_filter_ui(),
+                depends={"mtype": []},
+            )
+        iqiyi_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [iqiyi_source]
         else:
             event_data.extra_sources.append(iqiyi_source)
 
     def stop_service(self):
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
@@ -1,6 +1,4 @@
-from typing import Any, List, Dict, Tuple
-
-from cachetools import cached, TTLCache
+from typing import Any, List, Dict, Optional, Tuple
 
 from app import schemas
 from app.core.config import settings
@@ -9,7 +7,15 @@ from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
-from app.utils.http import RequestUtils
+
+from .discovercache import (
+    BaseUiCache,
+    ConvertedCache,
+    DiscoverCache,
+    cache_stats_cards,
+)
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
 
 
 CHANNEL_PARAMS = {
@@ -27,65 +33,86 @@ HEADERS = {
     "Referer": "https://www.mgtv.com",
 }
 
-BASE_UI = None
-
-
-def init_base_ui():
-    """ "
-    初始化 UI
+def fetch_channel_ui(key: str) -> List[dict]:
+    """
+    获取单个分类的过滤参数 UI
     """
     ui = []
-    for key, _ in CHANNEL_PARAMS.items():
-        params_ui = {
-            "platform": "pcweb",
-            "allowedRC": "1",
-            "channelId": CHANNEL_PARAMS[key],
-            "_support": "10000000",
-        }
-        res = RequestUtils(headers=HEADERS).get_res(
-            "https://pianku.api.mgtv.com/rider/config/channel/v1",
-            params=params_ui,
-        )
-        for item in res.json().get("data").get("listItems"):
-            data = [
-                {
-                    "component": "VChip",
-                    "props": {
-                        "filter": True,
-                        "tile": True,
-                        "value": j["tagId"],
+    params_ui = {
+        "platform": "pcweb",
+        "allowedRC": "1",
+        "channelId": CHANNEL_PARAMS[key],
+        "_support": "10000000",
+    }
+    res = get_client().get(
+        "https://pianku.api.mgtv.com/rider/config/channel/v1",
+        headers=HEADERS,
+        params=params_ui,
+    )
+    if res is None:
+        raise Exception("无法连接芒果TV，请检查网络连接！")
+    if not res.ok:
+        raise Exception(f"请求芒果TV API失败：{res.text}")
+    for item in res.json().get("data").get("listItems"):
+        data = [
+            {
+                "component": "VChip",
+                "props": {
+                    "filter": True,
+                    "tile": True,
+                    "value": j["tagId"],
+                },
+                "text": j["tagName"],
+            }
+            for j in item["items"]
+            if j["tagName"] != "全部"
+        ]
+        ui.append(
+            {
+                "component": "div",
+                "props": {
+                    "class": "flex justify-start items-center",
+                    "show": "{{mtype == '" + key + "'}}",
+                },
+                "content": [
+                    {
+                        "component": "div",
+                        "props": {"class": "mr-5"},
+                        "content": [
+                            {"component": "VLabel", "text": item["typeName"]}
+                        ],
                     },
-                    "text": j["tagName"],
-                }
-                for j in item["items"]
-                if j["tagName"] != "全部"
-            ]
-            ui.append(
-                {
-                    "component": "div",
-                    "props": {
-                        "class": "flex justify-start items-center",
-                        "show": "{{mtype == '" + key + "'}}",
+                    {
+                        "component": "VChipGroup",
+                        "props": {"model": item["eName"]},
+                        "content": data,
                     },
-                    "content": [
-                        {
-                            "component": "div",
-                            "props": {"class": "mr-5"},
-                            "content": [
-                                {"component": "VLabel", "text": item["typeName"]}
-                            ],
-                        },
-                        {
-                            "component": "VChipGroup",
-                            "props": {"model": item["eName"]},
-                            "content": data,
-                        },
-                    ],
-                }
-            )
+                ],
+            }
+        )
     return ui
 
 
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("pianku.api.mgtv.com",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "芒果TV"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "tv": {"mtype": "电视剧"},
+    "movie": {"mtype": "电影"},
+    "anime": {"mtype": "动漫"},
+    "variety": {"mtype": "综艺"},
+    "documentary": {"mtype": "纪录片"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+# 转换结果缓存
+CONVERTED = ConvertedCache()
+
+
 class MangGuoDiscover(_PluginBase):
     # 插件名称
     plugin_name = "芒果TV探索"
@@ -94,7 +121,7 @@ class MangGuoDiscover(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DDS-Derek/MoviePilot-Plugins/main/icons/mangguo_A.jpg"
     # 插件版本
-    plugin_version = "1.0.1"
+    plugin_version = "1.0.12"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -108,14 +135,37 @@ class MangGuoDiscover(_PluginBase):
 
     # 私有属性
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    _max_stale = 2
+    _prefetch = False
+    _base_ui: Optional[BaseUiCache] = None
 
     def init_plugin(self, config: dict = None):
-        global BASE_UI
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
+            self._prefetch = config.get("prefetch")
         if "hitv.com" not in settings.SECURITY_IMAGE_DOMAINS:
             settings.SECURITY_IMAGE_DOMAINS.append("hitv.com")
-        BASE_UI = init_base_ui()
+        self._base_ui = BaseUiCache(
+            self.get_data_path() / "base_ui.json",
+            "芒果TV",
+            {key: key for key in CHANNEL_PARAMS},
+            fetch_channel_ui,
+        )
+        if self._enabled and self._base_ui.expired:
+            self._base_ui.refresh_in_background()
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.mangguo_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -132,8 +182,8 @@ class MangGuoDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "芒果TV探索数据源",
                 "description": "获取芒果TV探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -158,23 +208,60 @@ class MangGuoDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "prefetch",
+                                            "label": "预取下一页",
+                                            "hint": "浏览时在后台提前获取下一页数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "prefetch": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS)
+                + cache_stats_cards(CACHE, CONVERTED),
+            }
+        ]
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("mangguo")
     def __request(self, **kwargs) -> List[schemas.MediaInfo]:
         """
         请求芒果TV API
         """
         api_url = "https://pianku.api.mgtv.com/rider/list/pcweb/v3"
-        res = RequestUtils(headers=HEADERS).get_res(api_url, params=kwargs)
+        res = get_client().get(api_url, headers=HEADERS, params=kwargs)
         if res is None:
             raise Exception("无法连接芒果TV，请检查网络连接！")
         if not res.ok:
@@ -254,19 +341,25 @@ class MangGuoDiscover(_PluginBase):
             if feature:
                 params.update({"feature": feature})
             result = self.__request(**params)
+            if self._prefetch and result:
+                CACHE.prefetch(self.__request, **{**params, "pn": str(page + 1)})
         except Exception as err:
             logger.error(str(err))
             return []
         if not result:
             return []
-        if mtype == "电影":
-            results = [__movie_to_media(movie) for movie in result]
-        else:
-            results = [__series_to_media(series) for series in result]
-        return results
 
-    @staticmethod
-    def mangguo_filter_ui() -> List[dict]:
+        def convert() -> List[schemas.MediaInfo]:
+            if mtype == "电影":
+                results = [__movie_to_media(movie) for movie in result]
+            else:
+                results = [__series_to_media(series) for series in result]
+            return results
+
+        # 接口数据未变化时直接返回已转换的结果
+        return CONVERTED.get((mtype, tuple(sorted(params.items()))), result, convert)
+
+    def mangguo_filter_ui(self) -> List[dict]:
         """
         芒果TV过滤参数UI配置
         """
@@ -297,8 +390,8 @@ class MangGuoDiscover(_PluginBase):
                 ],
             },
         ]
-        for i in BASE_UI:
-            ui.append(i)
+        if self._base_ui:
+            ui.extend(self._base_ui.ui)
 
         return ui
 
@@ -310,33 +403,39 @@ class MangGuoDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        mangguo_source = schemas.DiscoverMediaSource(
-            name="芒果TV",
-            mediaid_prefix="mangguodiscover",
-            api_path=f"plugin/MangGuoDiscover/mangguo_discover?apikey={settings.API_TOKEN}",
-            filter_params={
-                "mtype": "电视剧",
-                "chargeInfo": None,
-                "sort": None,
-                "kind": None,
-                "edition": None,
-                "area": None,
-                "fitAge": None,
-                "year": None,
-                "feature": None,
-            },
-            filter_ui=self.mangguo_filter_ui(),
-            depends={
-                "chargeInfo": ["mtype"],
-                "sort": ["mtype"],
-                "kind": ["mtype"],
-                "edition": ["mtype"],
-                "area": ["mtype"],
-                "fitAge": ["mtype"],
-                "year": ["mtype"],
-                "feature": ["mtype"],
-            },
-        )
+        if self._base_ui and self._base_ui.expired:
+            self._base_ui.refresh_in_background()
+        # 过滤参数在后台更新后重新生成
+        key = (settings.API_TOKEN, self._base_ui.updated_at if self._base_ui else 0)
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="芒果TV",
+                mediaid_prefix="mangguodiscover",
+                api_path=f"plugin/MangGuoDiscover/mangguo_discover?apikey={settings.API_TOKEN}",
+                filter_params={
+                    "mtype": "电视剧",
+                    "chargeInfo": None,
+                    "sort": None,
+                    "kind": None,
+                    "edition": None,
+                    "area": None,
+                    "fitAge": None,
+                    "year": None,
+                    "feature": None,
+                },
+                filter_ui=self.mangguo_filter_ui(),
+                depends={
+                    "chargeInfo": ["mtype"],
+                    "sort": ["mtype"],
+                    "kind": ["mtype"],
+                    "edition": ["mtype"],
+                    "area": ["mtype"],
+                    "fitAge": ["mtype"],
+                    "year": ["mtype"],
+                    "feature": ["mtype"],
+                },
+            )
+        mangguo_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [mangguo_source]
         else:
@@ -346,4 +445,6 @@ class MangGuoDiscover(_PluginBase):
         """
         退出插件
         """
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
@@ -1,6 +1,4 @@
-from typing import Any, List, Dict, Tuple
-
-from cachetools import cached, TTLCache
+from typing import Any, List, Dict, Tuple, Optional
 
 from app import schemas
 from app.core.config import settings
@@ -9,7 +7,30 @@ from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
-from app.utils.http import RequestUtils
+
+from .discovercache import ConvertedCache, DiscoverCache, cache_stats_cards
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
+
+
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("jadeite.migu.cn",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "咪咕视频"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "tv": {"mtype": "电视剧"},
+    "movie": {"mtype": "电影"},
+    "anime": {"mtype": "动漫"},
+    "variety": {"mtype": "综艺"},
+    "documentary": {"mtype": "纪实"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+# 转换结果缓存
+CONVERTED = ConvertedCache()
 
 
 class MiGuDiscover(_PluginBase):
@@ -20,7 +41,7 @@ class MiGuDiscover(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DDS-Derek/MoviePilot-Plugins/main/icons/migu_A.png"
     # 插件版本
-    plugin_version = "1.0.3"
+    plugin_version = "1.0.13"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -35,12 +56,28 @@ class MiGuDiscover(_PluginBase):
     # 私有属性
     _base_api = "https://jadeite.migu.cn/search/v3/category"
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    _max_stale = 2
+    _prefetch = False
 
     def init_plugin(self, config: dict = None):
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
+            self._prefetch = config.get("prefetch")
         if "http://wapx.cmvideo.cn:8080" not in settings.SECURITY_IMAGE_DOMAINS:
             settings.SECURITY_IMAGE_DOMAINS.append("http://wapx.cmvideo.cn:8080")
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.migu_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -57,8 +94,8 @@ class MiGuDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "咪咕视频探索数据源",
                 "description": "获取咪咕视频探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -83,17 +120,54 @@ class MiGuDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "prefetch",
+                                            "label": "预取下一页",
+                                            "hint": "浏览时在后台提前获取下一页数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "prefetch": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS)
+                + cache_stats_cards(CACHE, CONVERTED),
+            }
+        ]
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("migu")
     def __request(
         self, page_num: int, page_size: int, **kwargs
     ) -> List[schemas.MediaInfo]:
@@ -112,10 +186,7 @@ class MiGuDiscover(_PluginBase):
             "User-Agent": settings.USER_AGENT,
             "Referer": "https://www.miguvideo.com/",
         }
-        res = RequestUtils(headers=headers).get_res(
-            api_url,
-            params=params,
-        )
+        res = get_client().get(api_url, headers=headers, params=params)
         if res is None:
             raise Exception("无法连接咪咕视频，请检查网络连接！")
         if not res.ok:
@@ -246,16 +317,23 @@ class MiGuDiscover(_PluginBase):
             if mediaAge:
                 params.update({"mediaAge": mediaAge})
             result = self.__request(**params)
+            if self._prefetch and result:
+                CACHE.prefetch(self.__request, **{**params, "page_num": page + 1})
         except Exception as err:
             logger.error(str(err))
             return []
         if not result:
             return []
-        if mtype == "电影":
-            results = [__movie_to_media(movie) for movie in result]
-        else:
-            results = [__series_to_media(series) for series in result]
-        return results
+
+        def convert() -> List[schemas.MediaInfo]:
+            if mtype == "电影":
+                results = [__movie_to_media(movie) for movie in result]
+            else:
+                results = [__series_to_media(series) for series in result]
+            return results
+
+        # 接口数据未变化时直接返回已转换的结果
+        return CONVERTED.get((mtype, tuple(sorted(params.items()))), result, convert)
 
     @staticmethod
     def migu_filter_ui() -> List[dict]:
@@ -805,31 +883,34 @@ class MiGuDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        migu_source = schemas.DiscoverMediaSource(
-            name="咪咕视频",
-            mediaid_prefix="migu",
-            api_path=f"plugin/MiGuDiscover/migu_discover?apikey={settings.API_TOKEN}",
-            filter_params={
-                "mtype": "电视剧",
-                "mediaType": None,
-                "mediaArea": None,
-                "mediaYear": None,
-                "rankingType": None,
-                "payType": None,
-                "gender": None,
-                "mediaAge": None,
-            },
-            filter_ui=self.migu_filter_ui(),
-            depends={
-                "mediaType": ["mtype"],
-                "mediaArea": ["mtype"],
-                "mediaYear": ["mtype"],
-                "rankingType": ["mtype"],
-                "payType": ["mtype"],
-                "gender": ["mtype"],
-                "mediaAge": ["mtype"],
-            },
-        )
+        key = (settings.API_TOKEN,)
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="咪咕视频",
+                mediaid_prefix="migu",
+                api_path=f"plugin/MiGuDiscover/migu_discover?apikey={settings.API_TOKEN}",
+                filter_params={
+                    "mtype": "电视剧",
+                    "mediaType": None,
+                    "mediaArea": None,
+                    "mediaYear": None,
+                    "rankingType": None,
+                    "payType": None,
+                    "gender": None,
+                    "mediaAge": None,
+                },
+                filter_ui=self.migu_filter_ui(),
+                depends={
+                    "mediaType": ["mtype"],
+                    "mediaArea": ["mtype"],
+                    "mediaYear": ["mtype"],
+                    "rankingType": ["mtype"],
+                    "payType": ["mtype"],
+                    "gender": ["mtype"],
+                    "mediaAge": ["mtype"],
+                },
+            )
+        migu_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [migu_source]
         else:
@@ -839,4 +920,6 @@ class MiGuDiscover(_PluginBase):
         """
         退出插件
         """
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
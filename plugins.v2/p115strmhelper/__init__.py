@@ -33,6 +33,9 @@ from app.helper.mediaserver import MediaServerHelper
 from app.schemas.types import EventType
 from app.utils.system import SystemUtils
 
+from .bulkdelete import bulk_delete
+from .clientregistry import get_registry
+
 
 p115strmhelper_lock = threading.Lock()
 
@@ -320,7 +323,7 @@ class P115StrmHelper(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/jxxghp/MoviePilot-Frontend/refs/heads/v2/src/assets/images/misc/u115.png"
     # 插件版本
-    plugin_version = "1.3.1"
+    plugin_version = "1.3.6"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -334,7 +337,9 @@ class P115StrmHelper(_PluginBase):
 
     # 私有属性
     mediaserver_helper = None
-    _client = None
+    _client_cookies = None
+    _client_instance = None
+    _client_failed_cookies = None
     _scheduler = None
     _enabled = False
     _once_full_sync_strm = False
@@ -365,6 +370,43 @@ class P115StrmHelper(_PluginBase):
     monitor_stop_event = None
     monitor_life_thread = None
 
+    @property
+    def _client(self) -> Optional[P115Client]:
+        """
+        115网盘客户端，与同一账号的其他 115 插件共用会话（连接池与 cookie），首次使用时才创建
+        """
+        if self._client_cookies != self._cookies:
+            self.__release_client()
+        if self._client_instance is not None:
+            return self._client_instance
+        client = get_registry().get(
+            "p115client", self._cookies, P115Client, owner=self.__class__.__name__
+        )
+        if client is None:
+            # 循环中会反复访问，同一 cookie 只记录一次
+            if self._cookies and self._client_failed_cookies != self._cookies:
+                logger.error("115网盘客户端创建失败")
+            self._client_failed_cookies = self._cookies
+            return None
+        if self._client_failed_cookies:
+            logger.info("115网盘客户端创建成功")
+        self._client_failed_cookies = None
+        self._client_instance = client
+        self._client_cookies = self._cookies
+        return client
+
+    def __release_client(self):
+        """
+        释放115网盘客户端
+        """
+        if self._client_cookies:
+            get_registry().release(
+                "p115client", self._client_cookies, owner=self.__class__.__name__
+            )
+        self._client_cookies = None
+        self._client_instance = None
+        self._client_failed_cookies = None
+
     def init_plugin(self, config: dict = None):
         """
         初始化插件
@@ -415,11 +457,6 @@ class P115StrmHelper(_PluginBase):
             self.__update_config()
             return False
 
-        try:
-            self._client = P115Client(self._cookies)
-        except Exception as e:
-            logger.error(f"115网盘客户端创建失败: {e}")
-
         # 停止现有任务
         self.stop_service()
 
@@ -1671,8 +1708,33 @@ class P115StrmHelper(_PluginBase):
                 logger.info("【我的接收清理】我的接收目录为空，无需清理")
                 return
             logger.info(f"【我的接收清理】我的接收目录 ID 获取成功: {parent_id}")
-            self._client.fs_delete(parent_id)
-            logger.info("【我的接收清理】我的接收已清空")
+            ids = []
+            offset = 0
+            while True:
+                resp = self._client.fs_files(
+                    {"cid": parent_id, "show_dir": 1, "offset": offset, "limit": 1150}
+                )
+                if not resp.get("state"):
+                    raise OSError(resp.get("error") or resp)
+                data = resp.get("data") or []
+                ids.extend(int(item["fid"] if "fid" in item else item["cid"]) for item in data)
+                offset += len(data)
+                if not data or offset >= int(resp.get("count") or 0):
+                    break
+            if not ids:
+                logger.info("【我的接收清理】我的接收目录为空，无需清理")
+                return
+            result = bulk_delete(self._client.fs_delete, ids)
+            if result["failed"]:
+                logger.warn(
+                    f"【我的接收清理】已删除 {result['deleted']}/{result['total']} 项，"
+                    f"失败 {len(result['failed'])} 项，请求 {result['requests']} 次，耗时 {result['elapsed']:.1f} 秒"
+                )
+            else:
+                logger.info(
+                    f"【我的接收清理】我的接收已清空，共 {result['total']} 项，"
+                    f"请求 {result['requests']} 次，耗时 {result['elapsed']:.1f} 秒"
+                )
         except Exception as e:
             logger.error(f"【我的接收清理】清理我的接收运行失败: {e}")
             return
@@ -1690,5 +1752,6 @@ class P115StrmHelper(_PluginBase):
                     self._event.clear()
                 self._scheduler = None
             self.monitor_stop_event.set()
+            self.__release_client()
         except Exception as e:
             print(str(e))
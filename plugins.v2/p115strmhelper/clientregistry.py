@@ -0,0 +1,206 @@
+"""
+进程内共享的 115 客户端注册表
+
+每个 115 账号（cookie）只有一个 httpx 会话：连接池与 cookie 由该账号下的所有客户端共用，
+其中一个客户端重新登录更新 cookie 后，其他客户端随之生效。
+不同插件使用的 115 库不同（如 p115、p115client），客户端对象按库类型分别创建，
+创建后将其 session 替换为账号的共享会话，首次使用时才创建。
+各插件独立安装，本文件在使用它的插件中各有一份，注册表实例挂在 sys.modules 上，
+先载入的插件创建，后载入的插件直接复用，因此接口需保持一致
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections.abc import Callable
+from types import ModuleType
+from typing import Any, Optional
+
+# 注册表挂载的模块名
+REGISTRY_MODULE = "_moviepilot_u115_client_registry"
+# 注册表接口版本，接口变化时递增，旧版本实例会被替换
+REGISTRY_VERSION = 2
+
+# 共享会话的连接数上限
+SESSION_MAX_CONNECTIONS = 64
+# cookie 所属的域名
+COOKIE_DOMAIN = ".115.com"
+
+
+def make_session(cookie: str):
+    """
+    创建账号的共享会话，并写入 cookie
+    """
+    from httpx import Client, HTTPTransport, Limits
+
+    session = Client(
+        limits=Limits(
+            max_connections=SESSION_MAX_CONNECTIONS,
+            max_keepalive_connections=SESSION_MAX_CONNECTIONS // 2,
+        ),
+        transport=HTTPTransport(retries=3),
+        follow_redirects=True,
+        verify=False,
+    )
+    for part in cookie.split(";"):
+        name, _, value = part.strip().partition("=")
+        if name and value:
+            session.cookies.set(name, value, domain=COOKIE_DOMAIN)
+    return session
+
+
+class U115ClientRegistry:
+    """
+    115 客户端注册表
+    """
+
+    version = REGISTRY_VERSION
+
+    def __init__(self, session_factory: Callable[[str], Any] = make_session):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        # 账号 → 共享会话与各类型的客户端
+        self._entries: dict[str, dict] = {}
+
+    @staticmethod
+    def _key(cookie: str) -> str:
+        return hashlib.sha256(cookie.encode()).hexdigest()
+
+    @staticmethod
+    def _uid(cookie: str) -> str:
+        for part in cookie.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "UID":
+                return value.split("_")[0]
+        return "-"
+
+    def get(
+        self,
+        kind: str,
+        cookie: str,
+        factory: Callable[[str], Any],
+        owner: str,
+    ) -> Optional[Any]:
+        """
+        获取客户端，不存在时调用 factory 创建并替换为账号的共享会话；创建失败返回 None，下次调用时重试
+
+        :param kind: 客户端类型，不同的库需使用不同的类型，如 p115、p115client
+        :param cookie: 115 cookie
+        :param factory: 创建客户端的函数，参数为 cookie
+        :param owner: 使用者名称，用于统计和释放
+        """
+        if not cookie:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(cookie))
+            if entry is None:
+                entry = self._entries[self._key(cookie)] = {
+                    "uid": self._uid(cookie),
+                    "session": None,
+                    "clients": {},
+                    "owners": {},
+                    "lock": threading.Lock(),
+                    "created": None,
+                    "last_used": None,
+                    "uses": 0,
+                    "errors": 0,
+                    "last_error": None,
+                }
+            entry["owners"].setdefault(kind, set()).add(owner)
+        if entry["clients"].get(kind) is None:
+            # 同一账号只创建一次会话和每种客户端，不同账号互不阻塞
+            with entry["lock"]:
+                if entry["clients"].get(kind) is None:
+                    try:
+                        if entry["session"] is None:
+                            entry["session"] = self._session_factory(cookie)
+                            entry["created"] = time.time()
+                        client = factory(cookie)
+                        if client is not None:
+                            client.session = entry["session"]
+                    except Exception as e:
+                        self.report_error(kind, cookie, e)
+                        return None
+                    if client is None:
+                        self.report_error(kind, cookie, "客户端创建失败")
+                        return None
+                    entry["clients"][kind] = client
+        entry["last_used"] = time.time()
+        entry["uses"] += 1
+        return entry["clients"][kind]
+
+    def release(self, kind: str, cookie: str, owner: str):
+        """
+        释放客户端，该类型没有使用者时移除客户端，账号没有使用者时关闭共享会话
+        """
+        if not cookie:
+            return
+        key = self._key(cookie)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            owners = entry["owners"].get(kind)
+            if owners is not None:
+                owners.discard(owner)
+                if not owners:
+                    del entry["owners"][kind]
+                    entry["clients"].pop(kind, None)
+            if entry["owners"]:
+                return
+            del self._entries[key]
+        if entry["session"] is not None:
+            try:
+                entry["session"].close()
+            except Exception:
+                pass
+
+    def report_error(self, kind: str, cookie: str, error: Any):
+        """
+        记录客户端调用失败
+        """
+        if not cookie:
+            return
+        with self._lock:
+            entry = self._entries.get(self._key(cookie))
+            if entry is not None:
+                entry["errors"] += 1
+                entry["last_error"] = f"{kind}: {error}"
+
+    def health(self) -> list[dict]:
+        """
+        各账号的共享会话与客户端状态
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            {
+                "uid": entry["uid"],
+                "connected": entry["session"] is not None,
+                "kinds": sorted(entry["clients"]),
+                "owners": sorted({o for owners in entry["owners"].values() for o in owners}),
+                "created": entry["created"],
+                "last_used": entry["last_used"],
+                "uses": entry["uses"],
+                "errors": entry["errors"],
+                "last_error": entry["last_error"],
+            }
+            for entry in entries
+        ]
+
+
+def get_registry() -> U115ClientRegistry:
+    """
+    获取进程内共享的注册表
+    """
+    module = sys.modules.get(REGISTRY_MODULE)
+    registry = getattr(module, "registry", None)
+    if getattr(registry, "version", 0) >= REGISTRY_VERSION:
+        return registry
+    module = ModuleType(REGISTRY_MODULE)
+    module.registry = U115ClientRegistry()
+    # setdefault 保证并发载入时只保留一个实例
+    module = sys.modules.setdefault(REGISTRY_MODULE, module)
+    if getattr(module.registry, "version", 0) < REGISTRY_VERSION:
+        module.registry = U115ClientRegistry()
+    return module.registry
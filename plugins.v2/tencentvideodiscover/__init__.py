@@ -1,8 +1,5 @@
-import requests
 import re
-from typing import Any, List, Dict, Tuple
-
-from cachetools import cached, TTLCache
+from typing import Any, List, Dict, Optional, Tuple
 
 from app import schemas
 from app.core.config import settings
@@ -12,8 +9,15 @@ from app.plugins import _PluginBase
 from app.schemas import DiscoverSourceEventData
 from app.schemas.types import ChainEventType
 
+from .discovercache import (
+    BaseUiCache,
+    ConvertedCache,
+    DiscoverCache,
+    cache_stats_cards,
+)
+from .discoverhttp import breaker_stats_cards, get_client
+from .discoverhub import get_hub, hub_apis
 
-BASE_UI = None
 
 CHANNEL_PARAMS = {
     "tv": {"Id": "100113", "Name": "电视剧"},
@@ -36,97 +40,114 @@ HEADERS = {
     "Referer": "https://v.qq.com/",
 }
 
-
-def init_base_ui():
-    """ "
-    初始化 UI
-    """
-
-    def get_page_data(channel_id):
-        body = {
-            "page_params": {
-                "channel_id": channel_id,
-                "page_type": "channel_operation",
-                "page_id": "channel_list_second_page",
-            }
-        }
-        body["page_context"] = {
-            "data_src_647bd63b21ef4b64b50fe65201d89c6e_page": "0",
+def get_page_data(channel_id):
+    body = {
+        "page_params": {
+            "channel_id": channel_id,
+            "page_type": "channel_operation",
+            "page_id": "channel_list_second_page",
         }
-        url = "https://pbaccess.video.qq.com/trpc.universal_backend_service.page_server_rpc.PageServer/GetPageData"
-        response = requests.post(url, params=PARAMS, json=body, headers=HEADERS)
-        response.raise_for_status()
-        return (
-            response.json()
-            .get("data")
-            .get("module_list_datas")[1]
-            .get("module_datas")[0]
-            .get("item_data_lists")
-            .get("item_datas")
-        )
-
+    }
+    body["page_context"] = {
+        "data_src_647bd63b21ef4b64b50fe65201d89c6e_page": "0",
+    }
+    url = "https://pbaccess.video.qq.com/trpc.universal_backend_service.page_server_rpc.PageServer/GetPageData"
+    response = get_client().post(url, params=PARAMS, json=body, headers=HEADERS)
+    if response is None:
+        raise Exception("无法连接腾讯视频，请检查网络连接！")
+    response.raise_for_status()
+    return (
+        response.json()
+        .get("data")
+        .get("module_list_datas")[1]
+        .get("module_datas")[0]
+        .get("item_data_lists")
+        .get("item_datas")
+    )
+
+def fetch_channel_ui(_key: str) -> List[dict]:
+    """
+    获取单个分类的过滤参数 UI
+    """
     ui = []
-    for _key, _ in CHANNEL_PARAMS.items():
-        data = []
-        all_index = {}
-        for item in get_page_data(CHANNEL_PARAMS[_key]["Id"]):
-            if str(item["item_type"]) == "11":
-                if item["item_params"]["index_name"] not in all_index.keys():
-                    all_index[item["item_params"]["index_name"]] = []
-                    all_index[item["item_params"]["index_name"]].append(item)
-                else:
-                    all_index[item["item_params"]["index_name"]].append(item)
-
-        for _, value in all_index.items():
-            data = [
-                {
-                    "component": "VChip",
-                    "props": {
-                        "filter": True,
-                        "tile": True,
-                        "value": j["item_params"]["option_value"],
-                    },
-                    "text": j["item_params"]["option_name"],
-                }
-                for j in value
-                if str(j["item_params"]["option_value"]) != "-1"
-            ]
-            if str(value[0]["item_params"]["option_value"]) == "-1":
-                text = value[0]["item_params"]["option_name"]
+    all_index = {}
+    for item in get_page_data(CHANNEL_PARAMS[_key]["Id"]):
+        if str(item["item_type"]) == "11":
+            if item["item_params"]["index_name"] not in all_index.keys():
+                all_index[item["item_params"]["index_name"]] = []
+                all_index[item["item_params"]["index_name"]].append(item)
             else:
-                text = value[0]["item_params"]["index_name"]
-            ui.append(
-                {
-                    "component": "div",
-                    "props": {
-                        "class": "flex justify-start items-center",
-                        "show": "{{mtype == '" + _key + "'}}",
+                all_index[item["item_params"]["index_name"]].append(item)
+
+    for _, value in all_index.items():
+        data = [
+            {
+                "component": "VChip",
+                "props": {
+                    "filter": True,
+                    "tile": True,
+                    "value": j["item_params"]["option_value"],
+                },
+                "text": j["item_params"]["option_name"],
+            }
+            for j in value
+            if str(j["item_params"]["option_value"]) != "-1"
+        ]
+        if str(value[0]["item_params"]["option_value"]) == "-1":
+            text = value[0]["item_params"]["option_name"]
+        else:
+            text = value[0]["item_params"]["index_name"]
+        ui.append(
+            {
+                "component": "div",
+                "props": {
+                    "class": "flex justify-start items-center",
+                    "show": "{{mtype == '" + _key + "'}}",
+                },
+                "content": [
+                    {
+                        "component": "div",
+                        "props": {"class": "mr-5"},
+                        "content": [
+                            {
+                                "component": "VLabel",
+                                "text": text,
+                            }
+                        ],
                     },
-                    "content": [
-                        {
-                            "component": "div",
-                            "props": {"class": "mr-5"},
-                            "content": [
-                                {
-                                    "component": "VLabel",
-                                    "text": text,
-                                }
-                            ],
-                        },
-                        {
-                            "component": "VChipGroup",
-                            "props": {
-                                "model": value[0]["item_params"]["index_item_key"]
-                            },
-                            "content": data,
+                    {
+                        "component": "VChipGroup",
+                        "props": {
+                            "model": value[0]["item_params"]["index_item_key"]
                         },
-                    ],
-                }
-            )
-
+                        "content": data,
+                    },
+                ],
+            }
+        )
     return ui
 
 
+# 请求的上游主机，用于显示熔断状态
+API_HOSTS = ("pbaccess.video.qq.com",)
+
+# 全平台探索中的平台名称
+HUB_NAME = "腾讯视频"
+# 全平台探索的媒体类型对应的探索参数
+HUB_PARAMS = {
+    "tv": {"mtype": "tv"},
+    "movie": {"mtype": "movie"},
+    "anime": {"mtype": "anime"},
+    "variety": {"mtype": "variety"},
+    "documentary": {"mtype": "documentary"},
+}
+
+# 接口响应缓存
+CACHE = DiscoverCache()
+# 转换结果缓存
+CONVERTED = ConvertedCache()
+
+
 class TencentVideoDiscover(_PluginBase):
     # 插件名称
     plugin_name = "腾讯视频探索"
@@ -135,7 +156,7 @@ class TencentVideoDiscover(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DDS-Derek/MoviePilot-Plugins/main/icons/tencentvideo_A.png"
     # 插件版本
-    plugin_version = "1.0.0"
+    plugin_version = "1.0.11"
     # 插件作者
     plugin_author = "DDSRem"
     # 作者主页
@@ -149,14 +170,37 @@ class TencentVideoDiscover(_PluginBase):
 
     # 私有属性
     _enabled = False
+    # (生成条件, 探索数据源)
+    _source: Optional[Tuple[tuple, schemas.DiscoverMediaSource]] = None
+    _max_stale = 2
+    _prefetch = False
+    _base_ui: Optional[BaseUiCache] = None
 
     def init_plugin(self, config: dict = None):
-        global BASE_UI
         if config:
             self._enabled = config.get("enabled")
+            self._max_stale = config.get("max_stale", 2)
+            self._prefetch = config.get("prefetch")
         if "puui.qpic.cn" not in settings.SECURITY_IMAGE_DOMAINS:
             settings.SECURITY_IMAGE_DOMAINS.append("puui.qpic.cn")
-        BASE_UI = init_base_ui()
+        self._base_ui = BaseUiCache(
+            self.get_data_path() / "base_ui.json",
+            "腾讯视频",
+            {key: value["Name"] for key, value in CHANNEL_PARAMS.items()},
+            fetch_channel_ui,
+        )
+        if self._enabled and self._base_ui.expired:
+            self._base_ui.refresh_in_background()
+        self._source = None
+        try:
+            CACHE.max_stale = max(float(self._max_stale), 0) * 3600
+        except (TypeError, ValueError):
+            CACHE.max_stale = 2 * 3600
+        CACHE.open(self.get_data_path() / "cache.db")
+        if self._enabled:
+            get_hub().register(HUB_NAME, self.tencentvideo_discover, HUB_PARAMS)
+        else:
+            get_hub().unregister(HUB_NAME, self)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -173,8 +217,8 @@ class TencentVideoDiscover(_PluginBase):
                 "methods": ["GET"],
                 "summary": "腾讯视频探索数据源",
                 "description": "获取腾讯视频探索数据",
-            }
-        ]
+            },
+        ] + hub_apis(self.__class__.__name__)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -199,17 +243,54 @@ class TencentVideoDiscover(_PluginBase):
                                         },
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "prefetch",
+                                            "label": "预取下一页",
+                                            "hint": "浏览时在后台提前获取下一页数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_stale",
+                                            "label": "过期数据最长使用时间（小时）",
+                                            "type": "number",
+                                            "hint": "数据过期后在此时间内先返回旧数据并在后台刷新，0 为不使用过期数据",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     }
                 ],
             }
-        ], {"enabled": False}
+        ], {"enabled": False, "prefetch": False, "max_stale": 2}
 
     def get_page(self) -> List[dict]:
-        pass
+        return [
+            {
+                "component": "VRow",
+                "content": breaker_stats_cards(API_HOSTS)
+                + cache_stats_cards(CACHE, CONVERTED),
+            }
+        ]
 
-    @cached(cache=TTLCache(maxsize=32, ttl=1800))
+    @CACHE.cached("tencentvideo")
     def __request(self, page, mtype, **kwargs) -> List[schemas.MediaInfo]:
         """
         请求腾讯视频 API
@@ -230,11 +311,11 @@ class TencentVideoDiscover(_PluginBase):
                 "data_src_647bd63b21ef4b64b50fe65201d89c6e_page": str(int(page) - 1),
             }
         url = "https://pbaccess.video.qq.com/trpc.universal_backend_service.page_server_rpc.PageServer/GetPageData"
-        response = requests.post(url, params=PARAMS, json=body, headers=HEADERS)
+        response = get_client().post(url, params=PARAMS, json=body, headers=HEADERS)
         if response is None:
             raise Exception("无法连接腾讯视频，请检查网络连接！")
         if not response.ok:
-            raise Exception(f"请求腾讯视频 API失败：{res.text}")
+            raise Exception(f"请求腾讯视频 API失败：{response.text}")
         return (
             response.json()
             .get("data")
@@ -357,27 +438,33 @@ class TencentVideoDiscover(_PluginBase):
             if gender:
                 params.update({"gender": gender})
             result = self.__request(page, mtype, **params)
+            if self._prefetch and result:
+                CACHE.prefetch(self.__request, page + 1, mtype, **params)
         except Exception as err:
             logger.error(str(err))
             return []
         if not result:
             return []
-        if mtype == "movie":
-            results = [
-                __movie_to_media(movie.get("item_params"))
-                for movie in result
-                if str(movie["item_type"]) == "2"
-            ]
-        else:
-            results = [
-                __series_to_media(series.get("item_params"))
-                for series in result
-                if str(series["item_type"]) == "2"
-            ]
-        return results
 
-    @staticmethod
-    def tencentvideo_filter_ui() -> List[dict]:
+        def convert() -> List[schemas.MediaInfo]:
+            if mtype == "movie":
+                results = [
+                    __movie_to_media(movie.get("item_params"))
+                    for movie in result
+                    if str(movie["item_type"]) == "2"
+                ]
+            else:
+                results = [
+                    __series_to_media(series.get("item_params"))
+                    for series in result
+                    if str(series["item_type"]) == "2"
+                ]
+            return results
+
+        # 接口数据未变化时直接返回已转换的结果
+        return CONVERTED.get((mtype, page, tuple(sorted(params.items()))), result, convert)
+
+    def tencentvideo_filter_ui(self) -> List[dict]:
         """
         腾讯视频过滤参数UI配置
         """
@@ -408,8 +495,8 @@ class TencentVideoDiscover(_PluginBase):
                 ],
             },
         ]
-        for i in BASE_UI:
-            ui.append(i)
+        if self._base_ui:
+            ui.extend(self._base_ui.ui)
 
         return ui
 
@@ -421,65 +508,71 @@ class TencentVideoDiscover(_PluginBase):
         if not self._enabled:
             return
         event_data: DiscoverSourceEventData = event.event_data
-        tencentvideo_source = schemas.DiscoverMediaSource(
-            name="腾讯视频",
-            mediaid_prefix="tencentvideodiscover",
-            api_path=f"plugin/TencentVideoDiscover/tencentvideo_discover?apikey={settings.API_TOKEN}",
-            filter_params={
-                "mtype": "tv",
-                "recommend_3": None,
-                "itrailer": None,
-                "exclusive": None,
-                "child_ip": None,
-                "characteristic": None,
-                "anime_status": None,
-                "recommend": None,
-                "language": None,
-                "iregion": None,
-                "iyear": None,
-                "all": None,
-                "sort": None,
-                "ipay": None,
-                "producer": None,
-                "iarea": None,
-                "pay": None,
-                "attr": None,
-                "item": None,
-                "itype": None,
-                "recommend_2": None,
-                "recommend_1": None,
-                "award": None,
-                "theater": None,
-                "gender": None,
-            },
-            filter_ui=self.tencentvideo_filter_ui(),
-            depends={
-                "recommend_3": ["mtype"],
-                "itrailer": ["mtype"],
-                "exclusive": ["mtype"],
-                "child_ip": ["mtype"],
-                "characteristic": ["mtype"],
-                "anime_status": ["mtype"],
-                "recommend": ["mtype"],
-                "language": ["mtype"],
-                "iregion": ["mtype"],
-                "iyear": ["mtype"],
-                "all": ["mtype"],
-                "sort": ["mtype"],
-                "ipay": ["mtype"],
-                "producer": ["mtype"],
-                "iarea": ["mtype"],
-                "pay": ["mtype"],
-                "attr": ["mtype"],
-                "item": ["mtype"],
-                "itype": ["mtype"],
-                "recommend_2": ["mtype"],
-                "recommend_1": ["mtype"],
-                "award": ["mtype"],
-                "theater": ["mtype"],
-                "gender": ["mtype"],
-            },
-        )
+        if self._base_ui and self._base_ui.expired:
+            self._base_ui.refresh_in_background()
+        # 过滤参数在后台更新后重新生成
+        key = (settings.API_TOKEN, self._base_ui.updated_at if self._base_ui else 0)
+        if self._source is None or self._source[0] != key:
+            self._source = key, schemas.DiscoverMediaSource(
+                name="腾讯视频",
+                mediaid_prefix="tencentvideodiscover",
+                api_path=f"plugin/TencentVideoDiscover/tencentvideo_discover?apikey={settings.API_TOKEN}",
+                filter_params={
+                    "mtype": "tv",
+                    "recommend_3": None,
+                    "itrailer": None,
+                    "exclusive": None,
+                    "child_ip": None,
+                    "characteristic": None,
+                    "anime_status": None,
+                    "recommend": None,
+                    "language": None,
+                    "iregion": None,
+                    "iyear": None,
+                    "all": None,
+                    "sort": None,
+                    "ipay": None,
+                    "producer": None,
+                    "iarea": None,
+                    "pay": None,
+                    "attr": None,
+                    "item": None,
+                    "itype": None,
+                    "recommend_2": None,
+                    "recommend_1": None,
+                    "award": None,
+                    "theater": None,
+                    "gender": None,
+                },
+                filter_ui=self.tencentvideo_filter_ui(),
+                depends={
+                    "recommend_3": ["mtype"],
+                    "itrailer": ["mtype"],
+                    "exclusive": ["mtype"],
+                    "child_ip": ["mtype"],
+                    "characteristic": ["mtype"],
+                    "anime_status": ["mtype"],
+                    "recommend": ["mtype"],
+                    "language": ["mtype"],
+                    "iregion": ["mtype"],
+                    "iyear": ["mtype"],
+                    "all": ["mtype"],
+                    "sort": ["mtype"],
+                    "ipay": ["mtype"],
+                    "producer": ["mtype"],
+                    "iarea": ["mtype"],
+                    "pay": ["mtype"],
+                    "attr": ["mtype"],
+                    "item": ["mtype"],
+                    "itype": ["mtype"],
+                    "recommend_2": ["mtype"],
+                    "recommend_1": ["mtype"],
+                    "award": ["mtype"],
+                    "theater": ["mtype"],
+                    "gender": ["mtype"],
+                },
+            )
+        tencentvideo_source = self._source[1]
         if not event_data.extra_sources:
             event_data.extra_sources = [tencentvideo_source]
         else:
@@ -489,4 +582,6 @@ class TencentVideoDiscover(_PluginBase):
         """
         退出插件
         """
-        pass
+        get_hub().unregister(HUB_NAME, self)
+        get_hub().release_api(self.__class__.__name__)
+        CACHE.close()
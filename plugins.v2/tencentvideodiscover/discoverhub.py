@@ -0,0 +1,270 @@
+"""
+全平台探索
+
+各探索插件启用时将自己的探索函数注册到进程内共享的注册表，/discover_all 接口
+并发调用所有已注册的探索函数，单个平台超时时只返回已完成平台的数据，按标题和年份合并去重。
+/discover_all 接口只由最先获取插件接口的探索插件提供（见 hub_apis），该插件停止后由下一个插件接替。
+各探索插件独立安装，本文件在每个探索插件中各有一份，注册表实例挂在 sys.modules 上，
+先载入的插件创建，后载入的插件直接复用，因此接口需保持一致
+"""
+import copy
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+# 注册表挂载的模块名
+HUB_MODULE = "_moviepilot_discover_hub"
+# 注册表接口版本，接口变化时递增，旧版本实例会被替换
+HUB_VERSION = 2
+
+# 统一的媒体类型
+MEDIA_TYPES = {
+    "tv": "电视剧",
+    "movie": "电影",
+    "anime": "动漫",
+    "variety": "综艺",
+    "documentary": "纪录片",
+}
+
+# 合并重复条目时补全的字段
+MERGE_FIELDS = (
+    "year",
+    "poster_path",
+    "backdrop_path",
+    "vote_average",
+    "overview",
+    "release_date",
+    "first_air_date",
+)
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """
+    去除标题中的空白和标点，忽略大小写
+    """
+    return re.sub(r"[\W_]+", "", title or "").lower()
+
+
+def media_year(media: Any) -> Optional[str]:
+    """
+    媒体年份，没有年份时取上映或首播日期的年份
+    """
+    year = getattr(media, "year", None)
+    if year:
+        return str(year)[:4]
+    date = getattr(media, "release_date", None) or getattr(
+        media, "first_air_date", None
+    )
+    if date and str(date)[:4].isdigit():
+        return str(date)[:4]
+    return None
+
+
+def merge_results(results: List[List[Any]]) -> List[Any]:
+    """
+    轮流取各平台的结果并按标题和年份去重，年份缺失时只比较标题，重复条目补全已有条目的空字段；
+    结果为浅拷贝，补全字段不会修改各插件缓存的条目
+    """
+    merged: List[Any] = []
+    # 标题 → [(年份, 条目)]
+    seen: Dict[str, List[Tuple[Optional[str], Any]]] = {}
+    for index in range(max((len(items) for items in results), default=0)):
+        for items in results:
+            if index >= len(items):
+                continue
+            media = items[index]
+            title = normalize_title(getattr(media, "title", None))
+            if not title:
+                continue
+            year = media_year(media)
+            kept = next(
+                (
+                    item
+                    for item_year, item in seen.get(title, [])
+                    if not year or not item_year or item_year == year
+                ),
+                None,
+            )
+            if kept is None:
+                media = copy.copy(media)
+                seen.setdefault(title, []).append((year, media))
+                merged.append(media)
+                continue
+            for field in MERGE_FIELDS:
+                value = getattr(media, field, None)
+                if value and not getattr(kept, field, None):
+                    try:
+                        setattr(kept, field, value)
+                    except (AttributeError, TypeError, ValueError):
+                        pass
+    return merged
+
+
+class DiscoverHub:
+    """
+    探索函数注册表
+    """
+
+    version = HUB_VERSION
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 名称 → (探索函数, {统一媒体类型: 探索函数参数})
+        self._sources: Dict[str, Tuple[Callable[..., List[Any]], Dict[str, dict]]] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=16, thread_name_prefix="discover-hub"
+        )
+        # 提供 /discover_all 接口的插件
+        self._api_owner: Optional[str] = None
+
+    def register(
+        self, name: str, discover: Callable[..., List[Any]], params: Dict[str, dict]
+    ):
+        """
+        注册探索函数
+
+        :param name: 平台名称
+        :param discover: 探索函数，需接受 page、count 参数
+        :param params: 统一媒体类型对应的探索函数参数，不支持的类型不填
+        """
+        with self._lock:
+            self._sources[name] = (discover, params)
+
+    def unregister(self, name: str, owner: Any = None):
+        """
+        注销探索函数，指定 owner 时仅当注册的探索函数属于 owner 时注销，避免重载插件时误删新实例的注册
+        """
+        with self._lock:
+            item = self._sources.get(name)
+            if item is None:
+                return
+            if owner is not None and getattr(item[0], "__self__", None) is not owner:
+                return
+            del self._sources[name]
+
+    def claim_api(self, owner: str) -> bool:
+        """
+        申请提供 /discover_all 接口，尚无插件提供或 owner 已在提供时返回 True
+        """
+        with self._lock:
+            if self._api_owner in (None, owner):
+                self._api_owner = owner
+                return True
+            return False
+
+    def release_api(self, owner: str):
+        """
+        插件停止时释放 /discover_all 接口，由下一个获取插件接口的探索插件接替
+        """
+        with self._lock:
+            if self._api_owner == owner:
+                self._api_owner = None
+
+    @property
+    def api_owner(self) -> Optional[str]:
+        """
+        提供 /discover_all 接口的插件
+        """
+        with self._lock:
+            return self._api_owner
+
+    def sources(self) -> List[str]:
+        """
+        已注册的平台
+        """
+        with self._lock:
+            return list(self._sources)
+
+    def discover(
+        self, mtype: str = "tv", page: int = 1, count: int = 20, timeout: float = 5
+    ) -> List[Any]:
+        """
+        并发获取所有平台的探索数据
+
+        :param mtype: 统一媒体类型，见 MEDIA_TYPES
+        :param timeout: 单个平台的超时时间，单位秒，超时的平台不计入结果，其请求继续在后台完成并写入缓存
+        """
+        with self._lock:
+            sources = [
+                (name, discover, params[mtype])
+                for name, (discover, params) in self._sources.items()
+                if mtype in params
+            ]
+        if not sources:
+            return []
+        begin = time.monotonic()
+        futures = [
+            self._executor.submit(discover, page=page, count=count, **params)
+            for _, discover, params in sources
+        ]
+        done, _ = wait(futures, timeout=timeout)
+        results = []
+        for (name, _, _), future in zip(sources, futures):
+            if future not in done:
+                logger.warn(f"全平台探索：{name} 超过 {timeout} 秒未返回，已跳过")
+                continue
+            try:
+                results.append(future.result() or [])
+            except Exception as err:
+                logger.error(f"全平台探索：{name} 获取失败：{err}")
+        merged = merge_results(results)
+        logger.debug(
+            f"全平台探索：{MEDIA_TYPES.get(mtype, mtype)} 第 {page} 页，"
+            f"{len(results)}/{len(sources)} 个平台，{len(merged)} 条，"
+            f"耗时 {time.monotonic() - begin:.2f} 秒"
+        )
+        return merged
+
+
+def discover_all(
+    mtype: str = "tv", page: int = 1, count: int = 20, timeout: float = 5
+) -> List[Any]:
+    """
+    获取全平台探索数据
+
+    :param mtype: 媒体类型，tv、movie、anime、variety、documentary
+    :param timeout: 单个平台的超时时间，单位秒
+    """
+    return get_hub().discover(mtype=mtype, page=page, count=count, timeout=timeout)
+
+
+def hub_apis(owner: str) -> List[Dict[str, Any]]:
+    """
+    全平台探索接口，进程内只有一个探索插件提供，其余插件返回空列表
+
+    :param owner: 插件类名
+    """
+    if not get_hub().claim_api(owner):
+        return []
+    return [
+        {
+            "path": "/discover_all",
+            "endpoint": discover_all,
+            "methods": ["GET"],
+            "summary": "全平台探索数据源",
+            "description": "并发获取所有已启用探索插件的数据，合并去重",
+        }
+    ]
+
+
+def get_hub() -> DiscoverHub:
+    """
+    获取进程内共享的注册表
+    """
+    module = sys.modules.get(HUB_MODULE)
+    hub = getattr(module, "hub", None)
+    if getattr(hub, "version", 0) >= HUB_VERSION:
+        return hub
+    module = ModuleType(HUB_MODULE)
+    module.hub = DiscoverHub()
+    # setdefault 保证并发载入时只保留一个实例
+    module = sys.modules.setdefault(HUB_MODULE, module)
+    if getattr(module.hub, "version", 0) < HUB_VERSION:
+        module.hub = DiscoverHub()
+    return module.hub
@@ -0,0 +1,94 @@
+"""
+插件单元测试公共设置
+
+插件目录 plugins.v2 不是合法的包名，MoviePilot 以 app.plugins.<插件名> 载入插件。
+这里按同样的包名载入插件中的单个模块，不执行插件的 __init__.py，
+因此只依赖被测模块本身；未安装 MoviePilot 时为 app.log 等少量模块提供最小实现。
+"""
+import importlib
+import logging
+import sys
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+PLUGINS_DIR = Path(__file__).resolve().parent.parent / "plugins.v2"
+
+
+def _stub_app():
+    """
+    未安装 MoviePilot 时，提供被测模块用到的 app.log、app.core.config、app.db
+    """
+    try:
+        import app.log  # noqa: F401
+
+        return
+    except ImportError:
+        pass
+
+    class Logger:
+        def __init__(self):
+            self._logger = logging.getLogger("moviepilot")
+
+        def __getattr__(self, name):
+            return getattr(self._logger, "warning" if name == "warn" else name)
+
+    def get_args_db(args, kwargs):
+        if kwargs.get("db") is not None:
+            return kwargs["db"]
+        return next(
+            (arg for arg in args if type(arg).__name__ == "Session"), None
+        )
+
+    def update_args_db(args, kwargs, db):
+        if "db" in kwargs:
+            kwargs["db"] = db
+            return args, kwargs
+        args = list(args)
+        for index, arg in enumerate(args):
+            if arg is None:
+                args[index] = db
+                break
+        return tuple(args), kwargs
+
+    modules = {
+        "app": ModuleType("app"),
+        "app.log": ModuleType("app.log"),
+        "app.core": ModuleType("app.core"),
+        "app.core.config": ModuleType("app.core.config"),
+        "app.db": ModuleType("app.db"),
+        "app.plugins": ModuleType("app.plugins"),
+    }
+    modules["app"].__path__ = []
+    modules["app.core"].__path__ = []
+    modules["app.plugins"].__path__ = []
+    modules["app.log"].logger = Logger()
+    modules["app.core.config"].settings = SimpleNamespace(
+        DB_POOL_PRE_PING=True, DB_ECHO=False, DB_POOL_RECYCLE=3600
+    )
+    modules["app.db"].get_args_db = get_args_db
+    modules["app.db"].update_args_db = update_args_db
+    sys.modules.update(modules)
+
+
+def load(plugin: str, module: str, packages: tuple = ()) -> ModuleType:
+    """
+    载入插件中的模块，如 load("migudiscover", "discovercache")
+
+    :param packages: 需要正常导入（执行 __init__.py）的子包，如 ("db_manager",)，
+                     其余插件包和子包只注册包路径，不执行其 __init__.py
+    """
+    _stub_app()
+    package = "app.plugins"
+    path = PLUGINS_DIR
+    for part in [plugin, *module.split(".")[:-1]]:
+        package = f"{package}.{part}"
+        path = path / part
+        if package in sys.modules:
+            continue
+        if part in packages:
+            importlib.import_module(package)
+            continue
+        pkg = ModuleType(package)
+        pkg.__path__ = [str(path)]
+        sys.modules[package] = pkg
+    return importlib.import_module(f"app.plugins.{plugin}.{module}")
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from conftest import load
+
+autoupload = load("cloudterminator", "clouddisk.u115.autoupload")
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    # 只用定时扫描，不依赖 watchdog
+    monkeypatch.setattr(autoupload, "Observer", None)
+    (tmp_path / "a.mkv").write_bytes(b"a")
+    (tmp_path / "b.mkv").write_bytes(b"b")
+    return tmp_path
+
+
+def make_uploader(folder, upload, is_uploaded=None):
+    uploader = autoupload.U115AutoUploader(
+        [(str(folder), "/media")],
+        upload=upload,
+        is_uploaded=is_uploaded,
+        settle=0,
+        interval=0.05,
+    )
+    uploader.rescan_interval = 0.05
+    return uploader
+
+
+def test_uploaded_files_are_skipped_at_submit(folder):
+    uploaded = []
+    done = {str(folder / "a.mkv")}
+    uploader = make_uploader(
+        folder,
+        upload=lambda path, remote: uploaded.append(path) or done.add(path) or True,
+        is_uploaded=lambda attr: attr["path"] in done,
+    )
+    # 事件触发的文件同样经过 is_uploaded 判断
+    uploader.enqueue(str(folder / "a.mkv"))
+    uploader.start()
+    try:
+        assert wait_for(lambda: uploaded)
+        time.sleep(0.3)
+    finally:
+        uploader.stop()
+    assert uploaded == [str(folder / "b.mkv")]
+
+
+def test_restart_does_not_upload_running_file_twice(folder):
+    release = threading.Event()
+    calls = []
+    done = set()
+
+    def upload(path, remote):
+        calls.append(path)
+        release.wait(5)
+        done.add(path)
+        return True
+
+    first = make_uploader(folder, upload, lambda attr: attr["path"] in done)
+    first.stop_timeout = 0.1
+    first.start()
+    assert wait_for(lambda: len(calls) == 2)
+    first.stop()
+
+    second = make_uploader(folder, upload, lambda attr: attr["path"] in done)
+    second.start()
+    try:
+        time.sleep(0.3)
+        # 旧实例仍在上传，新实例不重复提交
+        assert len(calls) == 2
+        release.set()
+        time.sleep(0.3)
+        assert len(calls) == 2
+    finally:
+        second.stop()
+
+
+def test_stop_waits_for_running_upload(folder):
+    finished = []
+
+    def upload(path, remote):
+        time.sleep(0.2)
+        finished.append(path)
+        return True
+
+    uploader = make_uploader(folder, upload)
+    uploader.start()
+    assert wait_for(lambda: uploader.stats()["uploading"])
+    uploader.stop()
+    assert uploader.stats()["uploading"] == 0
+    assert finished
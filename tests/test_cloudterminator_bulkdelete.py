@@ -0,0 +1,85 @@
+from conftest import load
+
+bulkdelete = load("cloudterminator", "clouddisk.u115.bulkdelete")
+
+
+class FakeDelete:
+    """
+    删除含有 bad 中任一 id 的请求时返回失败
+    """
+
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.calls = []
+
+    def __call__(self, ids):
+        self.calls.append(list(ids))
+        if self.bad.intersection(ids):
+            return {"state": False, "error": "bad id"}
+        return {"state": True}
+
+
+def test_chunks_and_dedup():
+    delete = FakeDelete()
+    summary = bulkdelete.bulk_delete(delete, [1, 2, 3, 3, 4, 5], chunk_size=2, max_workers=1)
+    assert delete.calls == [[1, 2], [3, 4], [5]]
+    assert summary["total"] == 5
+    assert summary["deleted"] == 5
+    assert summary["failed"] == []
+    assert summary["requests"] == 3
+
+
+def test_failed_chunk_is_halved_until_bad_id_is_isolated():
+    delete = FakeDelete(bad={3})
+    summary = bulkdelete.bulk_delete(delete, range(8), chunk_size=8, max_retries=0)
+    # 8 → 4 + 4 → 2 + 2 → 1 + 1，只有 3 删除失败
+    assert summary["failed"] == [3]
+    assert summary["deleted"] == 7
+    assert [0, 1, 2, 3] in delete.calls
+    assert [2, 3] in delete.calls
+    assert [3] in delete.calls
+    assert summary["requests"] == len(delete.calls) == 7
+
+
+def test_only_rejected_ids_are_reported_from_large_chunk():
+    bad = {17, 900}
+    delete = FakeDelete(bad=bad)
+    summary = bulkdelete.bulk_delete(delete, range(1000), chunk_size=1000, max_workers=1)
+    assert sorted(summary["failed"]) == sorted(bad)
+    assert summary["deleted"] == 998
+    # 每个失败的 id 约 2 * log2(1000) 次请求
+    assert summary["requests"] < 2 * 2 * 11
+
+
+def test_request_errors_retry_whole_chunk_then_fail():
+    calls = []
+
+    def delete(ids):
+        calls.append(list(ids))
+        raise OSError("timeout")
+
+    summary = bulkdelete.bulk_delete(
+        delete, range(4), chunk_size=4, max_retries=2, retry_interval=0
+    )
+    # 请求出错不拆分，重试后整块失败
+    assert calls == [[0, 1, 2, 3]] * 3
+    assert summary["failed"] == [0, 1, 2, 3]
+    assert summary["deleted"] == 0
+
+
+def test_exceptions_are_retried_concurrently():
+    attempts = {}
+
+    def delete(ids):
+        key = tuple(ids)
+        attempts[key] = attempts.get(key, 0) + 1
+        if attempts[key] == 1 and len(ids) == 1:
+            raise OSError("timeout")
+        return {"state": True}
+
+    summary = bulkdelete.bulk_delete(
+        delete, range(4), chunk_size=1, max_workers=4, retry_interval=0
+    )
+    assert summary["deleted"] == 4
+    assert summary["failed"] == []
+    assert summary["requests"] == 8
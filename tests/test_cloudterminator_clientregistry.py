@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from conftest import load
+
+clientregistry = load("cloudterminator", "clouddisk.u115.clientregistry")
+
+COOKIE = "UID=123_A1_1700000000; CID=abc; SEID=def"
+
+
+class Session:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_registry():
+    sessions = []
+
+    def session_factory(cookie):
+        sessions.append(Session())
+        return sessions[-1]
+
+    return clientregistry.U115ClientRegistry(session_factory), sessions
+
+
+def test_clients_of_different_libraries_share_one_session():
+    registry, sessions = make_registry()
+    p115 = registry.get("p115", COOKIE, lambda c: SimpleNamespace(), owner="CloudTerminator")
+    p115client = registry.get("p115client", COOKIE, lambda c: SimpleNamespace(), owner="P115StrmHelper")
+    assert p115 is not p115client
+    assert len(sessions) == 1
+    assert p115.session is p115client.session is sessions[0]
+    # 同类型的客户端直接复用
+    assert registry.get("p115", COOKIE, lambda c: None, owner="Other") is p115
+
+    health = registry.health()
+    assert len(health) == 1
+    assert health[0]["uid"] == "123"
+    assert health[0]["kinds"] == ["p115", "p115client"]
+    assert health[0]["owners"] == ["CloudTerminator", "Other", "P115StrmHelper"]
+
+
+def test_session_closed_after_last_owner_releases():
+    registry, sessions = make_registry()
+    registry.get("p115", COOKIE, lambda c: SimpleNamespace(), owner="CloudTerminator")
+    registry.get("p115client", COOKIE, lambda c: SimpleNamespace(), owner="P115StrmHelper")
+    registry.release("p115", COOKIE, owner="CloudTerminator")
+    assert not sessions[0].closed
+    assert registry.health()[0]["kinds"] == ["p115client"]
+    registry.release("p115client", COOKIE, owner="P115StrmHelper")
+    assert sessions[0].closed
+    assert registry.health() == []
+
+
+def test_failed_factory_is_retried():
+    registry, sessions = make_registry()
+
+    def fail(cookie):
+        raise OSError("login failed")
+
+    assert registry.get("p115", COOKIE, fail, owner="CloudTerminator") is None
+    assert registry.health()[0]["errors"] == 1
+    client = registry.get("p115", COOKIE, lambda c: SimpleNamespace(), owner="CloudTerminator")
+    assert client.session is sessions[0]
+    assert len(sessions) == 1
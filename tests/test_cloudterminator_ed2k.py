@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import load
+
+ed2k = load("cloudterminator", "clouddisk.u115.ed2k")
+
+
+class OfflineClient:
+    """
+    离线任务分页返回，每页 2 个任务
+    """
+
+    def __init__(self, hashes, status=2):
+        self.pages = [
+            [{"info_hash": h, "status": status} for h in hashes[i:i + 2]]
+            for i in range(0, len(hashes), 2)
+        ]
+        self.requested = []
+        self.removed = []
+
+    def offline_list(self, page=1):
+        self.requested.append(page)
+        return {
+            "tasks": self.pages[page - 1] if page <= len(self.pages) else [],
+            "page": page,
+            "page_count": len(self.pages),
+        }
+
+    def offline_add_url(self, payload):
+        return {"state": True, "info_hash": "e"}
+
+    def offline_remove(self, payload):
+        self.removed.append(payload)
+
+
+def test_find_offline_task_pages_through_list():
+    client = OfflineClient(["a", "b", "c", "d", "e"])
+    assert ed2k.find_offline_task(client, "e")["info_hash"] == "e"
+    assert client.requested == [1, 2, 3]
+
+
+def test_find_offline_task_stops_at_last_page():
+    client = OfflineClient(["a", "b", "c"])
+    assert ed2k.find_offline_task(client, "x") is None
+    assert client.requested == [1, 2]
+
+
+def test_offline_ed2k_finds_task_beyond_first_page():
+    client = OfflineClient(["a", "b", "c", "d", "e"])
+    assert ed2k.offline_ed2k(client, "ed2k://", 0, timeout=0)
+    assert not client.removed
+
+
+def test_offline_ed2k_removes_unfinished_task():
+    client = OfflineClient(["a", "b", "c", "d", "e"], status=1)
+    assert not ed2k.offline_ed2k(client, "ed2k://", 0, timeout=0)
+    assert client.removed == [{"hash[0]": "e", "flag": 1}]
+
+
+@pytest.mark.skipif(not ed2k.md4_available(), reason="md4 不可用")
+def test_ed2k_hash_chunking():
+    # 单块时为该块的 md4，恰好一整块时不追加空块
+    data = b"x" * ed2k.ED2K_CHUNK_SIZE
+    single = ed2k.new_md4()
+    single.update(data)
+    h = ed2k.Ed2kHash()
+    h.update(data)
+    assert h.hexdigest() == single.hexdigest()
+
+    h = ed2k.Ed2kHash()
+    h.update(data + b"y")
+    root = ed2k.new_md4()
+    tail = ed2k.new_md4()
+    tail.update(b"y")
+    root.update(single.digest() + tail.digest())
+    assert h.hexdigest() == root.hexdigest()
@@ -0,0 +1,34 @@
+from hashlib import sha1
+
+import pytest
+
+from conftest import load
+
+hashing = load("cloudterminator", "clouddisk.u115.hashing")
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_digest_file(tmp_path, use_mmap):
+    path = tmp_path / "data.bin"
+    data = bytes(range(256)) * 1000
+    path.write_bytes(data)
+    size, hashes = hashing.digest_file(path, bufsize=4096, use_mmap=use_mmap)
+    assert size == len(data)
+    assert hashes["sha1"].hexdigest() == sha1(data).hexdigest()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_digest_file_stops_when_cancelled(tmp_path, use_mmap):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 40960)
+    reads = []
+
+    with pytest.raises(hashing.DigestCancelled):
+        hashing.digest_file(
+            path,
+            bufsize=4096,
+            use_mmap=use_mmap,
+            callback=reads.append,
+            cancelled=lambda: len(reads) >= 2,
+        )
+    assert len(reads) == 2
@@ -0,0 +1,85 @@
+import sys
+
+import pytest
+
+from conftest import load
+
+pytest.importorskip("sqlalchemy")
+
+ATTR = {"path": "/media/movie.mkv", "size": 1 << 35, "mtime": 1700000000}
+TICKET = {"upload_id": "abc", "bucket": "fhnfile", "object": "movie.mkv"}
+
+
+@pytest.fixture
+def database(tmp_path):
+    load("cloudterminator", "db_manager.models", ("db_manager",))
+    db_manager = sys.modules["app.plugins.cloudterminator.db_manager"]
+    manager = db_manager.ct_db_manager
+    manager.init_database(db_path=tmp_path, db_filename="test.db")
+    db_manager.CloudTerminatorBase.metadata.create_all(bind=manager.Engine)
+    yield manager
+    manager.close_database()
+
+
+@pytest.fixture
+def ledger(database):
+    oper = load("cloudterminator", "db_manager.u115uploadledger_oper", ("db_manager",))
+    return oper.U115UploadLedgerOper()
+
+
+def test_finish_clears_ticket(ledger):
+    ledger.start(ATTR, 1, "movie.mkv", "sha1")
+    ledger.save_ticket(ATTR, 1, "movie.mkv", TICKET, 1 << 30)
+    assert ledger.get(ATTR, 1, "movie.mkv")["ticket"] == TICKET
+
+    ledger.finish(ATTR, 1, "movie.mkv", "pickcode")
+    record = ledger.get(ATTR, 1, "movie.mkv")
+    assert record["ticket"] is None
+    assert record["status"] == "done"
+    assert record["uploaded"] == ATTR["size"]
+    assert record["pickcode"] == "pickcode"
+    assert ledger.is_uploaded(ATTR)
+
+
+def test_clear_ticket(ledger):
+    ledger.save_ticket(ATTR, 1, "movie.mkv", TICKET, 1 << 30)
+    ledger.clear_ticket(ATTR, 1, "movie.mkv")
+    record = ledger.get(ATTR, 1, "movie.mkv")
+    assert record["ticket"] is None
+    assert record["uploaded"] == 0
+
+
+def test_save_progress_keeps_ticket(ledger):
+    ledger.save_ticket(ATTR, 1, "movie.mkv", TICKET)
+    ledger.save_progress(ATTR, 1, "movie.mkv", 3 << 30)
+    record = ledger.get(ATTR, 1, "movie.mkv")
+    assert record["ticket"] == TICKET
+    assert record["uploaded"] == 3 << 30
+    assert not ledger.is_uploaded(ATTR)
+
+
+def test_changed_file_invalidates_record(ledger):
+    ledger.finish(ATTR, 1, "movie.mkv", "pickcode")
+    changed = {**ATTR, "mtime": ATTR["mtime"] + 1}
+    assert ledger.get(changed, 1, "movie.mkv") is None
+    assert not ledger.is_uploaded(changed)
+
+
+def test_ed2k_is_kept_across_retries(ledger):
+    ledger.start(ATTR, 1, "movie.mkv", "sha1", "ed2k")
+    assert ledger.get(ATTR, 1, "movie.mkv")["ed2k"] == "ed2k"
+    # 文件变化后重新开始上传，旧的 ed2k 被清除
+    changed = {**ATTR, "mtime": ATTR["mtime"] + 1}
+    ledger.start(changed, 1, "movie.mkv", "sha1-new")
+    assert ledger.get(changed, 1, "movie.mkv")["ed2k"] is None
+
+
+def test_hash_cache_stores_ed2k(database):
+    oper = load("cloudterminator", "db_manager.u115hashcache_oper", ("db_manager",))
+    cache = oper.U115HashCacheOper()
+    attr = {**ATTR, "inode": 1, "dev": 1}
+    cache.set(attr, "sha1", "ed2k")
+    assert (cache.get(attr), cache.get_ed2k(attr)) == ("sha1", "ed2k")
+    cache.set(attr, "sha1")
+    assert (cache.get(attr), cache.get_ed2k(attr)) == ("sha1", None)
+    assert cache.get({**attr, "size": 1}) is None
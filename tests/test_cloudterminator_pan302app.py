@@ -0,0 +1,29 @@
+import os
+import sys
+from types import ModuleType
+
+from conftest import load
+
+if "p115nano302" not in sys.modules:
+    try:
+        import p115nano302  # noqa: F401
+    except ImportError:
+        # 只验证参数传递，不需要真实的 302 应用
+        fake = ModuleType("p115nano302")
+        fake.make_application = lambda cookie, debug=False: ("app", cookie, debug)
+        sys.modules["p115nano302"] = fake
+
+pan302app = load("cloudterminator", "clouddisk.u115.pan302app")
+
+
+def test_create_app_reads_passed_env_not_process_env(monkeypatch):
+    monkeypatch.delenv(pan302app.ENV_COOKIE, raising=False)
+    app = pan302app.create_app({
+        pan302app.ENV_COOKIE: "UID=1",
+        pan302app.ENV_URL_CACHE_SIZE: "16",
+        pan302app.ENV_URL_CACHE_STATS_TOKEN: "secret",
+    })
+    assert isinstance(app, pan302app.RedirectCacheMiddleware)
+    assert app.maxsize == 16
+    assert app.stats_token == "secret"
+    assert pan302app.ENV_COOKIE not in os.environ
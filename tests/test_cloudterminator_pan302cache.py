@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from conftest import load
+
+pan302cache = load("cloudterminator", "clouddisk.u115.pan302cache")
+
+
+async def upstream(scope, receive, send):
+    raise AssertionError("统计接口不应转发到 302 应用")
+
+
+def request(app, query: bytes = b""):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": pan302cache.STATS_PATH,
+        "query_string": query,
+        "headers": [],
+    }
+    asyncio.run(app(scope, None, send))
+    return messages[0]["status"], json.loads(messages[1]["body"])
+
+
+def test_stats_requires_apikey():
+    app = pan302cache.RedirectCacheMiddleware(upstream, stats_token="secret")
+    assert request(app)[0] == 403
+    assert request(app, b"apikey=wrong")[0] == 403
+    status, stats = request(app, b"apikey=secret")
+    assert status == 200
+    assert stats["hits"] == 0
+
+
+def test_stats_closed_without_token():
+    app = pan302cache.RedirectCacheMiddleware(upstream)
+    assert request(app, b"apikey=")[0] == 403
@@ -0,0 +1,71 @@
+import socket
+import threading
+import time
+
+from conftest import load
+
+pan302supervisor = load("cloudterminator", "clouddisk.u115.pan302supervisor")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_supervisor(is_alive, restart, **kwargs):
+    supervisor = pan302supervisor.Pan302Supervisor(
+        "127.0.0.1", free_port(), is_alive=is_alive, restart=restart, timeout=0.2, **kwargs
+    )
+    supervisor.interval = 0.05
+    return supervisor
+
+
+def test_exited_process_is_restarted_without_waiting_for_threshold():
+    restarts = []
+    supervisor = make_supervisor(
+        is_alive=lambda: False,
+        restart=lambda: restarts.append(time.monotonic()) or True,
+        failure_threshold=100,
+    )
+    supervisor.start()
+    try:
+        assert wait_for(lambda: restarts)
+    finally:
+        supervisor.stop()
+
+
+def test_stop_waits_for_restart_and_prevents_new_ones():
+    entered = threading.Event()
+    release = threading.Event()
+    restarts = []
+
+    def restart():
+        restarts.append(1)
+        entered.set()
+        release.wait(5)
+        return False
+
+    supervisor = make_supervisor(is_alive=lambda: False, restart=restart)
+    supervisor.start()
+    assert entered.wait(5)
+
+    stopped = threading.Event()
+    stopper = threading.Thread(target=lambda: (supervisor.stop(), stopped.set()))
+    stopper.start()
+    # 重启进行中，stop 需等待其结束
+    assert not stopped.wait(0.2)
+    release.set()
+    assert stopped.wait(5)
+    stopper.join()
+    time.sleep(0.2)
+    assert restarts == [1]
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from conftest import load
+
+discovercache = load("migudiscover", "discovercache")
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def cache():
+    cache = discovercache.DiscoverCache(ttl=60)
+    yield cache
+    cache.close()
+
+
+def expire(cache, key):
+    """
+    让缓存条目在 1 秒前过期
+    """
+    expires, value, size = cache._memory[key]
+    cache._memory[key] = (time.time() - 1, value, size)
+
+
+def test_make_key_normalizes_params():
+    make_key = discovercache.DiscoverCache.make_key
+    assert make_key("src", (1,), {"a": 1, "b": "x"}) == make_key(
+        "src", ("1",), {"b": "x", "a": "1", "c": None}
+    )
+    assert make_key("src", (1,), {}) != make_key("other", (1,), {})
+
+
+def test_memory_lru_evicts_by_bytes():
+    cache = discovercache.DiscoverCache(max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.set("src", key, "x" * 8)
+    # 读取 a 使其变为最近使用，再写入 d 时淘汰 b
+    assert cache.get("src", "a") == ("x" * 8, True)
+    cache.set("src", "d", "x" * 8)
+    assert list(cache._memory) == ["c", "a", "d"]
+    assert cache._memory_bytes <= cache.max_bytes
+    # 超过上限的单个值不进入内存
+    cache.set("src", "big", "x" * 64)
+    assert "big" not in cache._memory
+
+
+def test_stale_value_is_returned_and_refreshed(cache):
+    calls = []
+    release = threading.Event()
+
+    class Source:
+        @cache.cached("src")
+        def fetch(self, page):
+            calls.append(page)
+            release.wait(5)
+            return {"page": page, "call": len(calls)}
+
+    source = Source()
+    release.set()
+    assert source.fetch(1) == {"page": 1, "call": 1}
+    release.clear()
+    expire(cache, cache.make_key("src", (1,), {}))
+
+    # 过期后直接返回旧数据，后台只刷新一次
+    assert source.fetch(1) == {"page": 1, "call": 1}
+    assert source.fetch(1) == {"page": 1, "call": 1}
+    assert cache.stats()["sources"]["src"]["stale_entries"] == 1
+    release.set()
+    assert wait_for(lambda: cache.stats()["sources"]["src"]["refreshes"] == 1)
+    assert len(calls) == 2
+    assert source.fetch(1) == {"page": 1, "call": 2}
+
+    stats = cache.stats()["sources"]["src"]
+    assert stats["stale_hits"] == 2
+    assert stats["stale_entries"] == 0
+
+
+def test_value_older_than_max_stale_is_a_miss(cache):
+    cache.max_stale = 0
+    cache.set("src", "key", [1])
+    expire(cache, "key")
+    assert cache.get("src", "key") == (discovercache.MISSING, False)
+    assert cache.stats()["sources"]["src"]["misses"] == 1
+
+
+def test_disk_cache_survives_reopen(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = discovercache.DiscoverCache()
+    cache.open(path)
+    cache.set("src", "key", {"a": 1})
+    cache.close()
+
+    reopened = discovercache.DiscoverCache()
+    reopened.open(path)
+    try:
+        assert reopened.get("src", "key") == ({"a": 1}, True)
+        assert reopened.stats()["sources"]["src"]["disk_hits"] == 1
+    finally:
+        reopened.close()
+
+
+def test_default_max_stale_is_a_few_ttls():
+    cache = discovercache.DiscoverCache()
+    assert cache.max_stale == 4 * cache.ttl
@@ -0,0 +1,105 @@
+import pytest
+
+from conftest import load
+
+pytest.importorskip("requests")
+
+discoverhttp = load("migudiscover", "discoverhttp")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(discoverhttp.time, "monotonic", clock)
+    return clock
+
+
+def trip(breaker):
+    for _ in range(discoverhttp.BREAKER_THRESHOLD):
+        assert breaker.allow()
+        breaker.failure("HTTP 503")
+
+
+def test_opens_after_threshold(clock):
+    breaker = discoverhttp.CircuitBreaker("example.com")
+    for _ in range(discoverhttp.BREAKER_THRESHOLD - 1):
+        breaker.failure("HTTP 503")
+    assert breaker.state == "closed"
+    breaker.failure("HTTP 503")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["retry_in"] == discoverhttp.BREAKER_COOLDOWN
+
+
+def test_success_resets_failures(clock):
+    breaker = discoverhttp.CircuitBreaker("example.com")
+    for _ in range(discoverhttp.BREAKER_THRESHOLD - 1):
+        breaker.failure("HTTP 503")
+    breaker.success()
+    breaker.failure("HTTP 503")
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = discoverhttp.CircuitBreaker("example.com")
+    trip(breaker)
+    clock.now += discoverhttp.BREAKER_COOLDOWN
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # 探测进行中，其它请求仍被拒绝
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_doubles_cooldown(clock):
+    breaker = discoverhttp.CircuitBreaker("example.com")
+    trip(breaker)
+    cooldown = discoverhttp.BREAKER_COOLDOWN
+    while cooldown < discoverhttp.BREAKER_MAX_COOLDOWN:
+        clock.now += cooldown
+        assert breaker.allow()
+        breaker.failure("timeout")
+        cooldown = min(cooldown * 2, discoverhttp.BREAKER_MAX_COOLDOWN)
+        assert breaker.state == "open"
+        assert breaker.cooldown == cooldown
+        clock.now += cooldown - 1
+        assert not breaker.allow()
+        clock.now += 1 - cooldown
+    assert breaker.cooldown == discoverhttp.BREAKER_MAX_COOLDOWN
+
+
+def test_client_rejects_requests_while_open(clock, monkeypatch):
+    client = discoverhttp.DiscoverHttpClient(retries=0)
+    calls = []
+
+    def request(self, method, url, **kwargs):
+        calls.append(url)
+        raise discoverhttp.requests.ConnectionError("refused")
+
+    monkeypatch.setattr(discoverhttp.requests.Session, "request", request)
+    try:
+        for _ in range(discoverhttp.BREAKER_THRESHOLD):
+            assert client.get("https://example.com/api") is None
+        with pytest.raises(discoverhttp.CircuitOpenError):
+            client.get("https://example.com/api")
+        assert len(calls) == discoverhttp.BREAKER_THRESHOLD
+        # 其它主机不受影响
+        assert client.get("https://other.example.com/api") is None
+        assert len(calls) == discoverhttp.BREAKER_THRESHOLD + 1
+        assert {item["host"]: item["state"] for item in client.breakers()} == {
+            "example.com": "open",
+            "other.example.com": "closed",
+        }
+    finally:
+        client.close()
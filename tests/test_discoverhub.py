@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+from conftest import load
+
+discoverhub = load("migudiscover", "discoverhub")
+
+
+def media(title, year=None, **fields):
+    return SimpleNamespace(title=title, year=year, **fields)
+
+
+def test_merge_interleaves_platforms():
+    merged = discoverhub.merge_results(
+        [[media("A"), media("B"), media("C")], [media("X")]]
+    )
+    assert [item.title for item in merged] == ["A", "X", "B", "C"]
+
+
+def test_merge_dedups_by_normalized_title_and_year():
+    merged = discoverhub.merge_results(
+        [
+            [media("三体", "2023"), media("Hero", "2002")],
+            [media("三 体！", "2023"), media("hero", "2024")],
+        ]
+    )
+    # 标题相同年份不同的视为不同条目
+    assert [(item.title, item.year) for item in merged] == [
+        ("三体", "2023"),
+        ("Hero", "2002"),
+        ("hero", "2024"),
+    ]
+
+
+def test_merge_year_from_date_and_missing_year():
+    merged = discoverhub.merge_results(
+        [
+            [media("Show", first_air_date="2020-01-01")],
+            [media("Show", "2020"), media("show")],
+        ]
+    )
+    assert len(merged) == 1
+
+
+def test_merge_fills_empty_fields_without_touching_sources():
+    first = media("Movie", "2021", poster_path=None)
+    second = media("Movie", "2021", poster_path="/p.jpg", overview="text")
+    merged = discoverhub.merge_results([[first], [second]])
+    assert len(merged) == 1
+    assert merged[0].poster_path == "/p.jpg"
+    assert merged[0].overview == "text"
+    # 结果为浅拷贝，插件缓存的条目不变
+    assert first.poster_path is None
+
+
+def test_merge_skips_untitled():
+    assert discoverhub.merge_results([[media(""), media(None)], []]) == []
+
+
+def test_discover_all_api_is_provided_by_one_plugin():
+    hub = discoverhub.get_hub()
+    for owner in ("MiGuDiscover", "CCTVDiscover"):
+        hub.release_api(owner)
+    first = discoverhub.hub_apis("MiGuDiscover")
+    assert [api["path"] for api in first] == ["/discover_all"]
+    # 其它插件不再重复提供，同一插件重复获取时仍提供
+    assert discoverhub.hub_apis("CCTVDiscover") == []
+    assert discoverhub.hub_apis("MiGuDiscover") == first
+    hub.release_api("CCTVDiscover")
+    assert hub.api_owner == "MiGuDiscover"
+    # 提供接口的插件停止后由下一个插件接替
+    hub.release_api("MiGuDiscover")
+    assert discoverhub.hub_apis("CCTVDiscover")
+    hub.release_api("CCTVDiscover")
+
+
+def test_discover_all_fans_out_to_registered_sources():
+    hub = discoverhub.get_hub()
+    hub.register("A", lambda page, count, **kw: [media("One", "2020")], {"tv": {}})
+    hub.register("B", lambda page, count, **kw: [media("one", "2020"), media("Two")], {"tv": {}})
+    try:
+        assert [m.title for m in discoverhub.discover_all("tv")] == ["One", "Two"]
+        assert discoverhub.discover_all("movie") == []
+    finally:
+        hub.unregister("A")
+        hub.unregister("B")